@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from supabase import Client
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from supabase import AsyncClient, Client
+from typing import Dict, Any, Optional
 from uuid import UUID
 
-from app.core.database import get_db
-from app.api.auth import get_current_user
+from app.core.database import get_async_db, get_db, get_db_pool_stats
+from app.api.auth import get_current_user, invalidate_cached_user
+from app.core.cache import get_cache_stats
+from app.core.profiling import get_profile, get_profile_collapsed, list_profiles
+from app.services.storage_gc import (
+    GC_MODE_DELETE,
+    GC_MODE_QUARANTINE,
+    StorageGCRunningError,
+    collect_orphaned_files,
+)
 
 router = APIRouter()
 
@@ -17,20 +27,20 @@ def require_admin(current_user: Dict[str, Any] = Depends(get_current_user)):
 
 
 @router.get("/users")
-def list_users(
+async def list_users(
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """全ユーザー一覧取得（管理者のみ）"""
-    response = db.table("users").select("id, email, username, is_active, is_admin, created_at").execute()
+    response = await db.table("users").select("id, email, username, is_active, is_admin, created_at").execute()
     return {"users": response.data}
 
 
 @router.delete("/users/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: UUID,
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """ユーザー削除（管理者のみ）"""
     # 自分自身は削除できない
@@ -38,41 +48,115 @@ def delete_user(
         raise HTTPException(status_code=400, detail="自分自身は削除できません")
 
     # ユーザーの存在確認
-    user_response = db.table("users").select("id, username").eq("id", str(user_id)).execute()
+    user_response = await db.table("users").select("id, username").eq("id", str(user_id)).execute()
     if not user_response.data:
         raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
 
     # ユーザー削除
-    db.table("users").delete().eq("id", str(user_id)).execute()
+    await db.table("users").delete().eq("id", str(user_id)).execute()
+    invalidate_cached_user(str(user_id))
 
     return {"message": f"ユーザー {user_response.data[0]['username']} を削除しました"}
 
 
 @router.patch("/users/{user_id}/activate")
-def activate_user(
+async def activate_user(
     user_id: UUID,
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """ユーザーをアクティブ化（管理者のみ）"""
-    response = db.table("users").update({"is_active": True}).eq("id", str(user_id)).execute()
+    response = await db.table("users").update({"is_active": True}).eq("id", str(user_id)).execute()
+    invalidate_cached_user(str(user_id))
     if not response.data:
         raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
     return {"message": "ユーザーをアクティブ化しました"}
 
 
 @router.patch("/users/{user_id}/deactivate")
-def deactivate_user(
+async def deactivate_user(
     user_id: UUID,
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """ユーザーを非アクティブ化（管理者のみ）"""
     # 自分自身は非アクティブ化できない
     if str(user_id) == current_user["id"]:
         raise HTTPException(status_code=400, detail="自分自身は非アクティブ化できません")
 
-    response = db.table("users").update({"is_active": False}).eq("id", str(user_id)).execute()
+    response = await db.table("users").update({"is_active": False}).eq("id", str(user_id)).execute()
+    invalidate_cached_user(str(user_id))
     if not response.data:
         raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
     return {"message": "ユーザーを非アクティブ化しました"}
+
+
+@router.get("/cache/stats")
+async def get_cache_statistics(
+    current_user: Dict[str, Any] = Depends(require_admin),
+):
+    """プロセス内キャッシュの統計情報取得（管理者のみ）"""
+    return {"caches": get_cache_stats()}
+
+
+@router.get("/db/pool/stats")
+async def get_db_pool_statistics(
+    current_user: Dict[str, Any] = Depends(require_admin),
+):
+    """DB接続のコネクションプール利用状況取得（管理者のみ）"""
+    return {"pools": get_db_pool_stats()}
+
+
+@router.get("/profiles")
+async def get_request_profiles(
+    current_user: Dict[str, Any] = Depends(require_admin),
+):
+    """プロファイルしたリクエストの一覧取得（管理者のみ）"""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    current_user: Dict[str, Any] = Depends(require_admin),
+):
+    """プロファイルの詳細（DB呼び出しのタイムライン）取得（管理者のみ）"""
+    # REQUEST_PROFILE_DIRのファイルを読む場合があるためスレッドプールで実行
+    profile = await run_in_threadpool(get_profile, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    return profile
+
+
+@router.get("/profiles/{profile_id}/flamegraph")
+async def get_request_profile_flamegraph(
+    profile_id: str,
+    current_user: Dict[str, Any] = Depends(require_admin),
+):
+    """フレームグラフ用のスタック（collapsed形式）取得（管理者のみ）"""
+    collapsed = await run_in_threadpool(get_profile_collapsed, profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.collapsed"'},
+    )
+
+
+@router.post("/storage/gc")
+def collect_storage_garbage(
+    dry_run: bool = Query(True, description="回収せずに対象の件数・容量のみ集計"),
+    mode: Optional[str] = Query(None, description=f"{GC_MODE_QUARANTINE} | {GC_MODE_DELETE}（省略時はSTORAGE_GC_MODE）"),
+    current_user: Dict[str, Any] = Depends(require_admin),
+    db: Client = Depends(get_db),
+):
+    """DBから参照されていない資料ファイルを回収（管理者のみ）"""
+    if mode is not None and mode not in (GC_MODE_QUARANTINE, GC_MODE_DELETE):
+        raise HTTPException(
+            status_code=400,
+            detail=f"modeは {GC_MODE_QUARANTINE} または {GC_MODE_DELETE} を指定してください"
+        )
+    try:
+        return collect_orphaned_files(db, dry_run=dry_run, mode=mode)
+    except StorageGCRunningError:
+        raise HTTPException(status_code=409, detail="孤立ファイルの回収を実行中です")
@@ -1,10 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import Client
+from supabase import AsyncClient
 from datetime import timedelta
-from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token, decode_access_token
+from app.core.database import get_async_db
+from app.core.security import (
+    verify_password_async,
+    get_password_hash_async,
+    create_access_token,
+    decode_access_token,
+    PasswordHasherBusyError,
+)
 from app.core.config import settings
+from app.core.cache import TTLCache
 from app.schemas.auth import UserCreate, UserResponse, Token, LoginRequest
 from typing import Optional, Dict, Any
 from uuid import UUID
@@ -13,10 +20,40 @@ import uuid
 router = APIRouter()
 security = HTTPBearer()
 
+# 認証済みユーザーのキャッシュ（JWTのsub → usersレコード）
+_user_cache = TTLCache("users", ttl_seconds=settings.USER_CACHE_TTL_SECONDS, maxsize=settings.USER_CACHE_MAXSIZE)
 
-def get_current_user(
+
+def invalidate_cached_user(user_id: str) -> None:
+    """ユーザーキャッシュを破棄（有効化・無効化・削除時に呼び出す）"""
+    _user_cache.invalidate(str(user_id))
+
+
+def _user_from_claims(user_id: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """トークンのクレームからユーザー情報を組み立てる（必要なクレームが欠けていればNone）"""
+    if not all(key in payload for key in ("email", "username", "is_admin")):
+        return None
+    return {
+        "id": user_id,
+        "email": payload["email"],
+        "username": payload["username"],
+        "is_admin": bool(payload["is_admin"]),
+        "is_active": True,
+    }
+
+
+def _password_hasher_busy() -> HTTPException:
+    """ハッシュ処理が飽和している場合の503レスポンス"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="ただいま混雑しています。しばらくしてから再度お試しください",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Client = Depends(get_db)
+    db: AsyncClient = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """現在のユーザーを取得"""
     token = credentials.credentials
@@ -37,8 +74,18 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # クレーム信頼モード: DBを参照せずトークンの内容をそのまま使用
+    if settings.AUTH_TRUST_TOKEN_CLAIMS:
+        claimed_user = _user_from_claims(user_id, payload)
+        if claimed_user is not None:
+            return claimed_user
+
+    cached_user = _user_cache.get(user_id)
+    if cached_user is not None:
+        return dict(cached_user)
+
     # Supabase Clientでユーザーを取得
-    response = db.table("users").select("*").eq("id", user_id).execute()
+    response = await db.table("users").select("*").eq("id", user_id).execute()
 
     if not response.data or len(response.data) == 0:
         raise HTTPException(
@@ -47,7 +94,9 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return response.data[0]
+    user = response.data[0]
+    _user_cache.set(user_id, user)
+    return dict(user)
 
 
 def require_admin(
@@ -62,11 +111,21 @@ def require_admin(
     return current_user
 
 
+async def is_admin_token(token: str) -> bool:
+    """Bearerトークンが有効な管理者ユーザーのものか判定（Dependencyを使わないミドルウェア用）"""
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    try:
+        require_admin(await get_current_user(credentials, await get_async_db()))
+    except HTTPException:
+        return False
+    return True
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(user_data: UserCreate, db: Client = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncClient = Depends(get_async_db)):
     """新規ユーザー登録"""
     # メールアドレスの重複チェック
-    existing_email = db.table("users").select("id").eq("email", user_data.email).execute()
+    existing_email = await db.table("users").select("id").eq("email", user_data.email).execute()
     if existing_email.data:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -74,15 +133,18 @@ def register_user(user_data: UserCreate, db: Client = Depends(get_db)):
         )
 
     # ユーザー名の重複チェック
-    existing_username = db.table("users").select("id").eq("username", user_data.username).execute()
+    existing_username = await db.table("users").select("id").eq("username", user_data.username).execute()
     if existing_username.data:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="このユーザー名は既に使用されています"
         )
 
-    # パスワードのハッシュ化
-    hashed_password = get_password_hash(user_data.password)
+    # パスワードのハッシュ化（専用プロセスプールで実行）
+    try:
+        hashed_password = await get_password_hash_async(user_data.password)
+    except PasswordHasherBusyError:
+        raise _password_hasher_busy()
 
     # ユーザー作成
     new_user_data = {
@@ -93,7 +155,7 @@ def register_user(user_data: UserCreate, db: Client = Depends(get_db)):
         "is_admin": False
     }
 
-    response = db.table("users").insert(new_user_data).execute()
+    response = await db.table("users").insert(new_user_data).execute()
 
     if not response.data:
         raise HTTPException(
@@ -105,10 +167,10 @@ def register_user(user_data: UserCreate, db: Client = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Client = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncClient = Depends(get_async_db)):
     """ログイン"""
     # ユーザーを検索
-    response = db.table("users").select("*").eq("email", login_data.email).execute()
+    response = await db.table("users").select("*").eq("email", login_data.email).execute()
 
     if not response.data or len(response.data) == 0:
         raise HTTPException(
@@ -119,7 +181,13 @@ def login(login_data: LoginRequest, db: Client = Depends(get_db)):
 
     user = response.data[0]
 
-    if not verify_password(login_data.password, user["hashed_password"]):
+    # パスワード検証（専用プロセスプールで実行）
+    try:
+        password_valid = await verify_password_async(login_data.password, user["hashed_password"])
+    except PasswordHasherBusyError:
+        raise _password_hasher_busy()
+
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="メールアドレスまたはパスワードが正しくありません",
@@ -132,6 +200,7 @@ def login(login_data: LoginRequest, db: Client = Depends(get_db)):
         data={
             "sub": str(user["id"]),
             "email": user["email"],
+            "username": user["username"],
             "is_admin": user.get("is_admin", False)
         },
         expires_delta=access_token_expires
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from supabase import Client
+from supabase import AsyncClient
 from typing import Optional, Dict, Any, List
 from uuid import UUID
 from datetime import datetime
@@ -7,7 +7,7 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.api.auth import get_current_user
 from app.schemas.checklist import (
     ChecklistCreate,
@@ -19,15 +19,15 @@ router = APIRouter()
 
 
 @router.post("", response_model=ChecklistResponse)
-def create_checklist(
+async def create_checklist(
     checklist: ChecklistCreate,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """チェックリスト項目を作成"""
     try:
         # プロジェクトの存在確認
-        project_response = db.table("projects").select("id").eq(
+        project_response = await db.table("projects").select("id").eq(
             "id", str(checklist.project_id)
         ).execute()
 
@@ -38,7 +38,7 @@ def create_checklist(
         checklist_data = checklist.model_dump(mode="json")
         checklist_data["project_id"] = str(checklist.project_id)
 
-        result = db.table("checklists").insert(checklist_data).execute()
+        result = await db.table("checklists").insert(checklist_data).execute()
 
         if not result.data:
             raise HTTPException(status_code=500, detail="チェックリスト項目の作成に失敗しました")
@@ -56,10 +56,10 @@ def create_checklist(
 
 
 @router.get("", response_model=List[ChecklistResponse])
-def list_checklists(
+async def list_checklists(
     project_id: Optional[UUID] = Query(None, description="プロジェクトIDで絞り込み"),
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """チェックリスト一覧を取得"""
     try:
@@ -70,7 +70,7 @@ def list_checklists(
 
         query = query.order("sort_order").order("created_at")
 
-        result = query.execute()
+        result = await query.execute()
 
         return result.data or []
 
@@ -83,13 +83,13 @@ def list_checklists(
 
 
 @router.get("/{checklist_id}", response_model=ChecklistResponse)
-def get_checklist(
+async def get_checklist(
     checklist_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """チェックリスト項目詳細を取得"""
-    result = db.table("checklists").select("*").eq("id", str(checklist_id)).execute()
+    result = await db.table("checklists").select("*").eq("id", str(checklist_id)).execute()
 
     if not result.data:
         raise HTTPException(status_code=404, detail="チェックリスト項目が見つかりません")
@@ -98,15 +98,15 @@ def get_checklist(
 
 
 @router.patch("/{checklist_id}", response_model=ChecklistResponse)
-def update_checklist(
+async def update_checklist(
     checklist_id: UUID,
     checklist_data: ChecklistUpdate,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """チェックリスト項目を更新"""
     # 既存のチェックリスト項目を確認
-    existing = db.table("checklists").select("*").eq("id", str(checklist_id)).execute()
+    existing = await db.table("checklists").select("*").eq("id", str(checklist_id)).execute()
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="チェックリスト項目が見つかりません")
@@ -115,7 +115,7 @@ def update_checklist(
     update_dict = checklist_data.model_dump(exclude_unset=True, mode="json")
     update_dict["updated_at"] = datetime.utcnow().isoformat()
 
-    updated_response = db.table("checklists").update(update_dict).eq(
+    updated_response = await db.table("checklists").update(update_dict).eq(
         "id", str(checklist_id)
     ).execute()
 
@@ -126,33 +126,33 @@ def update_checklist(
 
 
 @router.delete("/{checklist_id}")
-def delete_checklist(
+async def delete_checklist(
     checklist_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """チェックリスト項目を削除"""
     # 既存のチェックリスト項目を確認
-    existing = db.table("checklists").select("*").eq("id", str(checklist_id)).execute()
+    existing = await db.table("checklists").select("*").eq("id", str(checklist_id)).execute()
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="チェックリスト項目が見つかりません")
 
     # 削除
-    db.table("checklists").delete().eq("id", str(checklist_id)).execute()
+    await db.table("checklists").delete().eq("id", str(checklist_id)).execute()
 
     return {"message": "チェックリスト項目を削除しました"}
 
 
 @router.post("/{checklist_id}/toggle", response_model=ChecklistResponse)
-def toggle_checklist_completed(
+async def toggle_checklist_completed(
     checklist_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """チェックリスト項目の完了状態をトグル"""
     # 既存のチェックリスト項目を確認
-    existing = db.table("checklists").select("*").eq("id", str(checklist_id)).execute()
+    existing = await db.table("checklists").select("*").eq("id", str(checklist_id)).execute()
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="チェックリスト項目が見つかりません")
@@ -161,7 +161,7 @@ def toggle_checklist_completed(
     new_status = not checklist["is_completed"]
 
     # 更新
-    updated_response = db.table("checklists").update({
+    updated_response = await db.table("checklists").update({
         "is_completed": new_status,
         "updated_at": datetime.utcnow().isoformat()
     }).eq("id", str(checklist_id)).execute()
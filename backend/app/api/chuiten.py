@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from supabase import Client
+from supabase import AsyncClient
 from typing import Optional, Dict, Any, List
 from uuid import UUID
 from datetime import datetime
+import asyncio
 import logging
 import re
 
 logger = logging.getLogger(__name__)
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.api.auth import get_current_user, require_admin
 from app.schemas.chuiten import (
     ChuitenCreate,
@@ -25,25 +26,25 @@ router = APIRouter()
 # ==================== カテゴリ管理 ====================
 
 @router.get("/categories", response_model=List[ChuitenCategory])
-def list_chuiten_categories(
+async def list_chuiten_categories(
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """注意点カテゴリ一覧を取得"""
-    result = db.table("master_chuiten_category").select("*").order("sort_order").execute()
+    result = await db.table("master_chuiten_category").select("*").order("sort_order").execute()
     return result.data or []
 
 
 @router.post("/categories", response_model=ChuitenCategory)
-def create_chuiten_category(
+async def create_chuiten_category(
     category: ChuitenCategoryCreate,
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """注意点カテゴリを追加（管理者のみ）"""
     try:
         category_data = category.model_dump(mode="json")
-        result = db.table("master_chuiten_category").insert(category_data).execute()
+        result = await db.table("master_chuiten_category").insert(category_data).execute()
 
         if not result.data:
             raise HTTPException(status_code=500, detail="カテゴリの追加に失敗しました")
@@ -61,25 +62,26 @@ def create_chuiten_category(
 
 
 @router.delete("/categories/{category_id}")
-def delete_chuiten_category(
+async def delete_chuiten_category(
     category_id: UUID,
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """注意点カテゴリを削除（管理者のみ）"""
-    # 既存チェック
-    existing = db.table("master_chuiten_category").select("*").eq("id", str(category_id)).execute()
+    # 既存チェック・使用中かチェック（独立したクエリのため並行して実行）
+    existing, in_use = await asyncio.gather(
+        db.table("master_chuiten_category").select("*").eq("id", str(category_id)).execute(),
+        db.table("master_chuiten").select("id").eq("category_id", str(category_id)).limit(1).execute(),
+    )
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="カテゴリが見つかりません")
 
-    # 使用中かチェック
-    in_use = db.table("master_chuiten").select("id").eq("category_id", str(category_id)).limit(1).execute()
     if in_use.data:
         raise HTTPException(status_code=400, detail="このカテゴリは使用中のため削除できません")
 
     # 削除
-    db.table("master_chuiten_category").delete().eq("id", str(category_id)).execute()
+    await db.table("master_chuiten_category").delete().eq("id", str(category_id)).execute()
 
     return {"message": "カテゴリを削除しました"}
 
@@ -87,12 +89,12 @@ def delete_chuiten_category(
 # ==================== 注意点管理 ====================
 
 @router.get("", response_model=List[ChuitenWithCategory])
-def list_chuiten(
+async def list_chuiten(
     series: Optional[str] = Query(None, description="対象シリーズで絞り込み"),
     category_id: Optional[UUID] = Query(None, description="カテゴリIDで絞り込み"),
     keyword: Optional[str] = Query(None, description="キーワード検索（注意点内容）"),
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """注意点一覧を取得"""
     try:
@@ -111,7 +113,7 @@ def list_chuiten(
         if keyword:
             query = query.ilike("note", f"%{keyword}%")
 
-        result = query.order("seq_no").execute()
+        result = await query.order("seq_no").execute()
 
         # カテゴリ名を展開
         items = []
@@ -134,10 +136,10 @@ def list_chuiten(
 
 
 @router.post("", response_model=Chuiten)
-def create_chuiten(
+async def create_chuiten(
     chuiten: ChuitenCreate,
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """注意点を追加（管理者のみ）"""
     try:
@@ -147,7 +149,7 @@ def create_chuiten(
         if "category_id" in chuiten_data and chuiten_data["category_id"]:
             chuiten_data["category_id"] = str(chuiten_data["category_id"])
 
-        result = db.table("master_chuiten").insert(chuiten_data).execute()
+        result = await db.table("master_chuiten").insert(chuiten_data).execute()
 
         if not result.data:
             raise HTTPException(status_code=500, detail="注意点の追加に失敗しました")
@@ -165,14 +167,14 @@ def create_chuiten(
 
 
 @router.get("/{chuiten_id}", response_model=ChuitenWithCategory)
-def get_chuiten(
+async def get_chuiten(
     chuiten_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """注意点詳細を取得"""
     try:
-        result = db.table("master_chuiten").select("""
+        result = await db.table("master_chuiten").select("""
             *,
             master_chuiten_category(name)
         """).eq("id", str(chuiten_id)).execute()
@@ -200,16 +202,16 @@ def get_chuiten(
 
 
 @router.patch("/{chuiten_id}", response_model=Chuiten)
-def update_chuiten(
+async def update_chuiten(
     chuiten_id: UUID,
     chuiten: ChuitenUpdate,
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """注意点を更新（管理者のみ）"""
     try:
         # 既存チェック
-        existing = db.table("master_chuiten").select("*").eq("id", str(chuiten_id)).execute()
+        existing = await db.table("master_chuiten").select("*").eq("id", str(chuiten_id)).execute()
 
         if not existing.data:
             raise HTTPException(status_code=404, detail="注意点が見つかりません")
@@ -223,7 +225,7 @@ def update_chuiten(
 
         update_dict["updated_at"] = datetime.utcnow().isoformat()
 
-        updated_response = db.table("master_chuiten").update(update_dict).eq(
+        updated_response = await db.table("master_chuiten").update(update_dict).eq(
             "id", str(chuiten_id)
         ).execute()
 
@@ -243,20 +245,20 @@ def update_chuiten(
 
 
 @router.delete("/{chuiten_id}")
-def delete_chuiten(
+async def delete_chuiten(
     chuiten_id: UUID,
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """注意点を削除（管理者のみ）"""
     # 既存チェック
-    existing = db.table("master_chuiten").select("*").eq("id", str(chuiten_id)).execute()
+    existing = await db.table("master_chuiten").select("*").eq("id", str(chuiten_id)).execute()
 
     if not existing.data:
         raise HTTPException(status_code=404, detail="注意点が見つかりません")
 
     # 削除
-    db.table("master_chuiten").delete().eq("id", str(chuiten_id)).execute()
+    await db.table("master_chuiten").delete().eq("id", str(chuiten_id)).execute()
 
     return {"message": "注意点を削除しました"}
 
@@ -264,15 +266,15 @@ def delete_chuiten(
 # ==================== 案件関連注意点取得 ====================
 
 @router.get("/by-project/{project_id}", response_model=List[ChuitenWithCategory])
-def get_chuiten_by_project(
+async def get_chuiten_by_project(
     project_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """案件に関連する注意点を取得"""
     try:
         # プロジェクト情報を取得
-        project = db.table("projects").select("machine_no, model").eq(
+        project = await db.table("projects").select("machine_no, model").eq(
             "id", str(project_id)
         ).execute()
 
@@ -299,7 +301,7 @@ def get_chuiten_by_project(
         if series:
             query = query.eq("target_series", series)
 
-        result = query.order("seq_no").execute()
+        result = await query.order("seq_no").execute()
 
         # カテゴリ名を展開
         items = []
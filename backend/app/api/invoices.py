@@ -1,18 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from supabase import Client
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime
 from decimal import Decimal
-import io
-import csv
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
-from app.core.database import get_db
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.api.auth import get_current_user, require_admin
+from app.repositories import (
+    InvoiceAlreadyClosedError,
+    InvoiceNoItemsError,
+    InvoiceRepository,
+    get_invoice_repository,
+)
+from app.services.invoice_export import (
+    CSV_MEDIA_TYPE,
+    XLSX_MEDIA_TYPE,
+    aiter_csv,
+    aiter_xlsx,
+    iter_bytes,
+    iter_csv,
+    iter_xlsx,
+)
 from app.schemas.invoice import (
     Invoice,
     InvoicePreview,
@@ -25,81 +40,99 @@ router = APIRouter()
 INVOICE_STATUS_DRAFT = "draft"
 INVOICE_STATUS_CLOSED = "closed"
 
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMAT_XLSX = "xlsx"
+INVOICE_EXPORT_HEADER = ['管理No', '委託業務内容', '実工数']
+# 複数月エクスポートの最大期間（月数）
+MAX_EXPORT_MONTHS = 120
+# 明細の実工数の表示桁（確定済み・未確定で同じ表記にする）
+HOURS_QUANTUM = Decimal("0.01")
+
+# 確定済み請求書のエクスポートキャッシュ（(年, 月, 確定日時, 形式) → ファイルのバイト列）
+_export_cache = TTLCache("invoice_exports", ttl_seconds=settings.INVOICE_EXPORT_CACHE_TTL_SECONDS, maxsize=48)
+
+
+def _invalidate_export_cache(year: int, month: int) -> None:
+    """指定月のエクスポートキャッシュを破棄（再オープン・削除時に呼び出す）"""
+    for key in _export_cache.keys():
+        if key[:2] == (year, month):
+            _export_cache.invalidate(key)
+
+
+def _parse_timestamp(value: Any) -> Any:
+    """PostgRESTのタイムスタンプ文字列をdatetimeに変換"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+
+def _invoice_from_row(invoice: Dict[str, Any]) -> Invoice:
+    """invoicesテーブルの行をレスポンスモデルに変換"""
+    return Invoice(
+        id=UUID(invoice["id"]),
+        year=invoice["year"],
+        month=invoice["month"],
+        status=invoice["status"],
+        closed_at=_parse_timestamp(invoice["closed_at"]) if invoice.get("closed_at") else None,
+        closed_by=UUID(invoice["closed_by"]) if invoice.get("closed_by") else None,
+        created_at=_parse_timestamp(invoice["created_at"]),
+        updated_at=_parse_timestamp(invoice["updated_at"])
+    )
+
+
+async def _load_invoice_items(repo: InvoiceRepository, invoice_id: str) -> List[InvoiceItem]:
+    """確定時に保存した明細を取得（管理No順、実工数は集計時と同じ桁に揃える）"""
+    return [
+        InvoiceItem(**{**item, "total_hours": Decimal(str(item["total_hours"])).quantize(HOURS_QUANTUM)})
+        for item in await repo.load_items(invoice_id)
+    ]
+
+
+async def _aggregate_invoice_items(repo: InvoiceRepository, year: int, month: int) -> List[InvoiceItem]:
+    """指定月の工数を案件別に集計して明細を作成（集計はDB側で実行、管理No順）"""
+    items = []
+    for line in await repo.monthly_lines(year, month):
+        hours = Decimal(line.get("total_minutes") or 0) / Decimal(60)
+        items.append(InvoiceItem(
+            id=UUID("00000000-0000-0000-0000-000000000000"),  # プレビュー用ダミー
+            invoice_id=UUID("00000000-0000-0000-0000-000000000000"),  # プレビュー用ダミー
+            project_id=UUID(line["project_id"]),
+            management_no=line.get("management_no") or "",
+            work_content=line.get("machine_no") or "",
+            total_hours=hours.quantize(HOURS_QUANTUM),
+            created_at=datetime.utcnow()
+        ))
+
+    return items
+
+
+async def _resolve_invoice_items(
+    repo: InvoiceRepository, invoice: Optional[Dict[str, Any]], year: int, month: int
+) -> List[InvoiceItem]:
+    """確定済みなら保存済み明細、未確定ならworklogsの集計結果を返す"""
+    if invoice and invoice["status"] == INVOICE_STATUS_CLOSED:
+        return await _load_invoice_items(repo, invoice["id"])
+    return await _aggregate_invoice_items(repo, year, month)
+
 
 @router.get("/preview", response_model=InvoicePreview)
-def preview_invoice(
+async def preview_invoice(
     year: int = Query(..., description="年"),
     month: int = Query(..., ge=1, le=12, description="月"),
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: InvoiceRepository = Depends(get_invoice_repository),
 ):
-    """指定月の請求書プレビュー（worklogsから実工数を集計）"""
+    """指定月の請求書プレビュー
+
+    確定済みの月は保存済みの明細（invoice_items）を返し、未確定の月はworklogsから実工数を集計する
+    """
     try:
-        # 月範囲の計算
-        start_date = f"{year}-{month:02d}-01"
-        if month == 12:
-            end_date = f"{year + 1}-01-01"
-        else:
-            end_date = f"{year}-{month + 1:02d}-01"
-
-        # worklogsから指定月の工数を取得（プロジェクト別に集計）
-        worklogs_response = db.table("work_logs").select(
-            "project_id, duration_minutes"
-        ).gte("work_date", start_date).lt("work_date", end_date).execute()
-
-        # プロジェクトIDごとに工数を集計
-        project_hours = {}
-        if worklogs_response.data:
-            for log in worklogs_response.data:
-                project_id = log["project_id"]
-                minutes = log.get("duration_minutes", 0)
-                if project_id not in project_hours:
-                    project_hours[project_id] = 0
-                project_hours[project_id] += minutes
-
-        # プロジェクト情報を取得
-        items = []
-        if project_hours:
-            project_ids = list(project_hours.keys())
-            projects_response = db.table("projects").select(
-                "id, management_no, machine_no"
-            ).in_("id", project_ids).execute()
-
-            if projects_response.data:
-                for project in projects_response.data:
-                    project_id = project["id"]
-                    minutes = project_hours.get(project_id, 0)
-                    hours = Decimal(minutes) / Decimal(60)
-
-                    items.append(InvoiceItem(
-                        id=UUID("00000000-0000-0000-0000-000000000000"),  # プレビュー用ダミー
-                        invoice_id=UUID("00000000-0000-0000-0000-000000000000"),  # プレビュー用ダミー
-                        project_id=UUID(project_id),
-                        management_no=project.get("management_no", ""),
-                        work_content=project.get("machine_no", ""),
-                        total_hours=hours.quantize(Decimal("0.01")),
-                        created_at=datetime.utcnow()
-                    ))
-
-        # 管理Noでソート
-        items.sort(key=lambda x: x.management_no)
-
-        # 既存の請求書を確認
-        existing_invoice = db.table("invoices").select("*").eq(
-            "year", year
-        ).eq("month", month).execute()
-
-        if existing_invoice.data:
-            invoice = existing_invoice.data[0]
+        invoice = await repo.get_header(year, month)
+        items = await _resolve_invoice_items(repo, invoice, year, month)
+
+        if invoice:
             return InvoicePreview(
-                id=UUID(invoice["id"]),
-                year=invoice["year"],
-                month=invoice["month"],
-                status=invoice["status"],
-                closed_at=invoice.get("closed_at"),
-                closed_by=UUID(invoice["closed_by"]) if invoice.get("closed_by") else None,
-                created_at=datetime.fromisoformat(invoice["created_at"].replace("Z", "+00:00")),
-                updated_at=datetime.fromisoformat(invoice["updated_at"].replace("Z", "+00:00")),
+                **_invoice_from_row(invoice).model_dump(),
                 items=items
             )
         else:
@@ -125,199 +158,209 @@ def preview_invoice(
 
 
 @router.post("/close", response_model=Invoice)
-def close_invoice(
+async def close_invoice(
     year: int = Query(..., description="年"),
     month: int = Query(..., ge=1, le=12, description="月"),
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    repo: InvoiceRepository = Depends(get_invoice_repository),
 ):
-    """請求書を確定（管理者のみ）"""
-    invoice_id = None
-    is_new_invoice = False
+    """請求書を確定（管理者のみ）
 
+    集計・ヘッダ確定・明細登録はDB関数内の1トランザクションで実行されるため、
+    途中で失敗しても確定途中の請求書は残らない
+    """
     try:
-        # プレビューデータを取得
-        preview = preview_invoice(year=year, month=month, current_user=current_user, db=db)
-
-        if not preview.items:
-            raise HTTPException(status_code=400, detail="請求対象の工数がありません")
-
-        # 既存の請求書を確認
-        existing = db.table("invoices").select("*").eq(
-            "year", year
-        ).eq("month", month).execute()
-
-        if existing.data:
-            invoice_id = existing.data[0]["id"]
-            # 確定済みの場合はエラー
-            if existing.data[0]["status"] == INVOICE_STATUS_CLOSED:
-                raise HTTPException(status_code=400, detail="既に確定済みの請求書です")
-
-            # ステータスを確定に更新
-            update_data = {
-                "status": INVOICE_STATUS_CLOSED,
-                "closed_at": datetime.utcnow().isoformat(),
-                "closed_by": str(current_user["id"]),
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            db.table("invoices").update(update_data).eq("id", invoice_id).execute()
-
-            # 既存の明細を削除
-            db.table("invoice_items").delete().eq("invoice_id", invoice_id).execute()
-        else:
-            # 新規請求書を作成
-            invoice_data = {
-                "year": year,
-                "month": month,
-                "status": INVOICE_STATUS_CLOSED,
-                "closed_at": datetime.utcnow().isoformat(),
-                "closed_by": str(current_user["id"])
-            }
-            invoice_response = db.table("invoices").insert(invoice_data).execute()
-
-            if not invoice_response.data:
-                raise HTTPException(status_code=500, detail="請求書の作成に失敗しました")
-
-            invoice_id = invoice_response.data[0]["id"]
-            is_new_invoice = True
-
-        # 明細を一括登録（N+1クエリ回避）
-        items_data = [
-            {
-                "invoice_id": invoice_id,
-                "project_id": str(item.project_id),
-                "management_no": item.management_no,
-                "work_content": item.work_content,
-                "total_hours": float(item.total_hours)
-            }
-            for item in preview.items
-        ]
-
-        if items_data:
-            db.table("invoice_items").insert(items_data).execute()
-
-        # 確定した請求書を取得
-        result = db.table("invoices").select("*").eq("id", invoice_id).execute()
-
-        if not result.data:
-            raise HTTPException(status_code=500, detail="請求書の取得に失敗しました")
-
-        invoice = result.data[0]
-        return Invoice(
-            id=UUID(invoice["id"]),
-            year=invoice["year"],
-            month=invoice["month"],
-            status=invoice["status"],
-            closed_at=datetime.fromisoformat(invoice["closed_at"].replace("Z", "+00:00")) if invoice.get("closed_at") else None,
-            closed_by=UUID(invoice["closed_by"]) if invoice.get("closed_by") else None,
-            created_at=datetime.fromisoformat(invoice["created_at"].replace("Z", "+00:00")),
-            updated_at=datetime.fromisoformat(invoice["updated_at"].replace("Z", "+00:00"))
-        )
-
-    except HTTPException:
-        raise
+        invoice = await repo.close(year, month, str(current_user["id"]))
+    except InvoiceAlreadyClosedError:
+        raise HTTPException(status_code=400, detail="既に確定済みの請求書です")
+    except InvoiceNoItemsError:
+        raise HTTPException(status_code=400, detail="請求対象の工数がありません")
     except Exception as e:
         logger.error(f"Invoice close failed: {e}", exc_info=True)
-        # エラー時のロールバック相当処理（新規作成の場合のみ削除）
-        if is_new_invoice and invoice_id:
-            try:
-                db.table("invoice_items").delete().eq("invoice_id", invoice_id).execute()
-                db.table("invoices").delete().eq("id", invoice_id).execute()
-            except Exception as rollback_error:
-                logger.error(f"Rollback failed: {rollback_error}", exc_info=True)
-
         raise HTTPException(
             status_code=500,
             detail="請求書の確定に失敗しました"
         )
 
+    if not invoice:
+        raise HTTPException(status_code=500, detail="請求書の取得に失敗しました")
+
+    return _invoice_from_row(invoice)
+
 
 @router.get("/export")
-def export_invoice_csv(
+async def export_invoice_csv(
     year: int = Query(..., description="年"),
     month: int = Query(..., ge=1, le=12, description="月"),
+    format: str = Query(EXPORT_FORMAT_CSV, pattern="^(csv|xlsx)$", description="出力形式: csv | xlsx"),
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: InvoiceRepository = Depends(get_invoice_repository),
 ):
-    """請求書CSVエクスポート"""
-    # プレビューデータを取得
-    preview = preview_invoice(year=year, month=month, current_user=current_user, db=db)
+    """請求書エクスポート（CSV / Excel）
+
+    確定済みの月は保存済み明細から作成し、生成したファイルを（年, 月, 確定日時, 形式）単位でキャッシュする。
+    確定日時をキーに含めるため、再オープン後に再確定した月の古いファイルが返ることはない
+    """
+    invoice = await repo.get_header(year, month)
+    filename = f"invoice_{year}-{month:02d}.{format}"
+
+    if invoice and invoice["status"] == INVOICE_STATUS_CLOSED:
+        cache_key = (year, month, invoice.get("closed_at"), format)
+        content = _export_cache.get(cache_key)
+        if content is None:
+            items = await _load_invoice_items(repo, invoice["id"])
+            if not items:
+                raise HTTPException(status_code=404, detail="請求対象の工数がありません")
+            # ファイル生成（xlsxは一時ファイルを伴う）はスレッドプールで実行
+            content = await run_in_threadpool(
+                lambda: b"".join(_iter_export(format, INVOICE_EXPORT_HEADER, _invoice_item_rows(items)))
+            )
+            _export_cache.set(cache_key, content)
+        return _export_response(iter_bytes(content), format, filename)
 
-    if not preview.items:
+    items = await _aggregate_invoice_items(repo, year, month)
+    if not items:
         raise HTTPException(status_code=404, detail="請求対象の工数がありません")
 
-    # CSV作成
-    output = io.StringIO()
-    writer = csv.writer(output)
+    return _export_response(
+        _iter_export(format, INVOICE_EXPORT_HEADER, _invoice_item_rows(items)),
+        format,
+        filename,
+    )
+
+
+@router.get("/export/range")
+async def export_invoice_range(
+    start_year: int = Query(..., description="開始年"),
+    start_month: int = Query(..., ge=1, le=12, description="開始月"),
+    end_year: int = Query(..., description="終了年"),
+    end_month: int = Query(..., ge=1, le=12, description="終了月"),
+    format: str = Query(EXPORT_FORMAT_CSV, pattern="^(csv|xlsx)$", description="出力形式: csv | xlsx"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    repo: InvoiceRepository = Depends(get_invoice_repository),
+):
+    """複数月の請求明細エクスポート（CSV / Excel）
+
+    期間内の請求書ヘッダは1クエリでまとめて取得する。明細は月ごとに取得しながら逐次出力し、
+    次の月の取得を出力と並行して先行させる（メモリ使用量は期間の長さに関わらず2か月分に収まる）
+    """
+    start = start_year * 12 + (start_month - 1)
+    end = end_year * 12 + (end_month - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="開始年月は終了年月以前を指定してください")
+    if end - start + 1 > MAX_EXPORT_MONTHS:
+        raise HTTPException(status_code=400, detail=f"出力できる期間は最大{MAX_EXPORT_MONTHS}か月です")
+
+    months = [(index // 12, index % 12 + 1) for index in range(start, end + 1)]
+    headers = {
+        (invoice["year"], invoice["month"]): invoice
+        for invoice in await repo.list_headers(start_year, end_year)
+    }
+
+    def fetch(month: Tuple[int, int]) -> "asyncio.Task[List[InvoiceItem]]":
+        return asyncio.ensure_future(_resolve_invoice_items(repo, headers.get(month), *month))
+
+    async def rows() -> AsyncIterator[List[Any]]:
+        pending = fetch(months[0])
+        try:
+            for index, (y, m) in enumerate(months):
+                items = await pending
+                if index + 1 < len(months):
+                    pending = fetch(months[index + 1])
+                for row in _invoice_item_rows(items):
+                    yield [f"{y}-{m:02d}", *row]
+        finally:
+            # クライアント切断等で中断された場合は先読みを取り消す
+            pending.cancel()
+
+    filename = f"invoice_{start_year}-{start_month:02d}_{end_year}-{end_month:02d}.{format}"
+    return _export_response(
+        _aiter_export(format, ["年月", *INVOICE_EXPORT_HEADER], rows()),
+        format,
+        filename,
+    )
+
+
+def _invoice_item_rows(items: Iterable[InvoiceItem]) -> Iterator[List[Any]]:
+    """明細を出力行に変換"""
+    for item in items:
+        yield [item.management_no, item.work_content, item.total_hours]
+
 
-    # ヘッダー
-    writer.writerow(['管理No', '委託業務内容', '実工数'])
+def _iter_export(format: str, header: List[str], rows: Iterable[List[Any]]) -> Iterator[bytes]:
+    """指定形式の出力をチャンク単位で生成"""
+    if format == EXPORT_FORMAT_XLSX:
+        return iter_xlsx(header, rows)
+    return iter_csv(header, rows)
 
-    # データ行
-    for item in preview.items:
-        writer.writerow([
-            item.management_no,
-            item.work_content,
-            f"{item.total_hours}"
-        ])
 
-    # StreamingResponseで返す
-    output.seek(0)
+def _aiter_export(format: str, header: List[str], rows: AsyncIterable[List[Any]]) -> AsyncIterator[bytes]:
+    """指定形式の出力をチャンク単位で生成（行を非同期に取得する場合）"""
+    if format == EXPORT_FORMAT_XLSX:
+        return aiter_xlsx(header, rows)
+    return aiter_csv(header, rows)
+
+
+def _export_response(chunks: Any, format: str, filename: str) -> StreamingResponse:
+    """エクスポート用のStreamingResponseを作成"""
     return StreamingResponse(
-        iter([output.getvalue().encode('utf-8-sig')]),  # BOM付きUTF-8
-        media_type="text/csv",
+        chunks,
+        media_type=XLSX_MEDIA_TYPE if format == EXPORT_FORMAT_XLSX else CSV_MEDIA_TYPE,
         headers={
-            "Content-Disposition": f"attachment; filename=invoice_{year}-{month:02d}.csv"
+            "Content-Disposition": f"attachment; filename={filename}"
         }
     )
 
 
 @router.get("", response_model=List[Invoice])
-def list_invoices(
+async def list_invoices(
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: InvoiceRepository = Depends(get_invoice_repository),
 ):
     """請求書一覧を取得"""
-    invoices_response = db.table("invoices").select("*").order(
-        "year", desc=True
-    ).order("month", desc=True).execute()
-
-    if not invoices_response.data:
-        return []
-
-    invoices = []
-    for invoice in invoices_response.data:
-        invoices.append(Invoice(
-            id=UUID(invoice["id"]),
-            year=invoice["year"],
-            month=invoice["month"],
-            status=invoice["status"],
-            closed_at=datetime.fromisoformat(invoice["closed_at"].replace("Z", "+00:00")) if invoice.get("closed_at") else None,
-            closed_by=UUID(invoice["closed_by"]) if invoice.get("closed_by") else None,
-            created_at=datetime.fromisoformat(invoice["created_at"].replace("Z", "+00:00")),
-            updated_at=datetime.fromisoformat(invoice["updated_at"].replace("Z", "+00:00"))
-        ))
-
-    return invoices
+    return [_invoice_from_row(invoice) for invoice in await repo.list_headers()]
 
 
 @router.delete("/{invoice_id}")
-def delete_invoice(
+async def delete_invoice(
     invoice_id: UUID,
     current_user: Dict[str, Any] = Depends(require_admin),
-    db: Client = Depends(get_db),
+    repo: InvoiceRepository = Depends(get_invoice_repository),
 ):
     """請求書を削除（管理者のみ、CASCADE）"""
     # 既存の請求書を確認
-    existing = db.table("invoices").select("*").eq("id", str(invoice_id)).execute()
+    invoice = await repo.get(str(invoice_id))
 
-    if not existing.data:
+    if not invoice:
         raise HTTPException(status_code=404, detail="請求書が見つかりません")
 
-    # 明細を削除
-    db.table("invoice_items").delete().eq("invoice_id", str(invoice_id)).execute()
-
-    # 請求書を削除
-    db.table("invoices").delete().eq("id", str(invoice_id)).execute()
+    # 明細・請求書を削除
+    await repo.delete(str(invoice_id))
+    _invalidate_export_cache(invoice["year"], invoice["month"])
 
     return {"message": "請求書を削除しました"}
+
+
+@router.post("/{invoice_id}/reopen", response_model=Invoice)
+async def reopen_invoice(
+    invoice_id: UUID,
+    current_user: Dict[str, Any] = Depends(require_admin),
+    repo: InvoiceRepository = Depends(get_invoice_repository),
+):
+    """確定済みの請求書を下書きに戻す（管理者のみ）"""
+    invoice = await repo.get(str(invoice_id))
+
+    if not invoice:
+        raise HTTPException(status_code=404, detail="請求書が見つかりません")
+
+    if invoice["status"] != INVOICE_STATUS_CLOSED:
+        raise HTTPException(status_code=400, detail="確定済みの請求書ではありません")
+
+    updated = await repo.reopen(str(invoice_id))
+
+    if not updated:
+        raise HTTPException(status_code=500, detail="請求書の更新に失敗しました")
+
+    _invalidate_export_cache(invoice["year"], invoice["month"])
+
+    return _invoice_from_row(updated)
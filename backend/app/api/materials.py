@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 from supabase import Client
 from typing import Optional, Dict, Any, List
 from uuid import UUID
-import uuid
 from datetime import datetime
+import mimetypes
 import os
 from pathlib import Path
 import logging
@@ -11,16 +13,44 @@ import logging
 logger = logging.getLogger(__name__)
 
 from app.core.database import get_db
-from app.api.auth import get_current_user
+from app.core.config import settings
+from app.services.uploads import stage_upload, discard_staged, UploadTooLargeError
+from app.services.storage import get_storage, content_addressed_key, LocalStorage
+from app.services.file_response import RangeFileResponse, content_disposition
+from app.services.material_files import delete_if_unreferenced
+from app.services.material_search import search_materials_hierarchical
+from app.services.zip_stream import ZipEntry, iter_zip
+from app.services.material_text_index import (
+    schedule_material_text_extraction,
+    search_material_texts,
+)
+from app.api.auth import get_current_user, require_admin
 from app.schemas.material import (
     MaterialCreate,
     MaterialResponse,
+    MaterialSearchResult,
+    MaterialTextSearchResult,
     MaterialSearchParams,
 )
 
 router = APIRouter()
 
 
+def _release_material(db: Client, material_id: str) -> None:
+    """資料行を削除し、最後の参照だった場合はファイルも削除
+
+    削除までの間に同じ内容のアップロードが参照を登録した場合はファイルを残す（delete_if_unreferenced）
+    """
+    response = db.rpc("release_material", {"p_material_id": material_id}).execute()
+    for released in response.data or []:
+        if released["remaining_refs"] > 0:
+            continue
+        try:
+            delete_if_unreferenced(db, get_storage(), released["file_path"])
+        except Exception as e:
+            logger.warning(f"Failed to delete file {released['file_path']}: {e}")
+
+
 @router.post("/upload", response_model=MaterialResponse)
 async def upload_material(
     file: UploadFile = File(...),
@@ -51,21 +81,18 @@ async def upload_material(
         if scope == "tonnage" and not tonnage:
             raise HTTPException(status_code=400, detail="scope=tonnageの場合、tonnageは必須です")
 
-        # ファイル保存（実際の運用ではMinIOやS3を使用）
-        upload_dir = Path("./uploads/materials")
-        upload_dir.mkdir(parents=True, exist_ok=True)
+        # ファイル保存（STORAGE_BACKENDで指定したストレージへ）
+        # チャンク単位で一時ファイルに受信し、完了後にストレージへ保存する
+        staged = await stage_upload(
+            file,
+            staging_dir=Path(settings.UPLOAD_ROOT) / ".staging",
+            max_bytes=settings.MATERIAL_MAX_UPLOAD_BYTES,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        )
 
-        file_id = str(uuid.uuid4())
+        # 内容ハッシュをキーにして保存（同一内容のファイルは既存のものを参照する）
         file_extension = os.path.splitext(file.filename)[1]
-        file_path = f"materials/{file_id}{file_extension}"
-        full_path = upload_dir / f"{file_id}{file_extension}"
-
-        # ファイル書き込み
-        content = await file.read()
-        with open(full_path, "wb") as f:
-            f.write(content)
-
-        file_size = len(content)
+        file_path = content_addressed_key(staged.sha256, file_extension)
 
         # DBに登録
         material_data = {
@@ -76,19 +103,46 @@ async def upload_material(
             "series": series,
             "tonnage": tonnage,
             "file_path": file_path,
-            "file_size": file_size,
+            "file_size": staged.size,
+            "content_sha256": staged.sha256,
             "uploaded_by": current_user["id"],
         }
 
-        result = db.table("materials").insert(material_data).execute()
-
-        if not result.data:
-            raise HTTPException(status_code=500, detail="資料の登録に失敗しました")
-
-        return result.data[0]
+        try:
+            # 先に行を登録して参照を確保してから、ファイルが無い場合のみ保存する
+            # （削除側は退避後に参照数を再確認するため、登録後の削除はファイルを元に戻し、
+            #   登録前に退避されたファイルは存在確認で無いと判定されて保存し直す。app.services.material_files参照）
+            # 同期クライアントのためスレッドプールで実行（イベントループをブロックしない）
+            result = await run_in_threadpool(db.table("materials").insert(material_data).execute)
+
+            if not result.data:
+                raise HTTPException(status_code=500, detail="資料の登録に失敗しました")
+
+            material = result.data[0]
+            storage = get_storage()
+            try:
+                if await run_in_threadpool(storage.exists, file_path):
+                    logger.info(f"Material file deduplicated: {file_path}")
+                else:
+                    await run_in_threadpool(storage.put_file, file_path, staged.path, file.content_type)
+            except Exception:
+                await run_in_threadpool(_release_material, db, material["id"])
+                raise
+        finally:
+            await run_in_threadpool(discard_staged, staged.path)
+
+        # 全文検索用のテキスト抽出（PDF・画像のみ、応答は抽出完了を待たない）
+        schedule_material_text_extraction(db, staged.sha256, file_path)
+
+        return material
 
     except HTTPException:
         raise
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=413,
+            detail=f"ファイルサイズが上限（{e.max_bytes // (1024 * 1024)}MB）を超えています"
+        )
     except Exception as e:
         logger.error(f"Material upload failed: {e}", exc_info=True)
         raise HTTPException(
@@ -97,7 +151,7 @@ async def upload_material(
         )
 
 
-@router.get("/search", response_model=List[MaterialResponse])
+@router.get("/search", response_model=List[MaterialSearchResult])
 def search_materials(
     machine_no: Optional[str] = Query(None, description="機番で検索"),
     model: Optional[str] = Query(None, description="機種で検索"),
@@ -112,104 +166,17 @@ def search_materials(
 
     優先度: machine > model > tonnage > series
     例: machine_no指定時は、そのmachine専用 + model共通 + tonnage共通 + series共通を全て返す
+    machine_noのみ指定した場合、model・tonnage・seriesは案件（projects）から自動で解決する
     """
     try:
-        # 検索条件を構築
-        query = db.table("materials").select("*")
-
-        if scope:
-            query = query.eq("scope", scope)
-
-        # 階層検索ロジック
-        if machine_no:
-            # machine_no指定時: machine専用 OR (model一致 AND scope>=model) OR (tonnage一致 AND scope>=tonnage) OR (series一致 AND scope>=series)
-            # Supabaseではor条件が複雑なため、複数クエリで取得して結合
-            results = []
-
-            # 1. machine専用資料
-            machine_results = db.table("materials").select("*") \
-                .eq("scope", "machine") \
-                .eq("machine_no", machine_no).execute()
-            results.extend(machine_results.data or [])
-
-            # 2. model共通資料（machine_noからmodelを推定する必要があるため、projects等から取得）
-            # 簡易実装: modelパラメータが指定されている場合のみ
-            if model:
-                model_results = db.table("materials").select("*") \
-                    .eq("scope", "model") \
-                    .eq("model", model).execute()
-                results.extend(model_results.data or [])
-
-            # 3. tonnage共通資料
-            if tonnage:
-                tonnage_results = db.table("materials").select("*") \
-                    .eq("scope", "tonnage") \
-                    .eq("tonnage", tonnage).execute()
-                results.extend(tonnage_results.data or [])
-
-            # 4. series共通資料
-            if series:
-                series_results = db.table("materials").select("*") \
-                    .eq("scope", "series") \
-                    .eq("series", series).execute()
-                results.extend(series_results.data or [])
-
-            # 重複削除（IDでユニーク化）
-            unique_results = {item["id"]: item for item in results}.values()
-            return list(unique_results)
-
-        elif model:
-            # model指定時: model専用 + tonnage共通 + series共通
-            results = []
-
-            model_results = db.table("materials").select("*") \
-                .eq("scope", "model") \
-                .eq("model", model).execute()
-            results.extend(model_results.data or [])
-
-            if tonnage:
-                tonnage_results = db.table("materials").select("*") \
-                    .eq("scope", "tonnage") \
-                    .eq("tonnage", tonnage).execute()
-                results.extend(tonnage_results.data or [])
-
-            if series:
-                series_results = db.table("materials").select("*") \
-                    .eq("scope", "series") \
-                    .eq("series", series).execute()
-                results.extend(series_results.data or [])
-
-            unique_results = {item["id"]: item for item in results}.values()
-            return list(unique_results)
-
-        elif tonnage:
-            # tonnage指定時: tonnage専用 + series共通
-            results = []
-
-            tonnage_results = db.table("materials").select("*") \
-                .eq("scope", "tonnage") \
-                .eq("tonnage", tonnage).execute()
-            results.extend(tonnage_results.data or [])
-
-            if series:
-                series_results = db.table("materials").select("*") \
-                    .eq("scope", "series") \
-                    .eq("series", series).execute()
-                results.extend(series_results.data or [])
-
-            unique_results = {item["id"]: item for item in results}.values()
-            return list(unique_results)
-
-        elif series:
-            # series指定時: series専用のみ
-            query = query.eq("series", series)
-            result = query.execute()
-            return result.data or []
-
-        else:
-            # パラメータなしの場合は全件取得
-            result = query.order("created_at", desc=True).execute()
-            return result.data or []
+        return search_materials_hierarchical(
+            db,
+            machine_no=machine_no,
+            model=model,
+            tonnage=tonnage,
+            series=series,
+            scope=scope,
+        )
 
     except Exception as e:
         logger.error(f"Material search failed: {e}", exc_info=True)
@@ -219,6 +186,90 @@ def search_materials(
         )
 
 
+@router.get("/search/text", response_model=List[MaterialTextSearchResult])
+def search_material_text(
+    q: str = Query(..., min_length=2, description="本文の検索語（部分一致）"),
+    limit: int = Query(50, ge=1, le=200, description="最大件数"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_db),
+):
+    """
+    資料の本文検索
+
+    アップロード時にバックグラウンドで抽出したPDF・画像のテキストを部分一致で検索する
+    （テキストレイヤーの無いページはOCR済み）
+    """
+    try:
+        return search_material_texts(db, q, limit)
+
+    except Exception as e:
+        logger.error(f"Material text search failed: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="資料の本文検索に失敗しました"
+        )
+
+
+def _bundle_entries(materials: List[Dict[str, Any]]) -> List[ZipEntry]:
+    """資料をZIPのエントリに変換（スコープごとのフォルダに格納、同名ファイルは連番を付与）"""
+    storage = get_storage()
+    used_names = set()
+    entries = []
+    for material in materials:
+        key = material["file_path"]
+        folder = f"{material['priority']}_{material['matched_scope']}" if material.get("matched_scope") else "other"
+        stem = material["title"].replace("/", "_").replace("\\", "_")
+        extension = os.path.splitext(key)[1]
+        name = f"{folder}/{stem}{extension}"
+        counter = 2
+        while name in used_names:
+            name = f"{folder}/{stem} ({counter}){extension}"
+            counter += 1
+        used_names.add(name)
+
+        entries.append(ZipEntry(
+            name=name,
+            open_chunks=lambda key=key: storage.iter_chunks(key, settings.MATERIAL_BUNDLE_CHUNK_SIZE),
+            modified_at=datetime.fromisoformat(material["created_at"]) if material.get("created_at") else None,
+        ))
+    return entries
+
+
+@router.get("/bundle")
+def download_material_bundle(
+    machine_no: Optional[str] = Query(None, description="機番"),
+    project_id: Optional[UUID] = Query(None, description="案件ID（案件の機番で検索）"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_db),
+):
+    """
+    機番に該当する資料をZIPで一括ダウンロード
+
+    資料は階層的スコープ検索（machine > model > tonnage > series）で解決し、
+    ZIPはファイルをチャンク単位で読みながら逐次生成して送信する（アーカイブ全体を保持しない）
+    """
+    if project_id:
+        project = db.table("projects").select("machine_no").eq("id", str(project_id)).execute()
+        if not project.data:
+            raise HTTPException(status_code=404, detail="案件が見つかりません")
+        machine_no = project.data[0].get("machine_no")
+        if not machine_no:
+            raise HTTPException(status_code=400, detail="案件に機番が登録されていません")
+
+    if not machine_no:
+        raise HTTPException(status_code=400, detail="machine_noまたはproject_idを指定してください")
+
+    materials = search_materials_hierarchical(db, machine_no=machine_no)
+    if not materials:
+        raise HTTPException(status_code=404, detail="該当する資料がありません")
+
+    return StreamingResponse(
+        iter_zip(_bundle_entries(materials)),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(f"{machine_no}_資料.zip")},
+    )
+
+
 @router.get("/{material_id}", response_model=MaterialResponse)
 def get_material(
     material_id: UUID,
@@ -234,6 +285,79 @@ def get_material(
     return result.data[0]
 
 
+@router.get("/{material_id}/download")
+def download_material(
+    material_id: UUID,
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_db),
+):
+    """
+    資料ファイルをダウンロード
+
+    - オブジェクトストレージ: 署名付きURLへリダイレクト（アプリを経由せず直接取得）
+    - ローカルストレージ: Range / If-Range / If-None-Match に対応して返す
+      （LOCAL_STORAGE_ACCEL_REDIRECT_PREFIX設定時はリバースプロキシに送信を委譲）
+    """
+    result = db.table("materials").select("*").eq("id", str(material_id)).execute()
+
+    if not result.data:
+        raise HTTPException(status_code=404, detail="資料が見つかりません")
+
+    material = result.data[0]
+    key = material["file_path"]
+    filename = f"{material['title']}{os.path.splitext(key)[1]}"
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    etag = f'"{material["content_sha256"]}"' if material.get("content_sha256") else None
+
+    storage = get_storage()
+    presigned_url = storage.presigned_download_url(key, filename)
+    if presigned_url:
+        return RedirectResponse(presigned_url, status_code=307)
+
+    if not isinstance(storage, LocalStorage) or not storage.exists(key):
+        raise HTTPException(status_code=404, detail="資料ファイルが見つかりません")
+
+    if settings.LOCAL_STORAGE_ACCEL_REDIRECT_PREFIX:
+        # Range・条件付きリクエストの処理とファイル送信はリバースプロキシが行う
+        headers = {
+            "X-Accel-Redirect": settings.LOCAL_STORAGE_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + key,
+            "Content-Disposition": content_disposition(filename),
+        }
+        if etag:
+            headers["ETag"] = etag
+        return Response(headers=headers, media_type=media_type)
+
+    return RangeFileResponse(
+        storage.path_for(key),
+        request,
+        media_type=media_type,
+        filename=filename,
+        etag=etag,
+    )
+
+
+@router.post("/{material_id}/extract-text", status_code=202)
+async def extract_material_text(
+    material_id: UUID,
+    current_user: Dict[str, Any] = Depends(require_admin),
+    db: Client = Depends(get_db),
+):
+    """資料のテキストを再抽出（抽出失敗時などに使用、管理者のみ）"""
+    result = await run_in_threadpool(
+        db.table("materials").select("file_path, content_sha256").eq("id", str(material_id)).execute
+    )
+
+    if not result.data:
+        raise HTTPException(status_code=404, detail="資料が見つかりません")
+
+    material = result.data[0]
+    if not schedule_material_text_extraction(db, material["content_sha256"], material["file_path"], force=True):
+        raise HTTPException(status_code=400, detail="テキスト抽出に対応していない資料です")
+
+    return {"message": "テキスト抽出を開始しました"}
+
+
 @router.delete("/{material_id}")
 def delete_material(
     material_id: UUID,
@@ -253,15 +377,7 @@ def delete_material(
     if material["uploaded_by"] != current_user["id"] and current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="この資料を削除する権限がありません")
 
-    # ファイル削除（実際の運用ではMinIO等から削除）
-    try:
-        file_path = Path("./uploads") / material["file_path"]
-        if file_path.exists():
-            file_path.unlink()
-    except Exception as e:
-        logger.warning(f"Failed to delete file {material['file_path']}: {e}")
-
-    # DB削除
-    db.table("materials").delete().eq("id", str(material_id)).execute()
+    # DB削除（同じファイルを参照する資料が残っていなければファイルも削除）
+    _release_material(db, str(material_id))
 
     return {"message": "資料を削除しました"}
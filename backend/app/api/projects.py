@@ -1,37 +1,56 @@
 """
 案件管理API
 
-案件の登録・一覧・詳細・更新・削除（論理削除）
+案件の登録・一覧・詳細・更新・削除（論理削除）・委託書PDFの一括取り込み
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from supabase import Client
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from supabase import AsyncClient, Client
 from typing import Optional, Dict, Any, List
+from dataclasses import asdict
+from pathlib import Path
 from uuid import UUID
+import logging
 import uuid
 
-from app.core.database import get_db
+logger = logging.getLogger(__name__)
+
+from app.core.database import get_async_db, get_db
+from app.core.config import settings
 from app.api.auth import get_current_user
+from app.repositories import ProjectFilters, ProjectRepository, get_project_repository
+from app.services.master_cache import aget_master_by_id
+from app.services.material_search import invalidate_machine_profiles
+from app.services.commission_import import (
+    IMPORT_STATUS_CREATED,
+    IMPORT_STATUS_ERROR,
+    IMPORT_STATUS_SKIPPED,
+    parse_commission_pdfs,
+    register_commission_projects,
+)
+from app.services.uploads import stage_upload, discard_staged, UploadTooLargeError
 from app.schemas.project import (
     ProjectCreate,
     ProjectUpdate,
     ProjectResponse,
     ProjectListResponse,
+    ProjectImportResponse,
 )
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
 
 @router.post("", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
-def create_project(
+async def create_project(
     project_data: ProjectCreate,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: ProjectRepository = Depends(get_project_repository),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """案件を新規作成"""
     # 管理Noの重複チェック
-    existing = db.table("projects").select("id").eq("management_no", project_data.management_no).eq("is_active", True).execute()
-    if existing.data:
+    if await repo.management_no_in_use(project_data.management_no):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="この管理Noは既に使用されています"
@@ -46,20 +65,98 @@ def create_project(
         "is_active": True,
     }
 
-    response = db.table("projects").insert(new_project).execute()
+    created = await repo.create(new_project)
 
-    if not response.data:
+    if not created:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="案件の作成に失敗しました"
         )
 
+    invalidate_machine_profiles()
+
     # マスタ名称を取得
-    return _enrich_project_response(db, response.data[0])
+    return await _enrich_project_response(db, created)
+
+
+@router.post("/import", response_model=ProjectImportResponse)
+async def import_projects(
+    files: List[UploadFile] = File(..., description="委託書PDF（複数可）"),
+    dry_run: bool = Query(False, description="登録せずに解析結果のみ返す"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_db),
+):
+    """
+    委託書PDFを一括取り込み
+
+    PDFはプロセスプールで並列に解析し、有効な案件を1回で一括登録する。
+    ファイルごとに登録結果・エラー・警告（マスタに無い名称等）を返す。
+    """
+    if len(files) > settings.COMMISSION_IMPORT_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"一度に取り込めるファイルは{settings.COMMISSION_IMPORT_MAX_FILES}件までです"
+        )
+
+    staged_paths: List[Path] = []
+    try:
+        # 各PDFを一時ファイルに受信（解析プロセスにはパスで渡す）
+        parsed: List[Any] = [None] * len(files)
+        targets: List[int] = []
+        for index, file in enumerate(files):
+            if not (file.filename or "").lower().endswith(".pdf"):
+                parsed[index] = ValueError("PDFファイルではありません")
+                continue
+            try:
+                staged = await stage_upload(
+                    file,
+                    staging_dir=Path(settings.UPLOAD_ROOT) / ".staging",
+                    max_bytes=settings.COMMISSION_PDF_MAX_BYTES,
+                    chunk_size=settings.UPLOAD_CHUNK_SIZE,
+                )
+            except UploadTooLargeError as e:
+                parsed[index] = ValueError(f"ファイルサイズが上限（{e.max_bytes // (1024 * 1024)}MB）を超えています")
+                continue
+            staged_paths.append(staged.path)
+            targets.append(index)
+
+        for index, fields in zip(targets, await parse_commission_pdfs(staged_paths)):
+            parsed[index] = fields
+
+        # 同期クライアントのためスレッドプールで実行（イベントループをブロックしない）
+        results = await run_in_threadpool(
+            register_commission_projects,
+            db,
+            [(file.filename or "", fields) for file, fields in zip(files, parsed)],
+            current_user["id"],
+            dry_run,
+        )
+    except Exception as e:
+        logger.error(f"Commission PDF import failed: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="委託書PDFの取り込みに失敗しました"
+        )
+    finally:
+        for path in staged_paths:
+            await run_in_threadpool(discard_staged, path)
+
+    created = sum(1 for result in results if result.status == IMPORT_STATUS_CREATED)
+    if created:
+        invalidate_machine_profiles()
+
+    return ProjectImportResponse(
+        total=len(results),
+        created=created,
+        skipped=sum(1 for result in results if result.status == IMPORT_STATUS_SKIPPED),
+        failed=sum(1 for result in results if result.status == IMPORT_STATUS_ERROR),
+        dry_run=dry_run,
+        results=[asdict(result) for result in results],
+    )
 
 
 @router.get("", response_model=ProjectListResponse)
-def list_projects(
+async def list_projects(
     page: int = Query(1, ge=1, description="ページ番号"),
     per_page: int = Query(20, ge=1, le=100, description="1ページあたりの件数"),
     shinchoku_id: Optional[UUID] = Query(None, description="進捗IDでフィルタ"),
@@ -68,48 +165,24 @@ def list_projects(
     management_no: Optional[str] = Query(None, description="管理Noで検索"),
     include_inactive: bool = Query(False, description="無効な案件も含める"),
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: ProjectRepository = Depends(get_project_repository),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """案件一覧を取得"""
-    # Supabaseクエリ構築
-    query = db.table("projects").select("*")
-
-    # 論理削除フィルタ
-    if not include_inactive:
-        query = query.eq("is_active", True)
-
-    # フィルタリング
-    if shinchoku_id:
-        query = query.eq("shinchoku_id", str(shinchoku_id))
-    if sagyou_kubun_id:
-        query = query.eq("sagyou_kubun_id", str(sagyou_kubun_id))
-    if machine_no:
-        query = query.ilike("machine_no", f"%{machine_no}%")
-    if management_no:
-        query = query.ilike("management_no", f"%{management_no}%")
-
-    # 総件数取得（カウント用に別クエリ）
-    count_query = db.table("projects").select("id", count="exact")
-    if not include_inactive:
-        count_query = count_query.eq("is_active", True)
-    if shinchoku_id:
-        count_query = count_query.eq("shinchoku_id", str(shinchoku_id))
-    if sagyou_kubun_id:
-        count_query = count_query.eq("sagyou_kubun_id", str(sagyou_kubun_id))
-    if machine_no:
-        count_query = count_query.ilike("machine_no", f"%{machine_no}%")
-    if management_no:
-        count_query = count_query.ilike("management_no", f"%{management_no}%")
-
-    count_response = count_query.execute()
-    total = count_response.count if count_response.count is not None else 0
-
-    # ページネーション
+    filters = ProjectFilters(
+        shinchoku_id=str(shinchoku_id) if shinchoku_id else None,
+        sagyou_kubun_id=str(sagyou_kubun_id) if sagyou_kubun_id else None,
+        machine_no=machine_no,
+        management_no=management_no,
+        include_inactive=include_inactive,
+    )
+
+    # ページネーション（一覧と総件数はリポジトリ内で並行して取得）
     offset = (page - 1) * per_page
-    projects_response = query.order("created_at", desc=True).range(offset, offset + per_page - 1).execute()
+    projects, total = await repo.list_projects(filters, offset, per_page)
 
-    # レスポンスにマスタ名称を追加
-    enriched_projects = [_enrich_project_response(db, p) for p in projects_response.data]
+    # レスポンスにマスタ名称を追加（キャッシュからまとめて解決）
+    enriched_projects = await _enrich_project_responses(db, projects)
 
     return ProjectListResponse(
         projects=enriched_projects,
@@ -120,44 +193,43 @@ def list_projects(
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
-def get_project(
+async def get_project(
     project_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: ProjectRepository = Depends(get_project_repository),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """案件詳細を取得"""
-    response = db.table("projects").select("*").eq("id", str(project_id)).execute()
+    project = await repo.get(str(project_id))
 
-    if not response.data:
+    if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="案件が見つかりません"
         )
 
-    return _enrich_project_response(db, response.data[0])
+    return await _enrich_project_response(db, project)
 
 
 @router.put("/{project_id}", response_model=ProjectResponse)
-def update_project(
+async def update_project(
     project_id: UUID,
     project_data: ProjectUpdate,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: ProjectRepository = Depends(get_project_repository),
+    db: AsyncClient = Depends(get_async_db),
 ):
     """案件を更新"""
-    project_response = db.table("projects").select("*").eq("id", str(project_id)).execute()
-    if not project_response.data:
+    project = await repo.get(str(project_id))
+    if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="案件が見つかりません"
         )
 
-    project = project_response.data[0]
-
     # 管理Noの重複チェック（変更される場合）
     if project_data.management_no and project_data.management_no != project["management_no"]:
-        existing = db.table("projects").select("id").eq("management_no", project_data.management_no).eq("is_active", True).neq("id", str(project_id)).execute()
-        if existing.data:
+        if await repo.management_no_in_use(project_data.management_no, exclude_id=str(project_id)):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="この管理Noは既に使用されています"
@@ -165,69 +237,63 @@ def update_project(
 
     # 更新
     update_data = project_data.model_dump(exclude_unset=True, mode="json")
-    response = db.table("projects").update(update_data).eq("id", str(project_id)).execute()
+    updated = await repo.update(str(project_id), update_data)
 
-    if not response.data:
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="案件の更新に失敗しました"
         )
 
-    return _enrich_project_response(db, response.data[0])
+    invalidate_machine_profiles()
+
+    return await _enrich_project_response(db, updated)
 
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(
+async def delete_project(
     project_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: ProjectRepository = Depends(get_project_repository),
 ):
     """案件を論理削除"""
-    project_response = db.table("projects").select("id").eq("id", str(project_id)).execute()
-    if not project_response.data:
+    if not await repo.get(str(project_id)):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="案件が見つかりません"
         )
 
     # 論理削除
-    db.table("projects").update({"is_active": False}).eq("id", str(project_id)).execute()
+    await repo.deactivate(str(project_id))
+    invalidate_machine_profiles()
     return None
 
 
-def _enrich_project_response(db: Client, project: Dict[str, Any]) -> ProjectResponse:
+# マスタ参照カラム → (マスタテーブル, 名称カラム, レスポンスのキー)
+_MASTER_NAME_FIELDS = [
+    ("machine_series_id", "machine_series_master", "display_name", "machine_series_name"),
+    ("toiawase_id", "master_toiawase", "status_name", "toiawase_name"),
+    ("sagyou_kubun_id", "master_sagyou_kubun", "kubun_name", "sagyou_kubun_name"),
+    ("shinchoku_id", "master_shinchoku", "status_name", "shinchoku_name"),
+]
+
+
+async def _enrich_project_response(db: AsyncClient, project: Dict[str, Any]) -> ProjectResponse:
     """案件レスポンスにマスタ名称を追加"""
-    # マスタ名称を取得
-    machine_series_name = None
-    if project.get("machine_series_id"):
-        ms_response = db.table("machine_series_master").select("display_name").eq("id", project["machine_series_id"]).execute()
-        if ms_response.data:
-            machine_series_name = ms_response.data[0]["display_name"]
-
-    toiawase_name = None
-    if project.get("toiawase_id"):
-        ta_response = db.table("master_toiawase").select("status_name").eq("id", project["toiawase_id"]).execute()
-        if ta_response.data:
-            toiawase_name = ta_response.data[0]["status_name"]
-
-    sagyou_kubun_name = None
-    if project.get("sagyou_kubun_id"):
-        sk_response = db.table("master_sagyou_kubun").select("kubun_name").eq("id", project["sagyou_kubun_id"]).execute()
-        if sk_response.data:
-            sagyou_kubun_name = sk_response.data[0]["kubun_name"]
-
-    shinchoku_name = None
-    if project.get("shinchoku_id"):
-        sc_response = db.table("master_shinchoku").select("status_name").eq("id", project["shinchoku_id"]).execute()
-        if sc_response.data:
-            shinchoku_name = sc_response.data[0]["status_name"]
-
-    response_data = {
-        **project,
-        "machine_series_name": machine_series_name,
-        "toiawase_name": toiawase_name,
-        "sagyou_kubun_name": sagyou_kubun_name,
-        "shinchoku_name": shinchoku_name,
-    }
+    return (await _enrich_project_responses(db, [project]))[0]
+
+
+async def _enrich_project_responses(db: AsyncClient, projects: List[Dict[str, Any]]) -> List[ProjectResponse]:
+    """複数案件のレスポンスにマスタ名称を追加
+
+    マスタ名称はプロセス内キャッシュから解決し、キャッシュミス時のみマスタごとに1クエリ発行する
+    """
+    enriched = []
+    for project in projects:
+        response_data = dict(project)
+        for id_field, table, name_column, name_key in _MASTER_NAME_FIELDS:
+            master = await aget_master_by_id(db, table, project.get(id_field))
+            response_data[name_key] = master[name_column] if master else None
+        enriched.append(ProjectResponse(**response_data))
 
-    return ProjectResponse(**response_data)
\ No newline at end of file
+    return enriched
@@ -1,12 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from supabase import Client
 from typing import Optional, Dict, Any
 from uuid import UUID
 import uuid
 from datetime import date
 
-from app.core.database import get_db
 from app.api.auth import get_current_user
+from app.repositories import WorklogFilters, WorklogRepository, get_worklog_repository
 from app.schemas.worklog import (
     WorkLogCreate,
     WorkLogUpdate,
@@ -18,19 +17,16 @@ router = APIRouter()
 
 
 @router.post("", response_model=WorkLogResponse, status_code=201)
-def create_worklog(
+async def create_worklog(
     worklog_data: WorkLogCreate,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: WorklogRepository = Depends(get_worklog_repository),
 ):
     """工数入力を新規作成"""
     # 案件の存在確認
-    project_response = db.table("projects").select("id, actual_hours").eq("id", str(worklog_data.project_id)).execute()
-    if not project_response.data:
+    if not await repo.project_exists(str(worklog_data.project_id)):
         raise HTTPException(status_code=404, detail="案件が見つかりません")
 
-    project = project_response.data[0]
-
     # 新規工数入力作成
     # データベースに存在するカラムのみを送信
     worklog_dict = worklog_data.model_dump(mode="json")
@@ -50,65 +46,47 @@ def create_worklog(
         new_worklog["work_content"] = worklog_dict["work_content"]
 
     try:
-        worklog_response = db.table("work_logs").insert(new_worklog).execute()
+        created = await repo.create(new_worklog)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"工数入力の作成に失敗しました: {str(e)}"
         )
 
-    if not worklog_response.data:
+    if not created:
         raise HTTPException(
             status_code=500,
             detail="工数入力の作成に失敗しました"
         )
 
-    # 案件の実績工数を更新（分→時間に変換）
-    new_actual_hours = (project.get("actual_hours") or 0) + (worklog_data.duration_minutes / 60.0)
-    db.table("projects").update({"actual_hours": new_actual_hours}).eq("id", str(worklog_data.project_id)).execute()
+    # 案件の実績工数はwork_logsのトリガーで原子的に加算される
 
-    return worklog_response.data[0]
+    return created
 
 
 @router.get("", response_model=WorkLogListResponse)
-def list_worklogs(
+async def list_worklogs(
     page: int = Query(1, ge=1, description="ページ番号"),
     per_page: int = Query(20, ge=1, le=100, description="1ページあたりの件数"),
     project_id: Optional[UUID] = Query(None, description="案件IDでフィルタ"),
     work_date: Optional[date] = Query(None, description="作業日でフィルタ"),
     user_id: Optional[UUID] = Query(None, description="ユーザーIDでフィルタ"),
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: WorklogRepository = Depends(get_worklog_repository),
 ):
     """工数入力一覧を取得"""
-    query = db.table("work_logs").select("*")
-
-    # フィルタリング
-    if project_id:
-        query = query.eq("project_id", str(project_id))
-    if work_date:
-        query = query.eq("work_date", work_date.isoformat())
-    if user_id:
-        query = query.eq("user_id", str(user_id))
-
-    # 総件数取得
-    count_query = db.table("work_logs").select("id", count="exact")
-    if project_id:
-        count_query = count_query.eq("project_id", str(project_id))
-    if work_date:
-        count_query = count_query.eq("work_date", work_date.isoformat())
-    if user_id:
-        count_query = count_query.eq("user_id", str(user_id))
-
-    count_response = count_query.execute()
-    total = count_response.count if count_response.count is not None else 0
+    filters = WorklogFilters(
+        project_id=str(project_id) if project_id else None,
+        work_date=work_date.isoformat() if work_date else None,
+        user_id=str(user_id) if user_id else None,
+    )
 
-    # ページネーション
+    # ページネーション（一覧と総件数はリポジトリ内で並行して取得）
     offset = (page - 1) * per_page
-    worklogs_response = query.order("work_date", desc=True).order("created_at", desc=True).range(offset, offset + per_page - 1).execute()
+    worklogs, total = await repo.list_worklogs(filters, offset, per_page)
 
     return WorkLogListResponse(
-        worklogs=worklogs_response.data,
+        worklogs=worklogs,
         total=total,
         page=page,
         per_page=per_page,
@@ -116,39 +94,34 @@ def list_worklogs(
 
 
 @router.get("/{worklog_id}", response_model=WorkLogResponse)
-def get_worklog(
+async def get_worklog(
     worklog_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: WorklogRepository = Depends(get_worklog_repository),
 ):
     """工数入力詳細を取得"""
-    response = db.table("work_logs").select("*").eq("id", str(worklog_id)).execute()
-    if not response.data:
+    worklog = await repo.get(str(worklog_id))
+    if not worklog:
         raise HTTPException(status_code=404, detail="工数入力が見つかりません")
-    return response.data[0]
+    return worklog
 
 
 @router.put("/{worklog_id}", response_model=WorkLogResponse)
-def update_worklog(
+async def update_worklog(
     worklog_id: UUID,
     worklog_data: WorkLogUpdate,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: WorklogRepository = Depends(get_worklog_repository),
 ):
     """工数入力を更新"""
-    worklog_response = db.table("work_logs").select("*").eq("id", str(worklog_id)).execute()
-    if not worklog_response.data:
+    worklog = await repo.get(str(worklog_id))
+    if not worklog:
         raise HTTPException(status_code=404, detail="工数入力が見つかりません")
 
-    worklog = worklog_response.data[0]
-
     # 権限チェック: 自分の工数入力のみ更新可能
     if worklog["user_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="この工数入力を更新する権限がありません")
 
-    old_project_id = worklog["project_id"]
-    old_duration = worklog["duration_minutes"]
-
     # 更新データ（データベースに存在するカラムのみ）
     worklog_dict = worklog_data.model_dump(exclude_unset=True, mode="json")
     update_data = {}
@@ -166,137 +139,55 @@ def update_worklog(
     if "work_content" in worklog_dict:
         update_data["work_content"] = worklog_dict["work_content"]
 
-    new_project_id = update_data.get("project_id", old_project_id)
-    new_duration = update_data.get("duration_minutes", old_duration)
-
-    # プロジェクトが変更される場合、両方のプロジェクトの実績工数を調整
-    if new_project_id != old_project_id:
-        # 旧プロジェクトから実績工数を減算（分→時間に変換）
-        old_project_response = db.table("projects").select("actual_hours").eq("id", old_project_id).execute()
-        if old_project_response.data:
-            old_project = old_project_response.data[0]
-            old_actual_hours = (old_project.get("actual_hours") or 0) - (old_duration / 60.0)
-            db.table("projects").update({"actual_hours": max(0, old_actual_hours)}).eq("id", old_project_id).execute()
-
-        # 新プロジェクトに実績工数を加算（分→時間に変換）
-        new_project_response = db.table("projects").select("actual_hours").eq("id", new_project_id).execute()
-        if new_project_response.data:
-            new_project = new_project_response.data[0]
-            new_actual_hours = (new_project.get("actual_hours") or 0) + (new_duration / 60.0)
-            db.table("projects").update({"actual_hours": new_actual_hours}).eq("id", new_project_id).execute()
-
-    # 作業時間のみが変更される場合（プロジェクトは同じ）、実績工数を調整（分→時間に変換）
-    elif new_duration != old_duration:
-        project_response = db.table("projects").select("actual_hours").eq("id", old_project_id).execute()
-        if project_response.data:
-            project = project_response.data[0]
-            new_actual_hours = (project.get("actual_hours") or 0) - (old_duration / 60.0) + (new_duration / 60.0)
-            db.table("projects").update({"actual_hours": new_actual_hours}).eq("id", old_project_id).execute()
+    # 案件の実績工数はwork_logsのトリガーで原子的に調整される（案件の付け替え・作業時間の変更とも）
 
     # 更新
     try:
-        response = db.table("work_logs").update(update_data).eq("id", str(worklog_id)).execute()
+        updated = await repo.update(str(worklog_id), update_data)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"工数入力の更新に失敗しました: {str(e)}"
         )
 
-    if not response.data:
+    if not updated:
         raise HTTPException(status_code=500, detail="工数入力の更新に失敗しました")
 
-    return response.data[0]
+    return updated
 
 
 @router.delete("/{worklog_id}", status_code=204)
-def delete_worklog(
+async def delete_worklog(
     worklog_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: WorklogRepository = Depends(get_worklog_repository),
 ):
     """工数入力を削除"""
-    worklog_response = db.table("work_logs").select("*").eq("id", str(worklog_id)).execute()
-    if not worklog_response.data:
+    worklog = await repo.get(str(worklog_id))
+    if not worklog:
         raise HTTPException(status_code=404, detail="工数入力が見つかりません")
 
-    worklog = worklog_response.data[0]
-
     # 権限チェック: 自分の工数入力のみ削除可能
     if worklog["user_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="この工数入力を削除する権限がありません")
 
-    # 案件の実績工数を減算（分→時間に変換）
-    project_response = db.table("projects").select("actual_hours").eq("id", worklog["project_id"]).execute()
-    if project_response.data:
-        project = project_response.data[0]
-        new_actual_hours = (project.get("actual_hours") or 0) - (worklog["duration_minutes"] / 60.0)
-        db.table("projects").update({"actual_hours": max(0, new_actual_hours)}).eq("id", worklog["project_id"]).execute()
-
-    # 削除
-    db.table("work_logs").delete().eq("id", str(worklog_id)).execute()
+    # 削除（案件の実績工数はwork_logsのトリガーで原子的に減算される）
+    await repo.delete(str(worklog_id))
     return None
 
 
 @router.get("/summary/{project_id}")
-def get_worklog_summary(
+async def get_worklog_summary(
     project_id: UUID,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Client = Depends(get_db),
+    repo: WorklogRepository = Depends(get_worklog_repository),
 ):
-    """案件の工数集計を取得"""
-    # 案件の存在確認
-    project_response = db.table("projects").select("management_no, estimated_hours, actual_hours").eq("id", str(project_id)).execute()
-    if not project_response.data:
-        raise HTTPException(status_code=404, detail="案件が見つかりません")
-
-    project = project_response.data[0]
-
-    # 全工数データを取得
-    worklogs_response = db.table("work_logs").select("user_id, duration_minutes, work_date").eq("project_id", str(project_id)).execute()
-    worklogs = worklogs_response.data
+    """案件の工数集計を取得
 
-    # ユーザー名を取得
-    user_ids = list(set([w["user_id"] for w in worklogs]))
-    users_map = {}
-    if user_ids:
-        users_response = db.table("users").select("id, username").in_("id", user_ids).execute()
-        users_map = {u["id"]: u["username"] for u in users_response.data}
-
-    # ユーザー別集計
-    user_summary_dict = {}
-    for worklog in worklogs:
-        user_id = worklog["user_id"]
-        if user_id not in user_summary_dict:
-            user_summary_dict[user_id] = {
-                "username": users_map.get(user_id, "Unknown"),
-                "total_minutes": 0,
-                "entry_count": 0
-            }
-        user_summary_dict[user_id]["total_minutes"] += worklog["duration_minutes"]
-        user_summary_dict[user_id]["entry_count"] += 1
-
-    user_summary = list(user_summary_dict.values())
-
-    # 日別集計
-    daily_summary_dict = {}
-    for worklog in worklogs:
-        work_date = worklog["work_date"]
-        if work_date not in daily_summary_dict:
-            daily_summary_dict[work_date] = {
-                "work_date": work_date,
-                "total_minutes": 0,
-                "entry_count": 0
-            }
-        daily_summary_dict[work_date]["total_minutes"] += worklog["duration_minutes"]
-        daily_summary_dict[work_date]["entry_count"] += 1
-
-    daily_summary = sorted(daily_summary_dict.values(), key=lambda x: x["work_date"], reverse=True)
+    ユーザー別・日別の集計はDB側で実行し、案件の取得と並行して待機する
+    """
+    summary = await repo.get_summary(str(project_id))
+    if summary is None:
+        raise HTTPException(status_code=404, detail="案件が見つかりません")
 
-    return {
-        "project_id": str(project_id),
-        "management_no": project["management_no"],
-        "estimated_hours": project.get("estimated_hours") or 0,
-        "actual_hours": project.get("actual_hours") or 0,
-        "by_user": user_summary,
-        "by_date": daily_summary,
-    }
\ No newline at end of file
+    return {"project_id": str(project_id), **summary}
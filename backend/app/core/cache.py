@@ -0,0 +1,124 @@
+"""
+プロセス内キャッシュ
+
+TTL付きLRUキャッシュと、生成したキャッシュの統計情報を集約するレジストリ
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# 生成済みキャッシュ（名前 → インスタンス）
+_registry: Dict[str, "TTLCache"] = {}
+_registry_lock = threading.Lock()
+
+_MISSING = object()
+
+
+class TTLCache:
+    """スレッドセーフなTTL付きLRUキャッシュ（ヒット/ミス数を記録）"""
+
+    def __init__(self, name: str, ttl_seconds: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # invalidate/clearのたびに増やす（読み込み中に破棄された値を登録しないため）
+        self._generation = 0
+
+        with _registry_lock:
+            _registry[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """キーの値を取得（期限切れ・未登録ならdefault）"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """値を登録（容量超過時は最も古いエントリを破棄）"""
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def generation(self) -> int:
+        """破棄の世代（読み込み前に取得し、set_if_currentに渡す）"""
+        with self._lock:
+            return self._generation
+
+    def set_if_current(self, key: Hashable, value: Any, generation: int) -> bool:
+        """読み込み開始後に破棄されていなければ値を登録（登録した場合はTrue）"""
+        with self._lock:
+            if self._generation != generation:
+                return False
+            self._store(key, value, None)
+            return True
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """キャッシュになければloaderで取得して登録（読み込み中に破棄された場合は登録しない）"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self.generation
+            value = loader()
+            self.set_if_current(key, value, generation)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """指定キーを破棄"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+
+    def keys(self) -> List[Hashable]:
+        """登録中のキー一覧（期限切れを含む）"""
+        with self._lock:
+            return list(self._data.keys())
+
+    def clear(self) -> None:
+        """全エントリを破棄"""
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット/ミス数などの統計情報"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """全キャッシュの統計情報を取得"""
+    with _registry_lock:
+        caches = list(_registry.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -1,20 +1,233 @@
-from supabase import create_client, Client
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from supabase import AsyncClient, Client, acreate_client, create_client
 from app.core.config import settings
+from app.core.db_instrumentation import InstrumentedPool, is_instrumented
+
+logger = logging.getLogger(__name__)
+
+# Supabase Clientのシングルトン（スレッドプールから共有される）
+_supabase_client: Optional[Client] = None
+_supabase_client_lock = threading.Lock()
+# 非同期Supabase Clientのシングルトン（async defのエンドポイント用）
+_async_supabase_client: Optional[AsyncClient] = None
+_async_supabase_client_lock = asyncio.Lock()
+# PostgreSQLへ直接接続するコネクションプール（DATA_BACKEND=postgres の場合のみ作成）
+_postgres_pool: Any = None
+_postgres_pool_lock = asyncio.Lock()
+
+DATA_BACKEND_POSTGREST = "postgrest"
+DATA_BACKEND_POSTGRES = "postgres"
+
+# 起動時の接続確認に使う軽量なクエリの対象
+_WARMUP_TABLE = "master_shinchoku"
+
+
+def _check_supabase_settings() -> None:
+    if not settings.SUPABASE_URL or not settings.SUPABASE_ANON_KEY:
+        raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables")
+
+
+def _session_options(session: Any) -> Dict[str, Any]:
+    """PostgREST用HTTPセッションの設定（接続先・ヘッダ・タイムアウトは既存のセッションを引き継ぐ）"""
+    return {
+        "base_url": session.base_url,
+        "headers": session.headers,
+        "timeout": session.timeout,
+        "follow_redirects": True,
+        "http2": settings.SUPABASE_HTTP2,
+        "limits": httpx.Limits(
+            max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.SUPABASE_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    }
+
+
+def _create_supabase_client() -> Client:
+    client = create_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
+    # PostgRESTのHTTPセッションを接続数上限・Keep-Alive・HTTP/2を設定したものに差し替える
+    # （anonキーのみで使用し認証イベントは発生しないため、PostgRESTクライアントは作り直されない）
+    postgrest = client.postgrest
+    default_session = postgrest.session
+    postgrest.session = httpx.Client(**_session_options(default_session))
+    default_session.close()
+    return client
 
-# Supabase Clientのシングルトン
-_supabase_client: Client = None
+
+async def _create_async_supabase_client() -> AsyncClient:
+    client = await acreate_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
+    postgrest = client.postgrest
+    default_session = postgrest.session
+    postgrest.session = httpx.AsyncClient(**_session_options(default_session))
+    await default_session.aclose()
+    return client
 
 
 def get_supabase_client() -> Client:
-    """Supabase Clientを取得（シングルトン）"""
+    """Supabase Clientを取得（シングルトン、通常はアプリ起動時に作成済み）"""
     global _supabase_client
     if _supabase_client is None:
-        if not settings.SUPABASE_URL or not settings.SUPABASE_ANON_KEY:
-            raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables")
-        _supabase_client = create_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
+        with _supabase_client_lock:
+            if _supabase_client is None:
+                _check_supabase_settings()
+                _supabase_client = _create_supabase_client()
     return _supabase_client
 
 
+async def get_async_supabase_client() -> AsyncClient:
+    """非同期Supabase Clientを取得（シングルトン、通常はアプリ起動時に作成済み）
+
+    クエリは `await query.execute()` で実行し、スレッドプールを使わずにイベントループ上で待機する
+    """
+    global _async_supabase_client
+    if _async_supabase_client is None:
+        async with _async_supabase_client_lock:
+            if _async_supabase_client is None:
+                _check_supabase_settings()
+                _async_supabase_client = await _create_async_supabase_client()
+    return _async_supabase_client
+
+
+def _warmup_sync(client: Client) -> None:
+    client.table(_WARMUP_TABLE).select("id").limit(1).execute()
+
+
+async def _warmup_async(client: AsyncClient) -> None:
+    await client.table(_WARMUP_TABLE).select("id").limit(1).execute()
+
+
+async def init_supabase_clients() -> None:
+    """Supabase Clientを作成し、PostgRESTへの接続を確立しておく（アプリ起動時に呼び出す）
+
+    SUPABASE_WARMUP_CONNECTIONS件の軽量なクエリを同時に発行し、最初のリクエストが
+    TCP/TLSハンドシェイクの待ち時間を負わないようにする。接続に失敗しても起動は継続する
+    """
+    sync_client = await run_in_threadpool(get_supabase_client)
+    async_client = await get_async_supabase_client()
+
+    count = settings.SUPABASE_WARMUP_CONNECTIONS
+    if count <= 0:
+        return
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(_warmup_async(async_client) for _ in range(count)),
+            *(run_in_threadpool(_warmup_sync, sync_client) for _ in range(count)),
+        )
+    except Exception as e:
+        logger.warning(f"Supabase connection warmup failed: {e}")
+        return
+    logger.info(f"Supabase connections warmed up: {count} x 2 requests in {time.perf_counter() - started:.3f}s")
+
+
+async def close_supabase_clients() -> None:
+    """Supabase ClientのHTTPセッションを閉じる（アプリ終了時に呼び出す）"""
+    global _supabase_client, _async_supabase_client
+    if _supabase_client is not None:
+        client, _supabase_client = _supabase_client, None
+        await run_in_threadpool(client.postgrest.session.close)
+    if _async_supabase_client is not None:
+        async_client, _async_supabase_client = _async_supabase_client, None
+        await async_client.postgrest.session.aclose()
+
+
 def get_db() -> Client:
     """FastAPI Dependency用のSupabase Client取得関数"""
-    return get_supabase_client()
\ No newline at end of file
+    return get_supabase_client()
+
+
+async def get_async_db() -> AsyncClient:
+    """FastAPI Dependency用の非同期Supabase Client取得関数"""
+    return await get_async_supabase_client()
+
+
+def use_postgres_backend() -> bool:
+    """集計・一覧系の読み取りをPostgreSQLへの直接接続で行うか"""
+    if settings.DATA_BACKEND not in (DATA_BACKEND_POSTGREST, DATA_BACKEND_POSTGRES):
+        raise ValueError(f"未対応のDATA_BACKENDです: {settings.DATA_BACKEND}")
+    return settings.DATA_BACKEND == DATA_BACKEND_POSTGRES
+
+
+async def _init_postgres_connection(connection: Any) -> None:
+    # json/jsonbはPostgRESTと同じくPythonのdict/listで受け取る
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        )
+
+
+async def create_postgres_pool() -> Any:
+    """PostgreSQLのコネクションプールを作成（アプリ起動時に呼び出す）"""
+    global _postgres_pool
+    if _postgres_pool is None:
+        async with _postgres_pool_lock:
+            if _postgres_pool is None:
+                import asyncpg
+
+                pool = await asyncpg.create_pool(
+                    settings.DATABASE_URL,
+                    min_size=settings.DATABASE_POOL_MIN_SIZE,
+                    max_size=settings.DATABASE_POOL_MAX_SIZE,
+                    command_timeout=settings.DATABASE_COMMAND_TIMEOUT_SECONDS,
+                    statement_cache_size=settings.DATABASE_STATEMENT_CACHE_SIZE,
+                    init=_init_postgres_connection,
+                )
+                if is_instrumented():
+                    pool = InstrumentedPool(pool)
+                _postgres_pool = pool
+    return _postgres_pool
+
+
+async def close_postgres_pool() -> None:
+    """PostgreSQLのコネクションプールを閉じる（アプリ終了時に呼び出す）"""
+    global _postgres_pool
+    if _postgres_pool is not None:
+        pool, _postgres_pool = _postgres_pool, None
+        await pool.close()
+
+
+async def get_postgres_pool() -> Any:
+    """FastAPI Dependency用のPostgreSQLコネクションプール取得関数"""
+    return await create_postgres_pool()
+
+
+def _http_pool_stats(session: Any) -> Dict[str, Any]:
+    """httpxのコネクションプールの利用状況（httpcoreの内部状態から取得）"""
+    pool = getattr(getattr(session, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", None) or [])
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {
+        "http2": settings.SUPABASE_HTTP2,
+        "max_connections": settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": settings.SUPABASE_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        "connections": len(connections),
+        "active": len(connections) - idle,
+        "idle": idle,
+        "in_flight_requests": len(getattr(pool, "_requests", None) or []),
+    }
+
+
+def get_db_pool_stats() -> Dict[str, Any]:
+    """DB接続（PostgREST・PostgreSQL直接接続）のコネクションプール利用状況"""
+    stats: Dict[str, Any] = {}
+    if _supabase_client is not None:
+        stats["postgrest_sync"] = _http_pool_stats(_supabase_client.postgrest.session)
+    if _async_supabase_client is not None:
+        stats["postgrest_async"] = _http_pool_stats(_async_supabase_client.postgrest.session)
+    if _postgres_pool is not None:
+        stats["postgres"] = {
+            "min_size": _postgres_pool.get_min_size(),
+            "max_size": _postgres_pool.get_max_size(),
+            "size": _postgres_pool.get_size(),
+            "idle": _postgres_pool.get_idle_size(),
+        }
+    return stats
@@ -0,0 +1,155 @@
+"""
+DB呼び出しの計測フック
+
+Supabase（postgrest）のクエリビルダの `.execute()` とasyncpgのプールのクエリ実行を計測し、
+登録されたリスナー（メトリクス、リクエストのプロファイル等）に1回ごとの呼び出しを通知する。
+計測はinstrument_db_calls()を呼び出した場合のみ有効になる（呼び出さなければ置き換えは行わない）。
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+DB_CLIENT_POSTGREST_SYNC = "postgrest_sync"
+DB_CLIENT_POSTGREST_ASYNC = "postgrest_async"
+DB_CLIENT_POSTGRES = "postgres"
+
+# タイムラインに残すSQLの最大文字数
+MAX_TARGET_LENGTH = 200
+
+
+@dataclass
+class DBCall:
+    """DB呼び出し1回分の記録"""
+    client: str
+    target: str  # PostgRESTは "GET /projects"、PostgreSQL直接接続はSQL文
+    started: float  # time.perf_counter()の値
+    seconds: float
+    error: Optional[str] = None
+
+
+_listeners: List[Callable[[DBCall], None]] = []
+_instrumented = False
+
+
+def add_db_call_listener(listener: Callable[[DBCall], None]) -> None:
+    """DB呼び出しごとに呼び出すリスナーを登録（起動時に登録する）"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def is_instrumented() -> bool:
+    """DB呼び出しの計測が有効か"""
+    return _instrumented
+
+
+def _notify(client: str, target: str, started: float, error: Optional[BaseException]) -> None:
+    call = DBCall(
+        client=client,
+        target=target,
+        started=started,
+        seconds=time.perf_counter() - started,
+        error=type(error).__name__ if error is not None else None,
+    )
+    for listener in _listeners:
+        listener(call)
+
+
+def _builder_target(builder: Any) -> str:
+    method = getattr(builder, "http_method", "") or ""
+    path = getattr(builder, "path", "") or ""
+    return f"{method} {path}".strip()
+
+
+_SYNC_BUILDERS = (
+    "SyncQueryRequestBuilder",
+    "SyncSingleRequestBuilder",
+    "SyncMaybeSingleRequestBuilder",
+    "SyncExplainRequestBuilder",
+)
+_ASYNC_BUILDERS = (
+    "AsyncQueryRequestBuilder",
+    "AsyncSingleRequestBuilder",
+    "AsyncMaybeSingleRequestBuilder",
+    "AsyncExplainRequestBuilder",
+)
+
+
+def _wrap_sync_execute(execute: Callable) -> Callable:
+    def timed_execute(self: Any, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        error = None
+        try:
+            return execute(self, *args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _notify(DB_CLIENT_POSTGREST_SYNC, _builder_target(self), started, error)
+    return timed_execute
+
+
+def _wrap_async_execute(execute: Callable) -> Callable:
+    async def timed_execute(self: Any, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        error = None
+        try:
+            return await execute(self, *args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _notify(DB_CLIENT_POSTGREST_ASYNC, _builder_target(self), started, error)
+    return timed_execute
+
+
+def instrument_db_calls() -> None:
+    """Supabase（postgrest）のクエリビルダの `.execute()` を計測付きに置き換える（起動時に1回呼び出す）
+
+    asyncpgのプールは作成時にInstrumentedPoolで包む（app.core.database）
+    """
+    global _instrumented
+    if _instrumented:
+        return
+    import postgrest
+
+    for names, wrap in ((_SYNC_BUILDERS, _wrap_sync_execute), (_ASYNC_BUILDERS, _wrap_async_execute)):
+        for name in names:
+            builder = getattr(postgrest, name, None)
+            # 親クラスのexecuteを継承しているビルダは親の置き換えで計測される
+            if builder is not None and "execute" in builder.__dict__:
+                builder.execute = wrap(builder.__dict__["execute"])
+    _instrumented = True
+
+
+class InstrumentedPool:
+    """asyncpgのコネクションプールのクエリ実行を計測するラッパー（その他の属性はプールに委譲）"""
+
+    def __init__(self, pool: Any):
+        self._pool = pool
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pool, name)
+
+    async def _timed(self, method: str, query: str, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        error = None
+        try:
+            return await getattr(self._pool, method)(query, *args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _notify(DB_CLIENT_POSTGRES, " ".join(query.split())[:MAX_TARGET_LENGTH], started, error)
+
+    async def execute(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._timed("execute", query, *args, **kwargs)
+
+    async def fetch(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._timed("fetch", query, *args, **kwargs)
+
+    async def fetchrow(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._timed("fetchrow", query, *args, **kwargs)
+
+    async def fetchval(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._timed("fetchval", query, *args, **kwargs)
@@ -0,0 +1,155 @@
+"""
+リクエスト・DB呼び出しのメトリクス
+
+METRICS_ENABLED=true の場合のみ有効化する（無効時はミドルウェアの追加・計測処理を一切行わない）。
+- ルート（パステンプレート）ごとのレイテンシ、DB呼び出し回数、DB時間とそれ以外（アプリ時間）のヒストグラム
+- DB接続種別（PostgREST同期・非同期、PostgreSQL直接接続）ごとのクエリ時間のヒストグラム
+DB呼び出しはapp.core.db_instrumentationのリスナー（record_db_call）で受け取り、
+リクエスト単位の集計はcontextvarで受け渡す（スレッドプールで実行される同期エンドポイントにも引き継がれる）。
+/metrics でPrometheusのテキスト形式で出力する。
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.db_instrumentation import DBCall
+
+# 秒単位のヒストグラムの区切り
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 1リクエストあたりのDB呼び出し回数の区切り
+DB_CALL_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# ルートに一致しなかったリクエスト（404等）はラベルをまとめ、系列数の増加を防ぐ
+UNMATCHED_ROUTE = "unmatched"
+
+
+@dataclass
+class RequestDBStats:
+    """1リクエスト内のDB呼び出しの集計"""
+    calls: int = 0
+    seconds: float = 0.0
+
+
+_request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+class _Histogram:
+    """ラベル付きヒストグラム（スレッドセーフ）"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # ラベル値 → (区切りごとの件数, 合計, 件数)
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, bucket_counts, total, count in sorted(snapshot):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = f"{label_text}," if label_text else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_request_duration = _Histogram(
+    "http_request_duration_seconds", "リクエストの処理時間", ("method", "route", "status"), LATENCY_BUCKETS
+)
+_request_db_seconds = _Histogram(
+    "http_request_db_seconds", "リクエスト内のDB呼び出し時間の合計（並行実行分は重複して加算）",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+_request_app_seconds = _Histogram(
+    "http_request_app_seconds", "リクエストの処理時間のうちDB呼び出し以外の時間", ("method", "route"), LATENCY_BUCKETS
+)
+_request_db_calls = _Histogram(
+    "http_request_db_calls", "リクエストあたりのDB呼び出し回数", ("method", "route"), DB_CALL_BUCKETS
+)
+_db_query_duration = _Histogram(
+    "db_query_duration_seconds", "DB呼び出し1回あたりの時間", ("client",), LATENCY_BUCKETS
+)
+
+_HISTOGRAMS = (_request_duration, _request_db_seconds, _request_app_seconds, _request_db_calls, _db_query_duration)
+
+
+def record_db_call(call: DBCall) -> None:
+    """DB呼び出し1回を記録（DB呼び出しのリスナーとして登録する）"""
+    _db_query_duration.observe((call.client,), call.seconds)
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.calls += 1
+        stats.seconds += call.seconds
+
+
+def render_metrics() -> str:
+    """Prometheusのテキスト形式で出力"""
+    lines: List[str] = []
+    for histogram in _HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """リクエストごとの処理時間・DB呼び出しを計測するASGIミドルウェア"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDBStats()
+        token = _request_db_stats.set(stats)
+        status_code = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            _request_db_stats.reset(token)
+            # FastAPIは一致したルートをscope["route"]に設定する（パステンプレートをラベルに使う）
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            _request_duration.observe((method, route, str(status_code)), duration)
+            _request_db_seconds.observe((method, route), stats.seconds)
+            _request_app_seconds.observe((method, route), max(duration - stats.seconds, 0.0))
+            _request_db_calls.observe((method, route), stats.calls)
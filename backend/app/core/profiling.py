@@ -0,0 +1,286 @@
+"""
+リクエスト単位のプロファイリング（管理者のみ）
+
+管理者のトークンを付けたリクエストに `X-Profile-Request: 1` ヘッダまたは `_profile=1` クエリを
+指定すると、そのリクエストをサンプリングプロファイラの下で実行する。
+- 一定間隔（REQUEST_PROFILE_INTERVAL_SECONDS）で各スレッドのスタックを採取し、
+  フレームグラフ用のcollapsed形式（flamegraph.pl / speedscope / inferno で読み込める）で保存する
+- リクエスト中のDB呼び出し（PostgREST・PostgreSQL直接接続）を開始時刻・所要時間付きで記録する
+結果はプロセス内にキャッシュし（REQUEST_PROFILE_DIRを設定した場合はファイルにも保存）、
+レスポンスヘッダ `X-Profile-Id` のIDで管理者APIから取得する。
+
+サンプリングはプロセス内の全スレッドが対象のため、同時に処理中の他のリクエストのスタックも含まれる。
+同時に実行できるプロファイルはプロセスごとに1件（実行中は通常どおり処理する）。
+REQUEST_PROFILING_ENABLED=true の場合のみ有効化する（既定は無効。無効時はDB呼び出しの計測も行わない）。
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.db_instrumentation import DBCall
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-request"
+PROFILE_QUERY_PARAM = "_profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+SAMPLER_THREAD_NAME = "request-profiler"
+# 待機中（処理を行っていない）とみなすフレームのモジュール
+_IDLE_MODULES = ("threading", "selectors", "queue", "concurrent.futures.thread")
+
+_profiles = TTLCache("request_profiles", ttl_seconds=60 * 60, maxsize=20)
+_profile_lock = threading.Lock()
+
+
+@dataclass
+class RequestProfile:
+    """プロファイル対象のリクエストと、その間のDB呼び出し"""
+    id: str
+    method: str
+    path: str
+    started_at: str
+    started: float  # time.perf_counter()の値
+    route: Optional[str] = None
+    status: Optional[int] = None
+    duration_ms: Optional[float] = None
+    interval_ms: float = 0.0
+    sample_count: int = 0
+    timeline: List[Dict[str, Any]] = field(default_factory=list)
+
+
+_active_profile: ContextVar[Optional[RequestProfile]] = ContextVar("active_profile", default=None)
+
+
+def record_profiled_db_call(call: DBCall) -> None:
+    """プロファイル中のリクエストのDB呼び出しをタイムラインに追加（DB呼び出しのリスナーとして登録する）"""
+    profile = _active_profile.get()
+    if profile is None:
+        return
+    profile.timeline.append({
+        "client": call.client,
+        "target": call.target,
+        "start_ms": round((call.started - profile.started) * 1000, 3),
+        "duration_ms": round(call.seconds * 1000, 3),
+        "thread": threading.current_thread().name,
+        "error": call.error,
+    })
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _collapse_stack(frame: FrameType) -> Optional[str]:
+    """スタックをルートから順に ; で連結（待機中のスレッドはNone）"""
+    if frame.f_globals.get("__name__") in _IDLE_MODULES:
+        return None
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _StackSampler(threading.Thread):
+    """一定間隔で全スレッドのスタックを採取する"""
+
+    def __init__(self, interval: float, max_seconds: float):
+        super().__init__(name=SAMPLER_THREAD_NAME, daemon=True)
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.sample_count = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        own_id = threading.get_ident()
+        thread_names: Dict[int, str] = {}
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop_event.wait(self.interval) and time.monotonic() < deadline:
+            self.sample_count += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _collapse_stack(frame)
+                if stack is None:
+                    continue
+                if thread_id not in thread_names:
+                    thread_names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                self.stacks[f"{thread_names.get(thread_id, thread_id)};{stack}"] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        """collapsed形式（"フレーム;フレーム;... 採取回数" の行）"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _save_profile(profile: RequestProfile, collapsed: str) -> None:
+    _profiles.set(profile.id, (profile, collapsed))
+    if not settings.REQUEST_PROFILE_DIR:
+        return
+    try:
+        output_dir = Path(settings.REQUEST_PROFILE_DIR)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        (output_dir / f"{profile.id}.collapsed").write_text(collapsed, encoding="utf-8")
+        (output_dir / f"{profile.id}.json").write_text(
+            json.dumps(asdict(profile), ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+    except OSError as e:
+        logger.warning(f"Failed to write request profile {profile.id}: {e}")
+
+
+def _load_from_dir(profile_id: str, suffix: str) -> Optional[str]:
+    if not settings.REQUEST_PROFILE_DIR:
+        return None
+    # IDはUUIDのみ受け付ける（パスの組み立てに使うため）
+    try:
+        profile_id = str(uuid.UUID(profile_id))
+    except ValueError:
+        return None
+    path = Path(settings.REQUEST_PROFILE_DIR) / f"{profile_id}{suffix}"
+    return path.read_text(encoding="utf-8") if path.is_file() else None
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """プロセス内に保持しているプロファイルの概要（新しい順）"""
+    summaries = []
+    for key in _profiles.keys():
+        entry = _profiles.get(key)
+        if entry is None:
+            continue
+        profile = entry[0]
+        summaries.append({
+            "id": profile.id,
+            "method": profile.method,
+            "path": profile.path,
+            "route": profile.route,
+            "status": profile.status,
+            "started_at": profile.started_at,
+            "duration_ms": profile.duration_ms,
+            "db_calls": len(profile.timeline),
+        })
+    return sorted(summaries, key=lambda summary: summary["started_at"], reverse=True)
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    """プロファイルの詳細（DB呼び出しのタイムライン含む）、見つからなければNone"""
+    entry = _profiles.get(profile_id)
+    if entry is not None:
+        return asdict(entry[0])
+    content = _load_from_dir(profile_id, ".json")
+    return json.loads(content) if content is not None else None
+
+
+def get_profile_collapsed(profile_id: str) -> Optional[str]:
+    """フレームグラフ用のcollapsed形式、見つからなければNone"""
+    entry = _profiles.get(profile_id)
+    if entry is not None:
+        return entry[1]
+    return _load_from_dir(profile_id, ".collapsed")
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers") or []:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _profile_requested(scope: Dict[str, Any]) -> bool:
+    if _header(scope, PROFILE_HEADER) in ("1", "true"):
+        return True
+    query = scope.get("query_string") or b""
+    if PROFILE_QUERY_PARAM.encode() not in query:
+        return False
+    return parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_PARAM, [""])[0] in ("1", "true")
+
+
+def _bearer_token(scope: Dict[str, Any]) -> Optional[str]:
+    authorization = _header(scope, b"authorization") or ""
+    scheme, _, token = authorization.partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+
+class ProfilingMiddleware:
+    """プロファイル指定のある管理者のリクエストをサンプリングプロファイラの下で実行するASGIミドルウェア"""
+
+    def __init__(self, app: Any, authorize: Callable[[str], Awaitable[bool]]):
+        self.app = app
+        # Bearerトークンが管理者のものか判定する関数
+        self.authorize = authorize
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        token = _bearer_token(scope)
+        if token is None or not await self.authorize(token):
+            await self.app(scope, receive, send)
+            return
+
+        if not _profile_lock.acquire(blocking=False):
+            logger.info("Request profiling skipped: another profile is running")
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            _profile_lock.release()
+
+    async def _profile(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        profile = RequestProfile(
+            id=str(uuid.uuid4()),
+            method=scope["method"],
+            path=scope["path"],
+            started_at=datetime.now(timezone.utc).isoformat(),
+            started=time.perf_counter(),
+            interval_ms=settings.REQUEST_PROFILE_INTERVAL_SECONDS * 1000,
+        )
+
+        async def send_with_profile_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (PROFILE_ID_HEADER, profile.id.encode())]}
+            await send(message)
+
+        sampler = _StackSampler(settings.REQUEST_PROFILE_INTERVAL_SECONDS, settings.REQUEST_PROFILE_MAX_SECONDS)
+        token = _active_profile.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _active_profile.reset(token)
+            profile.duration_ms = round((time.perf_counter() - profile.started) * 1000, 3)
+            profile.route = getattr(scope.get("route"), "path", None)
+            # サンプラーの停止待ち（join）とファイルへの保存はイベントループをブロックしないようスレッドプールで実行
+            await run_in_threadpool(sampler.stop)
+            profile.sample_count = sampler.sample_count
+            await run_in_threadpool(_save_profile, profile, sampler.collapsed())
+            logger.info(
+                f"Request profiled: id={profile.id} {profile.method} {profile.path} "
+                f"duration_ms={profile.duration_ms} db_calls={len(profile.timeline)}"
+            )
@@ -1,11 +1,31 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt専用のプロセスプール（リクエスト処理用スレッドプールを占有しないため）
+_hash_executor: Optional[ProcessPoolExecutor] = None
+_hash_executor_lock = threading.Lock()
+# 実行中＋待機中のハッシュ処理数の上限
+_hash_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_PENDING)
+# ワーカーの異常終了時の試行回数（プロセスプールを作り直して1回だけ再実行する）
+_HASH_POOL_ATTEMPTS = 2
+
+
+class PasswordHasherBusyError(Exception):
+    """パスワードハッシュ処理の待ち行列が上限に達している"""
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """パスワードを検証"""
@@ -17,6 +37,79 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _get_hash_executor() -> ProcessPoolExecutor:
+    """ハッシュ処理用プロセスプールを取得（初回呼び出し時に生成）"""
+    global _hash_executor
+    if _hash_executor is None:
+        with _hash_executor_lock:
+            if _hash_executor is None:
+                _hash_executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _hash_executor
+
+
+def _discard_hash_executor(executor: ProcessPoolExecutor) -> None:
+    """ワーカーが異常終了したプロセスプールを破棄（次回の呼び出しで作り直す）"""
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is executor:
+            _hash_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit_to_hash_pool(executor: ProcessPoolExecutor, func: Callable[..., Any], *args: Any) -> Future:
+    """待ち行列の枠を確保してプロセスプールに投入（上限超過時は即座にPasswordHasherBusyError）
+
+    枠はプロセスでの処理が終わるまで保持する（待機中のリクエストがキャンセルされても解放しない）
+    """
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHasherBusyError()
+    try:
+        future = executor.submit(func, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
+
+async def _run_in_hash_pool(func: Callable[..., Any], *args: Any) -> Any:
+    """ハッシュ処理をプロセスプールで実行
+
+    ワーカーの異常終了でプロセスプールが使用できなくなった場合は作り直して再実行する
+    """
+    for attempt in range(_HASH_POOL_ATTEMPTS):
+        executor = _get_hash_executor()
+        try:
+            return await asyncio.wrap_future(_submit_to_hash_pool(executor, func, *args))
+        except BrokenProcessPool:
+            _discard_hash_executor(executor)
+            if attempt + 1 >= _HASH_POOL_ATTEMPTS:
+                raise
+            logger.warning("Password hash worker crashed, recreating process pool")
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """パスワードを検証（プロセスプールで実行）"""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """パスワードをハッシュ化（プロセスプールで実行）"""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+def shutdown_password_hasher() -> None:
+    """ハッシュ処理用プロセスプールを停止"""
+    global _hash_executor
+    with _hash_executor_lock:
+        executor, _hash_executor = _hash_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """JWTアクセストークンを作成"""
     to_encode = data.copy()
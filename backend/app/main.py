@@ -1,14 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
+from app.core.database import (
+    close_postgres_pool,
+    close_supabase_clients,
+    create_postgres_pool,
+    init_supabase_clients,
+    use_postgres_backend,
+)
+from app.core.db_instrumentation import add_db_call_listener, instrument_db_calls
+from app.core.metrics import MetricsMiddleware, record_db_call, render_metrics
+from app.core.profiling import ProfilingMiddleware, record_profiled_db_call
+from app.core.security import shutdown_password_hasher
+from app.services.document_text import shutdown_document_executor
+from app.services.material_text_index import cancel_material_text_extractions, run_periodic_material_text_retry
+from app.services.storage_gc import run_periodic_storage_gc
 from app.api import auth, projects, worklogs, invoices, materials, chuiten, masters, admin
 
 # Supabase Clientを使用するため、テーブル作成は不要（Supabase側で管理）
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Supabase Clientを作成し、リクエスト受付前にPostgRESTへの接続を確立しておく
+    await init_supabase_clients()
+    # PostgreSQL直接接続のコネクションプール（DATA_BACKEND=postgres の場合のみ）
+    if use_postgres_backend():
+        await create_postgres_pool()
+
+    # 孤立した資料ファイルの定期回収（STORAGE_GC_INTERVAL_SECONDS > 0 の場合のみ）
+    storage_gc_task = None
+    if settings.STORAGE_GC_INTERVAL_SECONDS > 0:
+        storage_gc_task = asyncio.create_task(run_periodic_storage_gc())
+
+    # 中断された資料のテキスト抽出の再開（起動時と定期実行、MATERIAL_TEXT_RETRY_INTERVAL_SECONDS > 0 の場合のみ）
+    text_retry_task = None
+    if settings.MATERIAL_TEXT_RETRY_INTERVAL_SECONDS > 0:
+        text_retry_task = asyncio.create_task(run_periodic_material_text_retry())
+
+    yield
+
+    if storage_gc_task is not None:
+        storage_gc_task.cancel()
+    if text_retry_task is not None:
+        text_retry_task.cancel()
+    # パスワードハッシュ用プロセスプールを停止
+    shutdown_password_hasher()
+    # 資料のテキスト抽出を中断し、PDF・OCR用プロセスプールを停止
+    cancel_material_text_extractions()
+    shutdown_document_executor()
+    await close_postgres_pool()
+    await close_supabase_clients()
+
+
 app = FastAPI(
     title="Nissei 工数管理システム",
     description="工数管理と請求処理のためのシステム",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -20,6 +72,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# DB呼び出しの計測（メトリクス・プロファイリングのいずれかが有効な場合のみ）
+if settings.METRICS_ENABLED or settings.REQUEST_PROFILING_ENABLED:
+    instrument_db_calls()
+
+# Metrics（有効時のみ: リクエストごとのレイテンシ・DB呼び出し回数・DB時間を計測）
+if settings.METRICS_ENABLED:
+    add_db_call_listener(record_db_call)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Request profiling（管理者が指定したリクエストのみサンプリングプロファイラ・DBタイムラインを記録）
+if settings.REQUEST_PROFILING_ENABLED:
+    add_db_call_listener(record_profiled_db_call)
+    app.add_middleware(ProfilingMiddleware, authorize=auth.is_admin_token)
+
 # Health check endpoint
 @app.get("/")
 async def health_check():
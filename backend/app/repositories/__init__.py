@@ -0,0 +1,59 @@
+"""
+リポジトリ層
+
+APIルーターはテーブルを直接操作せず、ここで提供するリポジトリ経由でデータにアクセスする。
+実装は非同期Supabase Client（PostgREST）を使用し、FastAPIのDependencyとして注入する。
+DATA_BACKEND=postgres の場合、集計・一覧系の読み取りはPostgreSQLへの直接接続（asyncpg）で行う。
+"""
+
+from fastapi import Depends
+from supabase import AsyncClient
+
+from app.core.database import get_async_db, get_postgres_pool, use_postgres_backend
+from app.repositories.invoices import (
+    InvoiceAlreadyClosedError,
+    InvoiceNoItemsError,
+    InvoiceRepository,
+    SupabaseInvoiceRepository,
+)
+from app.repositories.postgres import (
+    PostgresInvoiceRepository,
+    PostgresProjectRepository,
+    PostgresWorklogRepository,
+)
+from app.repositories.projects import ProjectFilters, ProjectRepository, SupabaseProjectRepository
+from app.repositories.worklogs import SupabaseWorklogRepository, WorklogFilters, WorklogRepository
+
+__all__ = [
+    "InvoiceAlreadyClosedError",
+    "InvoiceNoItemsError",
+    "InvoiceRepository",
+    "ProjectFilters",
+    "ProjectRepository",
+    "WorklogFilters",
+    "WorklogRepository",
+    "get_invoice_repository",
+    "get_project_repository",
+    "get_worklog_repository",
+]
+
+
+async def get_project_repository(db: AsyncClient = Depends(get_async_db)) -> ProjectRepository:
+    """FastAPI Dependency用の案件リポジトリ取得関数"""
+    if use_postgres_backend():
+        return PostgresProjectRepository(db, await get_postgres_pool())
+    return SupabaseProjectRepository(db)
+
+
+async def get_worklog_repository(db: AsyncClient = Depends(get_async_db)) -> WorklogRepository:
+    """FastAPI Dependency用の工数入力リポジトリ取得関数"""
+    if use_postgres_backend():
+        return PostgresWorklogRepository(db, await get_postgres_pool())
+    return SupabaseWorklogRepository(db)
+
+
+async def get_invoice_repository(db: AsyncClient = Depends(get_async_db)) -> InvoiceRepository:
+    """FastAPI Dependency用の請求リポジトリ取得関数"""
+    if use_postgres_backend():
+        return PostgresInvoiceRepository(db, await get_postgres_pool())
+    return SupabaseInvoiceRepository(db)
@@ -0,0 +1,132 @@
+"""
+請求リポジトリ
+
+invoices / invoice_itemsテーブルと月次集計（DB関数）へのアクセスを非同期で行う。
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from postgrest.exceptions import APIError
+from supabase import AsyncClient
+
+
+class InvoiceAlreadyClosedError(Exception):
+    """確定済みの請求書を再度確定しようとした"""
+
+
+class InvoiceNoItemsError(Exception):
+    """請求対象の工数が無い月を確定しようとした"""
+
+
+class InvoiceRepository(ABC):
+    """請求リポジトリのインターフェース"""
+
+    @abstractmethod
+    async def get_header(self, year: int, month: int) -> Optional[Dict[str, Any]]:
+        """指定月の請求書ヘッダを取得（未作成ならNone）"""
+
+    @abstractmethod
+    async def get(self, invoice_id: str) -> Optional[Dict[str, Any]]:
+        """IDで請求書ヘッダを取得（存在しなければNone）"""
+
+    @abstractmethod
+    async def list_headers(
+        self, start_year: Optional[int] = None, end_year: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """請求書ヘッダ一覧（年月の新しい順、年で範囲指定可）"""
+
+    @abstractmethod
+    async def load_items(self, invoice_id: str) -> List[Dict[str, Any]]:
+        """確定時に保存した明細を取得（管理No順）"""
+
+    @abstractmethod
+    async def monthly_lines(self, year: int, month: int) -> List[Dict[str, Any]]:
+        """指定月の工数を案件別に集計（管理No順）
+
+        各行: {"project_id", "management_no", "machine_no", "total_minutes"}
+        """
+
+    @abstractmethod
+    async def close(self, year: int, month: int, closed_by: str) -> Optional[Dict[str, Any]]:
+        """請求書を確定（集計・ヘッダ確定・明細登録を1トランザクションで実行）
+
+        確定済みならInvoiceAlreadyClosedError、対象の工数が無ければInvoiceNoItemsErrorを送出する
+        """
+
+    @abstractmethod
+    async def reopen(self, invoice_id: str) -> Optional[Dict[str, Any]]:
+        """確定済みの請求書を下書きに戻す"""
+
+    @abstractmethod
+    async def delete(self, invoice_id: str) -> None:
+        """請求書を明細ごと削除"""
+
+
+class SupabaseInvoiceRepository(InvoiceRepository):
+    """非同期Supabase Client（PostgREST）による実装"""
+
+    def __init__(self, db: AsyncClient):
+        self.db = db
+
+    async def get_header(self, year: int, month: int) -> Optional[Dict[str, Any]]:
+        response = await self.db.table("invoices").select("*").eq("year", year).eq("month", month).execute()
+        return response.data[0] if response.data else None
+
+    async def get(self, invoice_id: str) -> Optional[Dict[str, Any]]:
+        response = await self.db.table("invoices").select("*").eq("id", invoice_id).execute()
+        return response.data[0] if response.data else None
+
+    async def list_headers(
+        self, start_year: Optional[int] = None, end_year: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        query = self.db.table("invoices").select("*")
+        if start_year is not None:
+            query = query.gte("year", start_year)
+        if end_year is not None:
+            query = query.lte("year", end_year)
+        response = await query.order("year", desc=True).order("month", desc=True).execute()
+        return response.data or []
+
+    async def load_items(self, invoice_id: str) -> List[Dict[str, Any]]:
+        response = await self.db.table("invoice_items").select("*").eq(
+            "invoice_id", invoice_id
+        ).order("management_no").execute()
+        return response.data or []
+
+    async def monthly_lines(self, year: int, month: int) -> List[Dict[str, Any]]:
+        response = await self.db.rpc(
+            "get_monthly_invoice_lines", {"p_year": year, "p_month": month}
+        ).execute()
+        return response.data or []
+
+    async def close(self, year: int, month: int, closed_by: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = await self.db.rpc("close_invoice_with_items", {
+                "p_year": year,
+                "p_month": month,
+                "p_closed_by": closed_by,
+            }).execute()
+        except APIError as e:
+            if e.hint == "INVOICE_ALREADY_CLOSED":
+                raise InvoiceAlreadyClosedError() from e
+            if e.hint == "INVOICE_NO_ITEMS":
+                raise InvoiceNoItemsError() from e
+            raise
+        if isinstance(response.data, list):
+            return response.data[0] if response.data else None
+        return response.data
+
+    async def reopen(self, invoice_id: str) -> Optional[Dict[str, Any]]:
+        response = await self.db.table("invoices").update({
+            "status": "draft",
+            "closed_at": None,
+            "closed_by": None,
+            "updated_at": datetime.utcnow().isoformat()
+        }).eq("id", invoice_id).execute()
+        return response.data[0] if response.data else None
+
+    async def delete(self, invoice_id: str) -> None:
+        await self.db.table("invoice_items").delete().eq("invoice_id", invoice_id).execute()
+        await self.db.table("invoices").delete().eq("id", invoice_id).execute()
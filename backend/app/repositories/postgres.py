@@ -0,0 +1,176 @@
+"""
+PostgreSQL直接接続のリポジトリ（DATA_BACKEND=postgres）
+
+集計・一覧系の読み取り（案件一覧、工数一覧・集計、請求プレビュー・エクスポート）を
+asyncpgのコネクションプールで実行し、PostgRESTを経由するHTTP通信とJSON変換を省く。
+登録・更新・削除はSupabase実装（PostgREST）をそのまま使用する。
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from supabase import AsyncClient
+
+from app.repositories.invoices import SupabaseInvoiceRepository
+from app.repositories.projects import ProjectFilters, SupabaseProjectRepository
+from app.repositories.worklogs import SupabaseWorklogRepository, WorklogFilters
+
+
+def _row_to_dict(record: Any) -> Dict[str, Any]:
+    """asyncpgのRecordをPostgRESTのレスポンスと同じ形のdictに変換（UUIDは文字列）"""
+    return {key: str(value) if isinstance(value, UUID) else value for key, value in record.items()}
+
+
+class _WhereBuilder:
+    """WHERE句とプレースホルダ引数を組み立てる"""
+
+    def __init__(self):
+        self.conditions: List[str] = []
+        self.args: List[Any] = []
+
+    def add(self, condition: str, value: Any) -> None:
+        self.args.append(value)
+        self.conditions.append(condition.format(f"${len(self.args)}"))
+
+    def sql(self) -> str:
+        return f"WHERE {' AND '.join(self.conditions)}" if self.conditions else ""
+
+
+class PostgresProjectRepository(SupabaseProjectRepository):
+    """案件リポジトリ（一覧・詳細をPostgreSQLから直接取得）"""
+
+    def __init__(self, db: AsyncClient, pool: Any):
+        super().__init__(db)
+        self.pool = pool
+
+    async def list_projects(
+        self, filters: ProjectFilters, offset: int, limit: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        where = _WhereBuilder()
+        if not filters.include_inactive:
+            where.add("is_active = {}", True)
+        if filters.shinchoku_id:
+            where.add("shinchoku_id = {}::uuid", filters.shinchoku_id)
+        if filters.sagyou_kubun_id:
+            where.add("sagyou_kubun_id = {}::uuid", filters.sagyou_kubun_id)
+        if filters.machine_no:
+            where.add("machine_no ILIKE {}", f"%{filters.machine_no}%")
+        if filters.management_no:
+            where.add("management_no ILIKE {}", f"%{filters.management_no}%")
+
+        page_args = len(where.args)
+        # 一覧と総件数は別コネクションで並行して実行
+        rows, total = await asyncio.gather(
+            self.pool.fetch(
+                f"SELECT * FROM projects {where.sql()} ORDER BY created_at DESC "
+                f"OFFSET ${page_args + 1} LIMIT ${page_args + 2}",
+                *where.args, offset, limit,
+            ),
+            self.pool.fetchval(f"SELECT COUNT(*) FROM projects {where.sql()}", *where.args),
+        )
+        return [_row_to_dict(row) for row in rows], total or 0
+
+    async def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.pool.fetchrow("SELECT * FROM projects WHERE id = $1::uuid", project_id)
+        return _row_to_dict(row) if row else None
+
+
+class PostgresWorklogRepository(SupabaseWorklogRepository):
+    """工数入力リポジトリ（一覧・集計をPostgreSQLから直接取得）"""
+
+    def __init__(self, db: AsyncClient, pool: Any):
+        super().__init__(db)
+        self.pool = pool
+
+    async def list_worklogs(
+        self, filters: WorklogFilters, offset: int, limit: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        where = _WhereBuilder()
+        if filters.project_id:
+            where.add("project_id = {}::uuid", filters.project_id)
+        if filters.work_date:
+            where.add("work_date = {}::date", filters.work_date)
+        if filters.user_id:
+            where.add("user_id = {}::uuid", filters.user_id)
+
+        page_args = len(where.args)
+        rows, total = await asyncio.gather(
+            self.pool.fetch(
+                f"SELECT * FROM work_logs {where.sql()} ORDER BY work_date DESC, created_at DESC "
+                f"OFFSET ${page_args + 1} LIMIT ${page_args + 2}",
+                *where.args, offset, limit,
+            ),
+            self.pool.fetchval(f"SELECT COUNT(*) FROM work_logs {where.sql()}", *where.args),
+        )
+        return [_row_to_dict(row) for row in rows], total or 0
+
+    async def get(self, worklog_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.pool.fetchrow("SELECT * FROM work_logs WHERE id = $1::uuid", worklog_id)
+        return _row_to_dict(row) if row else None
+
+    async def project_exists(self, project_id: str) -> bool:
+        return bool(await self.pool.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM projects WHERE id = $1::uuid)", project_id
+        ))
+
+    async def get_summary(self, project_id: str) -> Optional[Dict[str, Any]]:
+        project, summary = await asyncio.gather(
+            self.pool.fetchrow(
+                "SELECT management_no, estimated_hours, actual_hours FROM projects WHERE id = $1::uuid",
+                project_id,
+            ),
+            self.pool.fetchval("SELECT get_worklog_summary($1::uuid)", project_id),
+        )
+        if project is None:
+            return None
+
+        summary = summary or {}
+        return {
+            "management_no": project["management_no"],
+            "estimated_hours": project["estimated_hours"] or 0,
+            "actual_hours": project["actual_hours"] or 0,
+            "by_user": summary.get("by_user") or [],
+            "by_date": summary.get("by_date") or [],
+        }
+
+
+class PostgresInvoiceRepository(SupabaseInvoiceRepository):
+    """請求リポジトリ（プレビュー・エクスポート用の読み取りをPostgreSQLから直接取得）"""
+
+    def __init__(self, db: AsyncClient, pool: Any):
+        super().__init__(db)
+        self.pool = pool
+
+    async def get_header(self, year: int, month: int) -> Optional[Dict[str, Any]]:
+        row = await self.pool.fetchrow(
+            "SELECT * FROM invoices WHERE year = $1 AND month = $2", year, month
+        )
+        return _row_to_dict(row) if row else None
+
+    async def get(self, invoice_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.pool.fetchrow("SELECT * FROM invoices WHERE id = $1::uuid", invoice_id)
+        return _row_to_dict(row) if row else None
+
+    async def list_headers(
+        self, start_year: Optional[int] = None, end_year: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        where = _WhereBuilder()
+        if start_year is not None:
+            where.add("year >= {}", start_year)
+        if end_year is not None:
+            where.add("year <= {}", end_year)
+        rows = await self.pool.fetch(
+            f"SELECT * FROM invoices {where.sql()} ORDER BY year DESC, month DESC", *where.args
+        )
+        return [_row_to_dict(row) for row in rows]
+
+    async def load_items(self, invoice_id: str) -> List[Dict[str, Any]]:
+        rows = await self.pool.fetch(
+            "SELECT * FROM invoice_items WHERE invoice_id = $1::uuid ORDER BY management_no", invoice_id
+        )
+        return [_row_to_dict(row) for row in rows]
+
+    async def monthly_lines(self, year: int, month: int) -> List[Dict[str, Any]]:
+        rows = await self.pool.fetch("SELECT * FROM get_monthly_invoice_lines($1, $2)", year, month)
+        return [_row_to_dict(row) for row in rows]
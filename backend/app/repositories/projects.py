@@ -0,0 +1,108 @@
+"""
+案件リポジトリ
+
+projectsテーブルへのアクセスを非同期で行う。
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from supabase import AsyncClient
+
+
+@dataclass
+class ProjectFilters:
+    """案件一覧の絞り込み条件"""
+    shinchoku_id: Optional[str] = None
+    sagyou_kubun_id: Optional[str] = None
+    machine_no: Optional[str] = None  # 部分一致
+    management_no: Optional[str] = None  # 部分一致
+    include_inactive: bool = False
+
+
+class ProjectRepository(ABC):
+    """案件リポジトリのインターフェース"""
+
+    @abstractmethod
+    async def list_projects(
+        self, filters: ProjectFilters, offset: int, limit: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """案件一覧（作成日時の新しい順）と絞り込み後の総件数"""
+
+    @abstractmethod
+    async def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """IDで案件を取得（存在しなければNone）"""
+
+    @abstractmethod
+    async def management_no_in_use(self, management_no: str, exclude_id: Optional[str] = None) -> bool:
+        """有効な案件で管理Noが使用されているか"""
+
+    @abstractmethod
+    async def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """案件を登録"""
+
+    @abstractmethod
+    async def update(self, project_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """案件を更新"""
+
+    @abstractmethod
+    async def deactivate(self, project_id: str) -> None:
+        """案件を論理削除"""
+
+
+class SupabaseProjectRepository(ProjectRepository):
+    """非同期Supabase Client（PostgREST）による実装"""
+
+    def __init__(self, db: AsyncClient):
+        self.db = db
+
+    @staticmethod
+    def _apply_filters(query: Any, filters: ProjectFilters) -> Any:
+        if not filters.include_inactive:
+            query = query.eq("is_active", True)
+        if filters.shinchoku_id:
+            query = query.eq("shinchoku_id", filters.shinchoku_id)
+        if filters.sagyou_kubun_id:
+            query = query.eq("sagyou_kubun_id", filters.sagyou_kubun_id)
+        if filters.machine_no:
+            query = query.ilike("machine_no", f"%{filters.machine_no}%")
+        if filters.management_no:
+            query = query.ilike("management_no", f"%{filters.management_no}%")
+        return query
+
+    async def list_projects(
+        self, filters: ProjectFilters, offset: int, limit: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        page_query = self._apply_filters(self.db.table("projects").select("*"), filters)
+        count_query = self._apply_filters(self.db.table("projects").select("id", count="exact"), filters)
+
+        # 一覧と総件数は独立したクエリのため並行して実行
+        page_response, count_response = await asyncio.gather(
+            page_query.order("created_at", desc=True).range(offset, offset + limit - 1).execute(),
+            count_query.limit(1).execute(),
+        )
+        return page_response.data or [], count_response.count or 0
+
+    async def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        response = await self.db.table("projects").select("*").eq("id", project_id).execute()
+        return response.data[0] if response.data else None
+
+    async def management_no_in_use(self, management_no: str, exclude_id: Optional[str] = None) -> bool:
+        query = self.db.table("projects").select("id").eq("management_no", management_no).eq("is_active", True)
+        if exclude_id:
+            query = query.neq("id", exclude_id)
+        response = await query.execute()
+        return bool(response.data)
+
+    async def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = await self.db.table("projects").insert(data).execute()
+        return response.data[0] if response.data else None
+
+    async def update(self, project_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = await self.db.table("projects").update(data).eq("id", project_id).execute()
+        return response.data[0] if response.data else None
+
+    async def deactivate(self, project_id: str) -> None:
+        await self.db.table("projects").update({"is_active": False}).eq("id", project_id).execute()
@@ -0,0 +1,127 @@
+"""
+工数入力リポジトリ
+
+work_logsテーブルへのアクセスを非同期で行う。
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from supabase import AsyncClient
+
+
+@dataclass
+class WorklogFilters:
+    """工数入力一覧の絞り込み条件"""
+    project_id: Optional[str] = None
+    work_date: Optional[str] = None  # YYYY-MM-DD
+    user_id: Optional[str] = None
+
+
+class WorklogRepository(ABC):
+    """工数入力リポジトリのインターフェース"""
+
+    @abstractmethod
+    async def list_worklogs(
+        self, filters: WorklogFilters, offset: int, limit: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """工数入力一覧（作業日・作成日時の新しい順）と絞り込み後の総件数"""
+
+    @abstractmethod
+    async def get(self, worklog_id: str) -> Optional[Dict[str, Any]]:
+        """IDで工数入力を取得（存在しなければNone）"""
+
+    @abstractmethod
+    async def project_exists(self, project_id: str) -> bool:
+        """案件が存在するか"""
+
+    @abstractmethod
+    async def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """工数入力を登録（案件の実績工数はトリガーで加算される）"""
+
+    @abstractmethod
+    async def update(self, worklog_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """工数入力を更新"""
+
+    @abstractmethod
+    async def delete(self, worklog_id: str) -> None:
+        """工数入力を削除"""
+
+    @abstractmethod
+    async def get_summary(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """案件の工数集計（案件が存在しなければNone）
+
+        戻り値: {"management_no", "estimated_hours", "actual_hours", "by_user", "by_date"}
+        """
+
+
+class SupabaseWorklogRepository(WorklogRepository):
+    """非同期Supabase Client（PostgREST）による実装"""
+
+    def __init__(self, db: AsyncClient):
+        self.db = db
+
+    @staticmethod
+    def _apply_filters(query: Any, filters: WorklogFilters) -> Any:
+        if filters.project_id:
+            query = query.eq("project_id", filters.project_id)
+        if filters.work_date:
+            query = query.eq("work_date", filters.work_date)
+        if filters.user_id:
+            query = query.eq("user_id", filters.user_id)
+        return query
+
+    async def list_worklogs(
+        self, filters: WorklogFilters, offset: int, limit: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        page_query = self._apply_filters(self.db.table("work_logs").select("*"), filters)
+        count_query = self._apply_filters(self.db.table("work_logs").select("id", count="exact"), filters)
+
+        # 一覧と総件数は独立したクエリのため並行して実行
+        page_response, count_response = await asyncio.gather(
+            page_query.order("work_date", desc=True).order("created_at", desc=True)
+            .range(offset, offset + limit - 1).execute(),
+            count_query.limit(1).execute(),
+        )
+        return page_response.data or [], count_response.count or 0
+
+    async def get(self, worklog_id: str) -> Optional[Dict[str, Any]]:
+        response = await self.db.table("work_logs").select("*").eq("id", worklog_id).execute()
+        return response.data[0] if response.data else None
+
+    async def project_exists(self, project_id: str) -> bool:
+        response = await self.db.table("projects").select("id").eq("id", project_id).execute()
+        return bool(response.data)
+
+    async def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = await self.db.table("work_logs").insert(data).execute()
+        return response.data[0] if response.data else None
+
+    async def update(self, worklog_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = await self.db.table("work_logs").update(data).eq("id", worklog_id).execute()
+        return response.data[0] if response.data else None
+
+    async def delete(self, worklog_id: str) -> None:
+        await self.db.table("work_logs").delete().eq("id", worklog_id).execute()
+
+    async def get_summary(self, project_id: str) -> Optional[Dict[str, Any]]:
+        # 案件の取得と集計（DB関数）は独立しているため並行して実行
+        project_response, summary_response = await asyncio.gather(
+            self.db.table("projects").select("management_no, estimated_hours, actual_hours")
+            .eq("id", project_id).execute(),
+            self.db.rpc("get_worklog_summary", {"p_project_id": project_id}).execute(),
+        )
+        if not project_response.data:
+            return None
+
+        project = project_response.data[0]
+        summary = summary_response.data or {}
+        return {
+            "management_no": project["management_no"],
+            "estimated_hours": project.get("estimated_hours") or 0,
+            "actual_hours": project.get("actual_hours") or 0,
+            "by_user": summary.get("by_user") or [],
+            "by_date": summary.get("by_date") or [],
+        }
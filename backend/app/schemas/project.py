@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 from uuid import UUID
 
@@ -65,4 +65,23 @@ class ProjectListResponse(BaseModel):
     projects: list[ProjectResponse]
     total: int
     page: int
-    per_page: int
\ No newline at end of file
+    per_page: int
+
+class ProjectImportFileResult(BaseModel):
+    """委託書PDF 1ファイルの取り込み結果"""
+    filename: str
+    status: str = Field(description="created: 登録済み, valid: 登録可能（dry_run）, skipped: 管理No重複のためスキップ, error: エラー")
+    management_no: Optional[str] = None
+    project_id: Optional[UUID] = None
+    errors: List[str] = []
+    warnings: List[str] = []
+
+
+class ProjectImportResponse(BaseModel):
+    """委託書PDF一括取り込みの結果"""
+    total: int
+    created: int
+    skipped: int
+    failed: int
+    dry_run: bool
+    results: List[ProjectImportFileResult]
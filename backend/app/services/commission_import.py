@@ -0,0 +1,313 @@
+"""
+委託書PDFの一括取り込み
+
+複数の委託書PDFをPDF・OCR用プロセスプールで並列に解析し、項目を案件（ProjectCreate）に変換する。
+作業区分・問い合わせ・進捗・機種シリーズはキャッシュ済みのマスタから名称で解決する。
+有効な案件はINSERT_CHUNK_SIZE件ずつまとめて登録し、失敗したまとまりは1件ずつ登録し直して
+ファイルごとの結果（登録・スキップ・エラー、警告）を返す。
+"""
+
+import asyncio
+import re
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+from pydantic import ValidationError
+from supabase import Client
+
+from app.core.config import settings
+from app.schemas.project import ProjectCreate
+from app.services.document_text import extract_pdf_pages, get_document_executor, normalize_text
+from app.services.master_cache import get_master_rows
+
+# 委託書の項目ラベル（表記ゆれを含む）
+FIELD_LABELS: Dict[str, Tuple[str, ...]] = {
+    "management_no": ("管理No.", "管理No", "管理番号"),
+    "machine_no": ("機番",),
+    "model": ("機種",),
+    "commission_content": ("委託業務内容", "業務委託内容", "委託内容"),
+    "sagyou_kubun": ("作業区分",),
+    "toiawase": ("問い合わせ", "問合せ"),
+    "shinchoku": ("進捗",),
+    "estimated_hours": ("予定工数",),
+    "start_date": ("仕掛日",),
+    "completion_date": ("完了日",),
+    "drawing_deadline": ("作図期限",),
+}
+
+MANAGEMENT_NO_PATTERN = re.compile(r"(?<![A-Za-z0-9])([A-Z]\d{6})(?!\d)")
+# 機種名: シリーズ（英字）＋トン数（数字）＋世代等、ハイフン以降は仕様（例: HMX7-CN2, NEX140Ⅲ-24AK）
+MODEL_PATTERN = re.compile(r"^([A-Z]+)(\d+)([^-\s]*)(?:-(\S+))?")
+DATE_PATTERN = re.compile(r"(\d{4})\s*[/\-.年]\s*(\d{1,2})\s*[/\-.月]\s*(\d{1,2})")
+HOURS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(分|min|H|h|時間)?")
+
+# マスタ名称で解決する項目 → (IDカラム, マスタテーブル, 名称カラム)
+_MASTER_FIELDS = {
+    "sagyou_kubun": ("sagyou_kubun_id", "master_sagyou_kubun", "kubun_name"),
+    "toiawase": ("toiawase_id", "master_toiawase", "status_name"),
+    "shinchoku": ("shinchoku_id", "master_shinchoku", "status_name"),
+}
+
+IMPORT_STATUS_CREATED = "created"
+IMPORT_STATUS_VALID = "valid"  # dry_run時
+IMPORT_STATUS_SKIPPED = "skipped"  # 管理Noが登録済み・バッチ内で重複
+IMPORT_STATUS_ERROR = "error"
+
+# 1回のINSERTで登録する案件数（失敗したまとまりは1件ずつ登録し直す）
+INSERT_CHUNK_SIZE = 100
+# PostgreSQLの一意制約違反
+UNIQUE_VIOLATION = "23505"
+
+
+@dataclass
+class ImportFileResult:
+    """1ファイルの取り込み結果"""
+    filename: str
+    status: str = IMPORT_STATUS_ERROR
+    management_no: Optional[str] = None
+    project_id: Optional[str] = None
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+def _label_regex(labels: Tuple[str, ...]) -> "re.Pattern[str]":
+    alternatives = "|".join(re.escape(label) for label in sorted(labels, key=len, reverse=True))
+    return re.compile(rf"(?:{alternatives})\s*[:：]?\s*([^\n]+)")
+
+
+_FIELD_REGEXES = {name: _label_regex(labels) for name, labels in FIELD_LABELS.items()}
+
+
+def parse_commission_text(text: str) -> Dict[str, str]:
+    """委託書のテキストから項目を抽出（ラベルの後ろの値、見つからない項目は含まない）
+
+    全角英数字等はNFKCで正規化して照合する。機種のみ世代表記（Ⅲ等）を保持するため正規化前の値を使う
+    """
+    normalized = normalize_text(text)
+    fields: Dict[str, str] = {}
+    for name, regex in _FIELD_REGEXES.items():
+        match = regex.search(text if name == "model" else normalized)
+        if match and match.group(1).strip():
+            fields[name] = match.group(1).strip()
+
+    # 管理Noは表形式でラベルと値が離れている場合もあるため、書式からも探す
+    management_no = MANAGEMENT_NO_PATTERN.search(fields.get("management_no", "")) \
+        or MANAGEMENT_NO_PATTERN.search(normalized)
+    if management_no:
+        fields["management_no"] = management_no.group(1)
+    else:
+        fields.pop("management_no", None)
+    return fields
+
+
+def parse_commission_pdf(path: str, ocr_languages: str) -> Dict[str, str]:
+    """委託書PDFを解析（プロセスプールで実行する関数）"""
+    pages = extract_pdf_pages(path, ocr_languages, normalize=False)["pages"]
+    return parse_commission_text("\n".join(pages))
+
+
+def _parse_date(value: str) -> Optional[date]:
+    match = DATE_PATTERN.search(value)
+    if not match:
+        return None
+    year, month, day = (int(part) for part in match.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _parse_minutes(value: str) -> Optional[int]:
+    """予定工数を分に変換（単位なし・H・時間は時間、分・minは分として扱う）"""
+    match = HOURS_PATTERN.search(value)
+    if not match:
+        return None
+    amount = float(match.group(1))
+    if match.group(2) in ("分", "min"):
+        return int(round(amount))
+    return int(round(amount * 60))
+
+
+def _find_master_id(db: Client, table: str, name_column: str, name: str) -> Optional[str]:
+    target = normalize_text(name).strip()
+    for row in get_master_rows(db, table):
+        if normalize_text(row.get(name_column) or "").strip() == target:
+            return row["id"]
+    return None
+
+
+def build_project(db: Client, fields: Dict[str, str], result: ImportFileResult) -> Optional[ProjectCreate]:
+    """抽出した項目をProjectCreateに変換（解決できない項目は警告、必須項目の欠落はエラー）"""
+    data: Dict[str, Any] = {
+        "management_no": fields.get("management_no"),
+        "machine_no": fields.get("machine_no"),
+        "commission_content": fields.get("commission_content"),
+    }
+    result.management_no = data["management_no"]
+    if not data["management_no"]:
+        result.errors.append("管理Noが見つかりません")
+        return None
+
+    model = fields.get("model")
+    if model:
+        match = MODEL_PATTERN.match(model)
+        if match:
+            series, tonnage, generation, spec = match.groups()
+            data["tonnage"] = tonnage
+            data["generation"] = generation or None
+            data["spec_tags"] = spec
+            series_id = _find_master_id(db, "machine_series_master", "series_name", series)
+            if series_id:
+                data["machine_series_id"] = series_id
+            else:
+                result.warnings.append(f"機種シリーズ「{series}」がマスタにありません")
+        else:
+            result.warnings.append(f"機種「{model}」を解釈できません")
+
+    for name, (id_field, table, name_column) in _MASTER_FIELDS.items():
+        value = fields.get(name)
+        if not value:
+            continue
+        master_id = _find_master_id(db, table, name_column, value)
+        if master_id:
+            data[id_field] = master_id
+        else:
+            result.warnings.append(f"{FIELD_LABELS[name][0]}「{value}」がマスタにありません")
+
+    if fields.get("estimated_hours"):
+        data["estimated_hours"] = _parse_minutes(fields["estimated_hours"])
+        if data["estimated_hours"] is None:
+            result.warnings.append(f"予定工数「{fields['estimated_hours']}」を解釈できません")
+
+    for name in ("start_date", "completion_date", "drawing_deadline"):
+        if fields.get(name):
+            data[name] = _parse_date(fields[name])
+            if data[name] is None:
+                result.warnings.append(f"{FIELD_LABELS[name][0]}「{fields[name]}」を日付として解釈できません")
+
+    try:
+        return ProjectCreate(**{key: value for key, value in data.items() if value is not None})
+    except ValidationError as e:
+        result.errors.extend(
+            f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+        return None
+
+
+async def parse_commission_pdfs(paths: List[Path]) -> List[Any]:
+    """委託書PDFをプロセスプールで並列に解析（失敗したファイルは例外オブジェクトを返す）"""
+    loop = asyncio.get_running_loop()
+    executor = get_document_executor()
+    return await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, parse_commission_pdf, str(path), settings.OCR_LANGUAGES)
+            for path in paths
+        ),
+        return_exceptions=True,
+    )
+
+
+def register_commission_projects(
+    db: Client,
+    parsed: List[Tuple[str, Any]],
+    created_by: str,
+    dry_run: bool = False,
+) -> List[ImportFileResult]:
+    """解析結果を検証し、有効な案件をまとめて登録
+
+    parsed: (ファイル名, 解析結果の項目 or 例外) のリスト
+    管理Noが既存案件またはバッチ内の他ファイルと重複するものはスキップする
+    登録に失敗した案件はそのファイルのみエラーとし、他のファイルの登録は続ける
+    """
+    results: List[ImportFileResult] = []
+    candidates: List[Tuple[ImportFileResult, ProjectCreate]] = []
+    for filename, fields in parsed:
+        result = ImportFileResult(filename=filename)
+        results.append(result)
+        if isinstance(fields, BaseException):
+            result.errors.append(f"PDFの解析に失敗しました: {fields}")
+            continue
+        project = build_project(db, fields, result)
+        if project:
+            candidates.append((result, project))
+
+    # 管理Noの重複チェック（既存案件は1回のクエリで確認）
+    management_nos = [project.management_no for _, project in candidates]
+    existing_nos = set()
+    if management_nos:
+        existing = db.table("projects") \
+            .select("management_no") \
+            .in_("management_no", management_nos) \
+            .eq("is_active", True) \
+            .execute()
+        existing_nos = {row["management_no"] for row in existing.data or []}
+
+    seen = set()
+    rows = []
+    registering: List[ImportFileResult] = []
+    for result, project in candidates:
+        if project.management_no in existing_nos:
+            result.status = IMPORT_STATUS_SKIPPED
+            result.errors.append("この管理Noは既に使用されています")
+            continue
+        if project.management_no in seen:
+            result.status = IMPORT_STATUS_SKIPPED
+            result.errors.append("同じ管理Noのファイルがバッチ内に複数あります")
+            continue
+        seen.add(project.management_no)
+
+        result.project_id = str(uuid.uuid4())
+        result.status = IMPORT_STATUS_VALID
+        registering.append(result)
+        rows.append({
+            "id": result.project_id,
+            **project.model_dump(mode="json", exclude_none=True),
+            "created_by": created_by,
+            "actual_hours": 0,
+            "is_active": True,
+        })
+
+    if dry_run or not rows:
+        if dry_run:
+            for result in results:
+                result.project_id = None
+        return results
+
+    for offset in range(0, len(rows), INSERT_CHUNK_SIZE):
+        _insert_chunk(
+            db, rows[offset:offset + INSERT_CHUNK_SIZE], registering[offset:offset + INSERT_CHUNK_SIZE]
+        )
+    return results
+
+
+def _insert_chunk(db: Client, rows: List[Dict[str, Any]], chunk_results: List[ImportFileResult]) -> None:
+    """案件をまとめて登録し、失敗した場合は1件ずつ登録し直してファイルごとの結果を記録"""
+    try:
+        db.table("projects").insert(rows).execute()
+    except APIError:
+        for row, result in zip(rows, chunk_results):
+            _insert_one(db, row, result)
+        return
+    for result in chunk_results:
+        result.status = IMPORT_STATUS_CREATED
+
+
+def _insert_one(db: Client, row: Dict[str, Any], result: ImportFileResult) -> None:
+    result.project_id = None
+    try:
+        db.table("projects").insert(row).execute()
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
+            # 重複チェック後に他のリクエストが同じ管理Noを登録した
+            result.status = IMPORT_STATUS_SKIPPED
+            result.errors.append("この管理Noは既に使用されています")
+        else:
+            result.status = IMPORT_STATUS_ERROR
+            result.errors.append(f"案件の登録に失敗しました: {e.message}")
+        return
+    result.project_id = row["id"]
+    result.status = IMPORT_STATUS_CREATED
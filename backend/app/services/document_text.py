@@ -0,0 +1,110 @@
+"""
+PDF・画像からのテキスト抽出
+
+PDFはテキストレイヤーをPyPDF2で読み取り、テキストの無いページ（スキャン画像）のみ
+埋め込み画像をtesseractでOCRする。画像ファイルはそのままOCRする。
+抽出処理はCPUを占有するため、専用のプロセスプール（get_document_executor）で実行する。
+"""
+
+import io
+import multiprocessing
+import threading
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+PDF_EXTENSIONS = {".pdf"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp"}
+EXTRACTABLE_EXTENSIONS = PDF_EXTENSIONS | IMAGE_EXTENSIONS
+
+# PDF・OCR処理専用のプロセスプール（リクエスト処理用スレッドプールを占有しないため）
+_document_executor: Optional[ProcessPoolExecutor] = None
+_document_executor_lock = threading.Lock()
+
+
+def is_extractable(filename: str) -> bool:
+    """テキスト抽出の対象となるファイルか（拡張子で判定）"""
+    return Path(filename).suffix.lower() in EXTRACTABLE_EXTENSIONS
+
+
+def normalize_text(text: str) -> str:
+    """検索用に正規化（全角英数字・半角カナ等をNFKCで統一）"""
+    return unicodedata.normalize("NFKC", text)
+
+
+def _ocr_image(image_bytes: bytes, ocr_languages: str) -> str:
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return pytesseract.image_to_string(image, lang=ocr_languages)
+
+
+def extract_pdf_pages(path: str, ocr_languages: str, normalize: bool = True) -> Dict[str, Any]:
+    """PDFのページごとのテキストを抽出（テキストの無いページのみOCR）
+
+    normalize=Falseの場合はNFKC正規化しない（Ⅲ等の表記を保持したい場合）
+
+    戻り値: {"pages": [ページごとのテキスト], "ocr_pages": OCRしたページ数}
+    """
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    pages: List[str] = []
+    ocr_pages = 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        if not text.strip():
+            images = list(page.images)
+            if images:
+                text = "\n".join(_ocr_image(image.data, ocr_languages) for image in images)
+                ocr_pages += 1
+        pages.append(normalize_text(text) if normalize else text)
+    return {"pages": pages, "ocr_pages": ocr_pages}
+
+
+def extract_document_text(path: str, ocr_languages: str) -> Dict[str, Any]:
+    """PDF・画像ファイルのテキストを抽出（プロセスプールで実行する関数）
+
+    戻り値: {"content": 全文, "page_count": ページ数, "ocr_pages": OCRしたページ数}
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix in PDF_EXTENSIONS:
+        result = extract_pdf_pages(path, ocr_languages)
+        return {
+            "content": "\n".join(result["pages"]),
+            "page_count": len(result["pages"]),
+            "ocr_pages": result["ocr_pages"],
+        }
+    if suffix in IMAGE_EXTENSIONS:
+        return {
+            "content": normalize_text(_ocr_image(Path(path).read_bytes(), ocr_languages)),
+            "page_count": 1,
+            "ocr_pages": 1,
+        }
+    raise ValueError(f"テキスト抽出に未対応のファイル形式です: {suffix}")
+
+
+def get_document_executor() -> ProcessPoolExecutor:
+    """PDF・OCR処理用プロセスプールを取得（初回呼び出し時に生成）"""
+    global _document_executor
+    if _document_executor is None:
+        with _document_executor_lock:
+            if _document_executor is None:
+                _document_executor = ProcessPoolExecutor(
+                    max_workers=settings.DOCUMENT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _document_executor
+
+
+def shutdown_document_executor() -> None:
+    """PDF・OCR処理用プロセスプールを停止"""
+    global _document_executor
+    with _document_executor_lock:
+        if _document_executor is not None:
+            _document_executor.shutdown(wait=False, cancel_futures=True)
+            _document_executor = None
@@ -0,0 +1,166 @@
+"""
+Range対応のファイルレスポンス
+
+ローカルファイルを Range / If-Range / If-None-Match に従って返す。
+ASGIサーバーがゼロコピー拡張（http.response.zerocopy）に対応していればsendfile相当で送信し、
+非対応の場合はスレッドプールでチャンク単位に読み込んで送信する。
+"""
+
+import os
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 256 * 1024
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """日本語ファイル名に対応したContent-Dispositionヘッダ値（RFC 6266 / 5987）"""
+    ascii_fallback = filename.encode("ascii", "replace").decode("ascii").replace("?", "_").replace('"', "_")
+    return f"{disposition}; filename=\"{ascii_fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def _parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """単一のbytes範囲を (開始, 終了) で返す
+
+    満たせない範囲はValueError、解釈できない指定や複数範囲はNone（Rangeを無視して全体を返す）
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_text, separator, end_text = spec.strip().partition("-")
+    if not separator or not all(text == "" or text.isdigit() for text in (start_text, end_text)):
+        return None
+
+    if start_text == "":
+        # 末尾からのサフィックス指定（bytes=-500）
+        if end_text == "":
+            return None
+        suffix = int(end_text)
+        if suffix == 0 or file_size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(file_size - suffix, 0), file_size - 1
+
+    start = int(start_text)
+    if start >= file_size:
+        raise ValueError("unsatisfiable range")
+    end = int(end_text) if end_text else file_size - 1
+    if start > end:
+        return None
+    return start, min(end, file_size - 1)
+
+
+def _if_range_matches(if_range: str, etag: str, last_modified: str) -> bool:
+    """If-Rangeの条件を満たすか（RFC 7233 §3.2: エンティティタグは強い比較のみ）
+
+    弱いETag（W/）では一致とみなさず、Range要求を無視して全体を返す
+    """
+    if_range = if_range.strip()
+    if if_range.startswith("W/"):
+        return False
+    if if_range.startswith('"'):
+        return not etag.startswith("W/") and if_range == etag
+    return if_range == last_modified
+
+
+class RangeFileResponse(Response):
+    """Range要求に対応したファイルレスポンス"""
+
+    def __init__(
+        self,
+        path: Path,
+        request: Request,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        etag: Optional[str] = None,
+    ):
+        stat = os.stat(path)
+        self.path = path
+        self.file_size = stat.st_size
+        self.start = 0
+        self.length = self.file_size
+
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        if etag is None:
+            etag = f'W/"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": last_modified,
+        }
+        if filename:
+            headers["content-disposition"] = content_disposition(filename)
+
+        status_code = 200
+        if_none_match = request.headers.get("if-none-match")
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            status_code = 304
+            self.length = 0
+        elif range_header and (if_range is None or _if_range_matches(if_range, etag, last_modified)):
+            try:
+                byte_range = _parse_range(range_header, self.file_size)
+            except ValueError:
+                byte_range = None
+                status_code = 416
+                self.length = 0
+                headers["content-range"] = f"bytes */{self.file_size}"
+            if byte_range is not None:
+                self.start, end = byte_range
+                self.length = end - self.start + 1
+                status_code = 206
+                headers["content-range"] = f"bytes {self.start}-{end}/{self.file_size}"
+
+        if status_code != 304:
+            headers["content-length"] = str(self.length)
+
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if self.length == 0 or scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        file = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                # サーバー側でsendfileにより送信（アプリ側でバイト列を扱わない）
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+                return
+
+            fd = file.fileno()
+            position = self.start
+            remaining = self.length
+            while remaining > 0:
+                chunk = await run_in_threadpool(os.pread, fd, min(CHUNK_SIZE, remaining), position)
+                if not chunk:
+                    break
+                position += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await run_in_threadpool(file.close)
@@ -0,0 +1,163 @@
+"""
+請求書エクスポート
+
+明細行のイテレータからCSV / Excel（xlsx）をチャンク単位で生成する。
+行は逐次処理し、出力全体をメモリ上に保持しない。
+"""
+
+import codecs
+import csv
+import tempfile
+from typing import IO, Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Sequence
+
+from fastapi.concurrency import run_in_threadpool
+from openpyxl import Workbook
+
+CSV_MEDIA_TYPE = "text/csv"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 1回の送信にまとめるバイト数の目安
+CHUNK_SIZE = 64 * 1024
+# xlsx生成時にメモリ上に保持する上限（超えると一時ファイルに退避）
+XLSX_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# 非同期に取得した行をスレッドプールでxlsxに書き出す際の1回あたりの行数
+XLSX_APPEND_BATCH_SIZE = 500
+
+
+class _EchoBuffer:
+    """csv.writerの出力先（書き込まれた文字列をそのまま返す）"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class _CsvChunker:
+    """CSVの行を整形し、CHUNK_SIZEごとにまとめて返す（同期・非同期の生成で共通）"""
+
+    def __init__(self, header: Sequence[Any]):
+        self._writer = csv.writer(_EchoBuffer())
+        self._buffer = [codecs.BOM_UTF8.decode("utf-8"), self._writer.writerow(header)]
+        self._buffered_size = 0
+
+    def add(self, row: Sequence[Any]) -> Optional[bytes]:
+        """行を追加し、CHUNK_SIZEに達した場合はまとめたチャンクを返す"""
+        line = self._writer.writerow(row)
+        self._buffer.append(line)
+        self._buffered_size += len(line)
+        if self._buffered_size < CHUNK_SIZE:
+            return None
+        return self.flush()
+
+    def flush(self) -> Optional[bytes]:
+        """未送信の行をチャンクとして返す（無ければNone）"""
+        if not self._buffer:
+            return None
+        chunk = "".join(self._buffer).encode("utf-8")
+        self._buffer = []
+        self._buffered_size = 0
+        return chunk
+
+
+class _XlsxBuilder:
+    """書き込み専用モードのブック（同期・非同期の生成で共通）
+
+    書き込み専用モードは行を一時ファイルに書き出すため、非同期の生成ではスレッドプールから呼び出す
+    """
+
+    def __init__(self, header: Sequence[Any], sheet_title: str):
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(title=sheet_title)
+        self._sheet.append(list(header))
+
+    def append_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        for row in rows:
+            self._sheet.append(list(row))
+
+    def save(self) -> IO[bytes]:
+        """ブックを保存し、先頭に戻した保存先を返す（一定サイズを超えると一時ファイルに退避）"""
+        spool = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE)
+        try:
+            self._workbook.save(spool)
+            spool.seek(0)
+        except BaseException:
+            spool.close()
+            raise
+        return spool
+
+
+def iter_csv(header: Sequence[Any], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """CSVをチャンク単位で生成（BOM付きUTF-8）"""
+    chunker = _CsvChunker(header)
+    for row in rows:
+        chunk = chunker.add(row)
+        if chunk is not None:
+            yield chunk
+
+    chunk = chunker.flush()
+    if chunk is not None:
+        yield chunk
+
+
+def iter_xlsx(header: Sequence[Any], rows: Iterable[Sequence[Any]], sheet_title: str = "請求書") -> Iterator[bytes]:
+    """xlsxをチャンク単位で生成
+
+    openpyxlの書き込み専用モードで行を逐次書き出す。xlsxはZIP形式のため
+    ブック全体の保存後に送信を開始する（保存先は一定サイズを超えると一時ファイルに退避）
+    """
+    builder = _XlsxBuilder(header, sheet_title)
+    builder.append_rows(rows)
+
+    with builder.save() as spool:
+        while True:
+            chunk = spool.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def aiter_csv(header: Sequence[Any], rows: AsyncIterable[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """CSVをチャンク単位で生成（行を非同期に取得する場合）"""
+    chunker = _CsvChunker(header)
+    async for row in rows:
+        chunk = chunker.add(row)
+        if chunk is not None:
+            yield chunk
+
+    chunk = chunker.flush()
+    if chunk is not None:
+        yield chunk
+
+
+async def aiter_xlsx(
+    header: Sequence[Any], rows: AsyncIterable[Sequence[Any]], sheet_title: str = "請求書"
+) -> AsyncIterator[bytes]:
+    """xlsxをチャンク単位で生成（行を非同期に取得する場合）
+
+    行の書き出し・ブックの保存・読み出しはファイル操作を伴うため、
+    XLSX_APPEND_BATCH_SIZE行ずつまとめてスレッドプールで実行する
+    """
+    builder = await run_in_threadpool(_XlsxBuilder, header, sheet_title)
+    batch: List[Sequence[Any]] = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= XLSX_APPEND_BATCH_SIZE:
+            await run_in_threadpool(builder.append_rows, batch)
+            batch = []
+    if batch:
+        await run_in_threadpool(builder.append_rows, batch)
+
+    spool = await run_in_threadpool(builder.save)
+    try:
+        while True:
+            chunk = await run_in_threadpool(spool.read, CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await run_in_threadpool(spool.close)
+
+
+def iter_bytes(content: bytes) -> Iterator[bytes]:
+    """生成済みのバイト列をチャンク単位で返す"""
+    for offset in range(0, len(content), CHUNK_SIZE):
+        yield content[offset:offset + CHUNK_SIZE]
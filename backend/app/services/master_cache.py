@@ -0,0 +1,99 @@
+"""
+マスタデータキャッシュ
+
+進捗・作業区分・問い合わせ・機種シリーズの各マスタを全件キャッシュする。
+マスタの更新頻度は低いため、TTL経過または書き込み時の明示的な破棄でのみ再取得する。
+"""
+
+from supabase import AsyncClient, Client
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+MASTER_TABLES = (
+    "master_shinchoku",
+    "master_sagyou_kubun",
+    "master_toiawase",
+    "machine_series_master",
+)
+
+_master_cache = TTLCache("masters", ttl_seconds=settings.MASTER_CACHE_TTL_SECONDS, maxsize=len(MASTER_TABLES))
+
+
+_MISSING = object()
+
+
+def _index_master(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "rows": rows,
+        "by_id": {row["id"]: row for row in rows},
+    }
+
+
+def _load_master(db: Client, table: str) -> Dict[str, Any]:
+    """マスタを全件取得（無効データ含む、sort_order順）"""
+    response = db.table(table).select("*").order("sort_order").execute()
+    return _index_master(response.data or [])
+
+
+def _check_table(table: str) -> None:
+    if table not in MASTER_TABLES:
+        raise ValueError(f"キャッシュ対象外のテーブルです: {table}")
+
+
+def _get_master(db: Client, table: str) -> Dict[str, Any]:
+    _check_table(table)
+    return _master_cache.get_or_load(table, lambda: _load_master(db, table))
+
+
+async def _aget_master(db: AsyncClient, table: str) -> Dict[str, Any]:
+    _check_table(table)
+    master = _master_cache.get(table, _MISSING)
+    if master is _MISSING:
+        generation = _master_cache.generation
+        response = await db.table(table).select("*").order("sort_order").execute()
+        master = _index_master(response.data or [])
+        # 取得中に更新（invalidate_master）された場合は古い内容を登録しない
+        _master_cache.set_if_current(table, master, generation)
+    return master
+
+
+def _copy_rows(rows: List[Dict[str, Any]], include_inactive: bool) -> List[Dict[str, Any]]:
+    """キャッシュした行のコピーを返す（呼び出し側の変更がキャッシュに影響しないように）"""
+    return [dict(row) for row in rows if include_inactive or row.get("is_active", True)]
+
+
+def _copy_row(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return dict(row) if row is not None else None
+
+
+def get_master_rows(db: Client, table: str, include_inactive: bool = False) -> List[Dict[str, Any]]:
+    """マスタ一覧を取得（sort_order順）"""
+    rows = _get_master(db, table)["rows"]
+    return _copy_rows(rows, include_inactive)
+
+
+def get_master_by_id(db: Client, table: str, item_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """IDでマスタを取得（存在しなければNone）"""
+    if not item_id:
+        return None
+    return _copy_row(_get_master(db, table)["by_id"].get(str(item_id)))
+
+
+async def aget_master_rows(db: AsyncClient, table: str, include_inactive: bool = False) -> List[Dict[str, Any]]:
+    """マスタ一覧を取得（非同期Client用）"""
+    rows = (await _aget_master(db, table))["rows"]
+    return _copy_rows(rows, include_inactive)
+
+
+async def aget_master_by_id(db: AsyncClient, table: str, item_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """IDでマスタを取得（非同期Client用）"""
+    if not item_id:
+        return None
+    return _copy_row((await _aget_master(db, table))["by_id"].get(str(item_id)))
+
+
+def invalidate_master(table: str) -> None:
+    """マスタのキャッシュを破棄（作成・更新・削除後に呼び出す）"""
+    _master_cache.invalidate(table)
@@ -0,0 +1,80 @@
+"""
+重複排除した資料ファイルの削除
+
+同じ内容の資料は1つのファイル（materials.file_path）を共有するため、参照数が0になったファイルを
+削除する間に、同じ内容のアップロードが新しい参照を登録することがある。
+アップロードは行の登録後にファイルの有無を確認し、無い場合のみ保存するため、削除側は次の順序で処理する。
+1. ファイルを退避用のキー（releasing/配下）へ移動する
+2. 参照数を再確認する（count_material_refs: release_materialと同じアドバイザリロックを取る）
+3. 参照が残っていればファイルを元に戻し、無ければ退避したファイルを削除する
+再確認より前に登録された参照は2.で検出されてファイルが戻され、後に登録された参照は
+1.の退避後に存在を確認するためアップロード側で保存し直される。参照中のファイルが失われることはない。
+"""
+
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from supabase import Client
+
+from app.services.storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+RELEASING_PREFIX = "releasing/"
+RELEASED_AT_FORMAT = "%Y%m%d%H%M%S"
+
+
+def count_material_refs(db: Client, file_path: str) -> int:
+    """ファイルを参照しているmaterials行の数"""
+    response = db.rpc("count_material_refs", {"p_file_path": file_path}).execute()
+    return int(response.data or 0)
+
+
+def releasing_key(key: str, moved_at: Optional[datetime] = None) -> str:
+    """削除前にファイルを退避するキー（releasing/<退避日時>-<ランダム>/<元のキー>）
+
+    ローカルストレージの移動は更新日時を変えないため、退避した日時をキーに含める
+    """
+    moved_at = moved_at or datetime.now(timezone.utc)
+    return f"{RELEASING_PREFIX}{moved_at:{RELEASED_AT_FORMAT}}-{uuid.uuid4().hex}/{key}"
+
+
+def original_key(held_key: str) -> str:
+    """退避用のキーから元のキーを取得"""
+    return held_key[len(RELEASING_PREFIX):].split("/", 1)[1]
+
+
+def released_at(held_key: str) -> Optional[datetime]:
+    """退避用のキーから退避した日時（UTC）を取得（形式が異なる場合はNone）"""
+    token = held_key[len(RELEASING_PREFIX):].split("/", 1)[0].split("-", 1)[0]
+    try:
+        return datetime.strptime(token, RELEASED_AT_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def detach_if_unreferenced(db: Client, storage: StorageBackend, key: str, held_key: str) -> bool:
+    """ファイルをheld_keyへ退避し、参照が無いことを確認できた場合はTrue（退避したまま）
+
+    参照が残っていた場合は元のキーへ戻してFalseを返す
+    """
+    if not storage.exists(key):
+        return False
+    storage.move(key, held_key)
+    if count_material_refs(db, key) == 0:
+        return True
+    # 退避中に同じ内容のアップロードがファイルを保存し直した場合も、内容は同一のため上書きしてよい
+    storage.move(held_key, key)
+    logger.info(f"Material file still referenced, restored: {key}")
+    return False
+
+
+def delete_if_unreferenced(db: Client, storage: StorageBackend, key: str) -> bool:
+    """参照されていないことを確認してからファイルを削除し、削除した場合はTrue"""
+    held_key = releasing_key(key)
+    if not detach_if_unreferenced(db, storage, key, held_key):
+        return False
+    storage.delete(held_key)
+    return True
@@ -0,0 +1,168 @@
+"""
+資料の階層的スコープ検索
+
+優先度 machine > model > tonnage > series の4階層を1回のOR条件クエリで取得し、
+各資料に一致した階層（matched_scope）と優先度（priority、1が最優先）を付与する。
+machine_noのみ指定された場合は、projectsから機種・トン数・シリーズを解決する（キャッシュあり）。
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from supabase import Client
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.master_cache import get_master_by_id
+
+# 階層と優先度（数値が小さいほど優先）
+SCOPE_PRIORITY = {
+    "machine": 1,
+    "model": 2,
+    "tonnage": 3,
+    "series": 4,
+}
+
+_machine_profile_cache = TTLCache(
+    "machine_profiles",
+    ttl_seconds=settings.MACHINE_PROFILE_CACHE_TTL_SECONDS,
+    maxsize=settings.MACHINE_PROFILE_CACHE_MAXSIZE,
+)
+
+
+@dataclass(frozen=True)
+class MachineProfile:
+    """機番から解決した機種情報"""
+    series: Optional[str]
+    model: Optional[str]
+    tonnage: Optional[int]
+
+
+def _parse_tonnage(value: Any) -> Optional[int]:
+    """projects.tonnage（文字列）を資料のトン数（整数）に変換"""
+    if value is None:
+        return None
+    digits = "".join(ch for ch in str(value) if ch.isdigit())
+    return int(digits) if digits else None
+
+
+def _load_machine_profile(db: Client, machine_no: str) -> Optional[MachineProfile]:
+    response = db.table("projects") \
+        .select("machine_series_id, generation, tonnage") \
+        .eq("machine_no", machine_no) \
+        .eq("is_active", True) \
+        .order("created_at", desc=True) \
+        .limit(1) \
+        .execute()
+    if not response.data:
+        return None
+
+    project = response.data[0]
+    series_row = get_master_by_id(db, "machine_series_master", project.get("machine_series_id"))
+    series = series_row["series_name"] if series_row else None
+    tonnage = _parse_tonnage(project.get("tonnage"))
+
+    # 機種名はシリーズ＋トン数＋世代（例: NEX + 140 + Ⅲ → NEX140Ⅲ）
+    model = None
+    if series and tonnage:
+        model = f"{series}{tonnage}{project.get('generation') or ''}"
+
+    return MachineProfile(series=series, model=model, tonnage=tonnage)
+
+
+def resolve_machine_profile(db: Client, machine_no: str) -> Optional[MachineProfile]:
+    """機番から機種・トン数・シリーズを解決（projectsに存在しなければNone）"""
+    return _machine_profile_cache.get_or_load(machine_no, lambda: _load_machine_profile(db, machine_no))
+
+
+def invalidate_machine_profiles() -> None:
+    """機番の解決結果を破棄（案件の作成・更新・削除後に呼び出す）"""
+    _machine_profile_cache.clear()
+
+
+def _quote(value: Any) -> str:
+    """PostgRESTのor条件で使う値のクォート（カンマ・括弧・ハイフン等を含む値に対応）"""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _scope_conditions(
+    machine_no: Optional[str],
+    model: Optional[str],
+    tonnage: Optional[int],
+    series: Optional[str],
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """検索対象の階層と一致条件の一覧（優先度順）"""
+    conditions = []
+    if machine_no:
+        conditions.append(("machine", {"machine_no": machine_no}))
+    if model:
+        conditions.append(("model", {"model": model}))
+    if tonnage:
+        # トン数共通資料はシリーズが分かればシリーズも一致させる
+        conditions.append(("tonnage", {"tonnage": tonnage, **({"series": series} if series else {})}))
+    if series:
+        conditions.append(("series", {"series": series}))
+    return conditions
+
+
+def _or_filter(conditions: List[Tuple[str, Dict[str, Any]]]) -> str:
+    parts = []
+    for scope, fields in conditions:
+        terms = [f"scope.eq.{scope}"] + [f"{column}.eq.{_quote(value)}" for column, value in fields.items()]
+        parts.append(f"and({','.join(terms)})")
+    return ",".join(parts)
+
+
+def _matched_scope(material: Dict[str, Any], conditions: List[Tuple[str, Dict[str, Any]]]) -> Optional[str]:
+    for scope, fields in conditions:
+        if material.get("scope") == scope and all(material.get(column) == value for column, value in fields.items()):
+            return scope
+    return None
+
+
+def search_materials_hierarchical(
+    db: Client,
+    machine_no: Optional[str] = None,
+    model: Optional[str] = None,
+    tonnage: Optional[int] = None,
+    series: Optional[str] = None,
+    scope: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    階層的スコープ検索
+
+    指定された最も具体的な階層以下（例: machine_no指定時は machine/model/tonnage/series）の資料を
+    1回のクエリで取得し、優先度順・登録日時の新しい順に並べて返す。
+    明示的に指定された model / tonnage / series は機番からの解決結果より優先する。
+    """
+    if machine_no and not (model and tonnage and series):
+        profile = resolve_machine_profile(db, machine_no)
+        if profile:
+            model = model or profile.model
+            tonnage = tonnage or profile.tonnage
+            series = series or profile.series
+
+    query = db.table("materials").select("*")
+    if scope:
+        query = query.eq("scope", scope)
+
+    conditions = _scope_conditions(machine_no, model, tonnage, series)
+    if not conditions:
+        # パラメータなしの場合は全件取得
+        result = query.order("created_at", desc=True).execute()
+        return [
+            {**material, "matched_scope": None, "priority": SCOPE_PRIORITY.get(material.get("scope"))}
+            for material in result.data or []
+        ]
+
+    result = query.or_(_or_filter(conditions)).order("created_at", desc=True).execute()
+
+    materials = []
+    for material in result.data or []:
+        matched = _matched_scope(material, conditions)
+        materials.append({**material, "matched_scope": matched, "priority": SCOPE_PRIORITY.get(matched)})
+
+    # 登録日時の降順を保ったまま優先度順に並べる（安定ソート）
+    materials.sort(key=lambda material: material["priority"] or len(SCOPE_PRIORITY) + 1)
+    return materials
@@ -0,0 +1,174 @@
+"""
+資料の全文検索インデックス
+
+アップロードされたPDF・画像のテキストをバックグラウンドで抽出し、material_textsに保存する。
+抽出結果はファイル内容のSHA-256ごとに1件で、同一内容の資料（重複排除済み）は再抽出しない。
+ワーカーの再起動等でpendingのまま残った抽出は、定期的に検出して再開する（run_periodic_material_text_retry）。
+同じ内容の資料が全て削除された場合、抽出結果はDB側（release_material）で削除する。
+検索はpg_trgmのGINインデックスを使った部分一致（日本語でも分かち書き不要）で行う。
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from supabase import Client
+
+from app.core.config import settings
+from app.core.database import get_supabase_client
+from app.services.document_text import (
+    extract_document_text,
+    get_document_executor,
+    is_extractable,
+    normalize_text,
+)
+from app.services.storage import LocalStorage, StorageBackend, get_storage
+from app.services.uploads import discard_staged
+
+logger = logging.getLogger(__name__)
+
+TEXT_STATUS_PENDING = "pending"
+TEXT_STATUS_DONE = "done"
+TEXT_STATUS_FAILED = "failed"
+
+# 実行中の抽出タスク（参照を保持しないとGCで破棄されるため）
+_extraction_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def _claim_extraction(db: Client, content_sha256: str, force: bool) -> bool:
+    """抽出を開始してよいか判定し、pendingとして登録する
+
+    抽出済み、または他のリクエストが抽出中（タイムアウト前）の場合はFalse
+    判定と登録はDB側の1文で行い、同時に呼び出されても抽出を開始できるのは1件のみ
+    """
+    response = db.rpc("claim_material_text_extraction", {
+        "p_content_sha256": content_sha256,
+        "p_timeout_seconds": settings.MATERIAL_TEXT_PENDING_TIMEOUT_SECONDS,
+        "p_force": force,
+    }).execute()
+    return bool(response.data)
+
+
+def _save_extraction(db: Client, content_sha256: str, values: Dict[str, Any]) -> None:
+    db.table("material_texts").update({
+        **values,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("content_sha256", content_sha256).execute()
+
+
+def _close_and_download(fd: int, storage: StorageBackend, key: str, destination: Path) -> None:
+    os.close(fd)
+    storage.download_to(key, destination)
+
+
+async def _extract_material_text(db: Client, content_sha256: str, file_path: str, force: bool) -> None:
+    if not await run_in_threadpool(_claim_extraction, db, content_sha256, force):
+        return
+
+    storage = get_storage()
+    temp_path: Optional[Path] = None
+    try:
+        if isinstance(storage, LocalStorage):
+            source = storage.path_for(file_path)
+        else:
+            # オブジェクトストレージの場合は一時ファイルに取得してから抽出する
+            staging_dir = Path(settings.UPLOAD_ROOT) / ".staging"
+            await run_in_threadpool(staging_dir.mkdir, parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=staging_dir, suffix=Path(file_path).suffix)
+            temp_path = Path(temp_name)
+            await run_in_threadpool(_close_and_download, fd, storage, file_path, temp_path)
+            source = temp_path
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            get_document_executor(), extract_document_text, str(source), settings.OCR_LANGUAGES
+        )
+        await run_in_threadpool(_save_extraction, db, content_sha256, {
+            "status": TEXT_STATUS_DONE,
+            **result,
+        })
+        logger.info(
+            f"Material text extracted: {file_path} "
+            f"({result['page_count']} pages, {result['ocr_pages']} OCR)"
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Material text extraction failed: {file_path}: {e}", exc_info=True)
+        await run_in_threadpool(_save_extraction, db, content_sha256, {
+            "status": TEXT_STATUS_FAILED,
+            "error": str(e)[:1000],
+        })
+    finally:
+        if temp_path is not None:
+            await run_in_threadpool(discard_staged, temp_path)
+
+
+def schedule_material_text_extraction(
+    db: Client,
+    content_sha256: Optional[str],
+    file_path: str,
+    force: bool = False,
+) -> bool:
+    """資料ファイルのテキスト抽出をバックグラウンドで開始（イベントループ上から呼び出す）
+
+    抽出対象外のファイル形式の場合はFalse。リクエストの応答は抽出の完了を待たない。
+    """
+    if not content_sha256 or not is_extractable(file_path):
+        return False
+
+    task = asyncio.create_task(_extract_material_text(db, content_sha256, file_path, force))
+    _extraction_tasks.add(task)
+    task.add_done_callback(_extraction_tasks.discard)
+    return True
+
+
+def _find_stale_extractions(db: Client) -> List[Dict[str, Any]]:
+    response = db.rpc("find_stale_material_text_extractions", {
+        "p_timeout_seconds": settings.MATERIAL_TEXT_PENDING_TIMEOUT_SECONDS,
+        "p_limit": settings.MATERIAL_TEXT_RETRY_BATCH_SIZE,
+    }).execute()
+    return response.data or []
+
+
+async def retry_stale_material_text_extractions(db: Client) -> int:
+    """pendingのままタイムアウトした抽出（ワーカーの再起動等で中断されたもの）を再開し、件数を返す
+
+    再開の可否はclaim_material_text_extractionで判定するため、複数のワーカーで同時に実行しても重複しない
+    """
+    stale = await run_in_threadpool(_find_stale_extractions, db)
+    for row in stale:
+        schedule_material_text_extraction(db, row["content_sha256"], row["file_path"])
+    if stale:
+        logger.info(f"Retrying {len(stale)} stale material text extractions")
+    return len(stale)
+
+
+async def run_periodic_material_text_retry() -> None:
+    """起動時とMATERIAL_TEXT_RETRY_INTERVAL_SECONDSごとに中断された抽出を再開（アプリ起動中のバックグラウンドタスク）"""
+    while True:
+        try:
+            await retry_stale_material_text_extractions(get_supabase_client())
+        except Exception as e:
+            logger.error(f"Material text retry failed: {e}", exc_info=True)
+        await asyncio.sleep(settings.MATERIAL_TEXT_RETRY_INTERVAL_SECONDS)
+
+
+def cancel_material_text_extractions() -> None:
+    """実行中の抽出タスクを中断（アプリ終了時）"""
+    for task in list(_extraction_tasks):
+        task.cancel()
+
+
+def search_material_texts(db: Client, query: str, limit: int) -> List[Dict[str, Any]]:
+    """資料の本文を部分一致で検索（新しい順、一致箇所周辺の抜粋付き）"""
+    response = db.rpc("search_material_texts", {
+        "p_query": normalize_text(query).strip(),
+        "p_limit": limit,
+    }).execute()
+    return response.data or []
@@ -0,0 +1,246 @@
+"""
+資料ファイルのストレージ
+
+ローカルファイルシステムとMinIO（S3互換）の2種類のバックエンドを提供する。
+使用するバックエンドは設定 STORAGE_BACKEND（"local" | "minio"）で切り替える。
+キーは "materials/<ファイル名>" 形式の相対パスで、materials.file_path にそのまま保存する。
+資料ファイルは内容のSHA-256をキーにして保存し、同一内容のファイルを1つにまとめる。
+"""
+
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.core.config import settings
+
+STORAGE_BACKEND_LOCAL = "local"
+STORAGE_BACKEND_MINIO = "minio"
+
+
+@dataclass
+class StoredObject:
+    """ストレージ上のファイル"""
+    key: str
+    size: int
+    modified_at: datetime  # UTC
+
+
+def content_addressed_key(sha256: str, extension: str = "") -> str:
+    """内容ハッシュから資料ファイルのキーを生成（例: materials/blobs/ab/ab12...ef.pdf）"""
+    return f"materials/blobs/{sha256[:2]}/{sha256}{extension.lower()}"
+
+
+class StorageBackend(ABC):
+    """ストレージバックエンドの共通インターフェース"""
+
+    @abstractmethod
+    def put_file(self, key: str, source: Path, content_type: Optional[str] = None) -> None:
+        """受信済みのローカルファイルをキーに保存（sourceは保存後に不要となる）"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """キーのファイルを削除（存在しなければ何もしない）"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """キーのファイルが存在するか"""
+
+    @abstractmethod
+    def download_to(self, key: str, destination: Path) -> None:
+        """キーのファイルをローカルパスに取得"""
+
+    @abstractmethod
+    def iter_chunks(self, key: str, chunk_size: int) -> Iterator[bytes]:
+        """キーのファイルをチャンク単位で読み込む（ファイル全体をメモリに載せない）"""
+
+    @abstractmethod
+    def iter_objects(self, prefix: str) -> Iterator[StoredObject]:
+        """プレフィックス配下のファイルを列挙（一覧全体をメモリに載せない）"""
+
+    @abstractmethod
+    def move(self, key: str, new_key: str) -> None:
+        """ファイルを別のキーに移動"""
+
+    def presigned_download_url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        """クライアントが直接ダウンロードできる署名付きURL（非対応のバックエンドはNone）"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """ローカルファイルシステム上のストレージ（単一コンテナ向け）"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path_for(self, key: str) -> Path:
+        """キーに対応するファイルパス"""
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"不正なストレージキーです: {key}")
+        return path
+
+    def put_file(self, key: str, source: Path, content_type: Optional[str] = None) -> None:
+        destination = self.path_for(key)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        # 同一ファイルシステム上の移動のため、コピーせず原子的に置き換える
+        os.replace(source, destination)
+
+    def delete(self, key: str) -> None:
+        self.path_for(key).unlink(missing_ok=True)
+
+    def exists(self, key: str) -> bool:
+        return self.path_for(key).is_file()
+
+    def download_to(self, key: str, destination: Path) -> None:
+        shutil.copyfile(self.path_for(key), destination)
+
+    def iter_chunks(self, key: str, chunk_size: int) -> Iterator[bytes]:
+        with open(self.path_for(key), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def iter_objects(self, prefix: str) -> Iterator[StoredObject]:
+        root = self.root.resolve()
+        start = root / prefix
+        if not start.is_dir():
+            return
+        # os.walkはディレクトリ単位で一覧を作るため、scandirで1件ずつ辿る
+        stack = [start]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        yield StoredObject(
+                            key=Path(entry.path).relative_to(root).as_posix(),
+                            size=stat.st_size,
+                            modified_at=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                        )
+
+    def move(self, key: str, new_key: str) -> None:
+        destination = self.path_for(new_key)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.path_for(key), destination)
+
+
+class MinioStorage(StorageBackend):
+    """MinIO（S3互換）オブジェクトストレージ
+
+    大きなファイルは MINIO_PART_SIZE 単位のマルチパートアップロードとし、
+    MINIO_PARALLEL_UPLOADS 並列でパートを送信する
+    """
+
+    def __init__(self):
+        from minio import Minio
+
+        self.bucket = settings.MINIO_BUCKET
+        self.client = Minio(
+            settings.MINIO_ENDPOINT,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=settings.MINIO_SECURE,
+            region=settings.MINIO_REGION,
+        )
+        # 署名付きURLはクライアントから到達できるエンドポイントで発行する（署名はローカル計算のみ）
+        self.presign_client = self.client
+        if settings.MINIO_PUBLIC_ENDPOINT:
+            self.presign_client = Minio(
+                settings.MINIO_PUBLIC_ENDPOINT,
+                access_key=settings.MINIO_ACCESS_KEY,
+                secret_key=settings.MINIO_SECRET_KEY,
+                secure=settings.MINIO_PUBLIC_SECURE,
+                region=settings.MINIO_REGION,
+            )
+        if not self.client.bucket_exists(self.bucket):
+            self.client.make_bucket(self.bucket)
+
+    def put_file(self, key: str, source: Path, content_type: Optional[str] = None) -> None:
+        self.client.fput_object(
+            self.bucket,
+            key,
+            str(source),
+            content_type=content_type or "application/octet-stream",
+            part_size=settings.MINIO_PART_SIZE,
+            num_parallel_uploads=settings.MINIO_PARALLEL_UPLOADS,
+        )
+        source.unlink(missing_ok=True)
+
+    def delete(self, key: str) -> None:
+        self.client.remove_object(self.bucket, key)
+
+    def exists(self, key: str) -> bool:
+        from minio.error import S3Error
+
+        try:
+            self.client.stat_object(self.bucket, key)
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
+
+    def download_to(self, key: str, destination: Path) -> None:
+        self.client.fget_object(self.bucket, key, str(destination))
+
+    def iter_chunks(self, key: str, chunk_size: int) -> Iterator[bytes]:
+        response = self.client.get_object(self.bucket, key)
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+
+    def iter_objects(self, prefix: str) -> Iterator[StoredObject]:
+        # list_objectsはページ単位で取得しながら1件ずつ返す
+        for obj in self.client.list_objects(self.bucket, prefix=prefix, recursive=True):
+            if obj.is_dir:
+                continue
+            yield StoredObject(key=obj.object_name, size=obj.size or 0, modified_at=obj.last_modified)
+
+    def move(self, key: str, new_key: str) -> None:
+        from minio.commonconfig import CopySource
+
+        self.client.copy_object(self.bucket, new_key, CopySource(self.bucket, key))
+        self.client.remove_object(self.bucket, key)
+
+    def presigned_download_url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        from app.services.file_response import content_disposition
+
+        response_headers = {}
+        if filename:
+            response_headers["response-content-disposition"] = content_disposition(filename)
+        return self.presign_client.presigned_get_object(
+            self.bucket,
+            key,
+            expires=timedelta(seconds=settings.MINIO_PRESIGNED_URL_EXPIRE_SECONDS),
+            response_headers=response_headers or None,
+        )
+
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    """設定に応じたストレージバックエンドを取得（シングルトン）"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if settings.STORAGE_BACKEND == STORAGE_BACKEND_MINIO:
+                    _storage = MinioStorage()
+                elif settings.STORAGE_BACKEND == STORAGE_BACKEND_LOCAL:
+                    _storage = LocalStorage(Path(settings.UPLOAD_ROOT))
+                else:
+                    raise ValueError(f"未対応のSTORAGE_BACKENDです: {settings.STORAGE_BACKEND}")
+    return _storage
@@ -0,0 +1,211 @@
+"""
+孤立した資料ファイルの回収
+
+ストレージ上の materials/ 配下のファイルをページ単位で列挙し、STORAGE_GC_BATCH_SIZE件ずつ
+materials.file_path と照合して、どの資料からも参照されていないファイルを退避（quarantine/配下）
+または削除する。アップロード中のファイルを誤って回収しないよう、更新から猶予期間
+（STORAGE_GC_GRACE_SECONDS）が経過したものだけを対象とする。
+バッチの照合後に同じ内容のアップロードが参照を登録する場合があるため、回収はファイルごとに
+退避してから参照数を再確認し、参照が残っていれば元に戻す（app.services.material_files）。
+資料の削除が途中で中断され releasing/ に残ったファイルも、同様に確認して回収または復元する。
+ファイル一覧・参照一覧のどちらも全件をメモリに載せないため、数十万件規模でも実行できる。
+"""
+
+import asyncio
+import logging
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from supabase import Client
+
+from app.core.config import settings
+from app.core.database import get_supabase_client
+from app.services.material_files import (
+    RELEASING_PREFIX,
+    count_material_refs,
+    delete_if_unreferenced,
+    detach_if_unreferenced,
+    original_key,
+    released_at,
+)
+from app.services.storage import LocalStorage, StorageBackend, StoredObject, get_storage
+from app.services.uploads import discard_staged
+
+logger = logging.getLogger(__name__)
+
+GC_MODE_QUARANTINE = "quarantine"
+GC_MODE_DELETE = "delete"
+
+MATERIALS_PREFIX = "materials/"
+QUARANTINE_PREFIX = "quarantine/"
+
+# 同一プロセス内での多重実行を防ぐ
+_gc_lock = threading.Lock()
+
+
+class StorageGCRunningError(Exception):
+    """孤立ファイルの回収が実行中"""
+
+
+@dataclass
+class StorageGCReport:
+    """孤立ファイル回収の結果"""
+    mode: str
+    dry_run: bool
+    started_at: str
+    finished_at: Optional[str] = None
+    scanned: int = 0
+    skipped_recent: int = 0
+    orphaned: int = 0
+    restored: int = 0
+    reclaimed_bytes: int = 0
+    staging_removed: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def _find_unreferenced(db: Client, keys: List[str]) -> List[str]:
+    """materialsから参照されていないキーを返す（キーはPOST本文で渡すためURL長の制限を受けない）"""
+    response = db.rpc("find_unreferenced_material_files", {"p_keys": keys}).execute()
+    return [row["file_path"] for row in response.data or []]
+
+
+def _collect_batch(
+    db: Client,
+    storage: StorageBackend,
+    batch: List[StoredObject],
+    report: StorageGCReport,
+    quarantine_prefix: str,
+) -> None:
+    by_key = {obj.key: obj for obj in batch}
+    for key in _find_unreferenced(db, list(by_key)):
+        obj = by_key[key]
+        report.orphaned += 1
+        if report.dry_run:
+            report.reclaimed_bytes += obj.size
+            continue
+        try:
+            # 照合後に参照が登録された場合に備え、ファイルごとに退避してから再確認する
+            if report.mode == GC_MODE_DELETE:
+                collected = delete_if_unreferenced(db, storage, key)
+            else:
+                collected = detach_if_unreferenced(db, storage, key, quarantine_prefix + key)
+            if collected:
+                report.reclaimed_bytes += obj.size
+            else:
+                report.restored += 1
+        except Exception as e:
+            logger.warning(f"Failed to collect orphaned file {key}: {e}")
+            report.errors.append(f"{key}: {e}")
+
+
+def _collect_releasing(
+    db: Client,
+    storage: StorageBackend,
+    cutoff: datetime,
+    report: StorageGCReport,
+    quarantine_prefix: str,
+) -> None:
+    """資料の削除が中断され、退避したまま残ったファイルを回収または復元
+
+    猶予期間はキーに含めた退避日時で判定する（ローカルストレージの移動では更新日時が元のファイルのまま
+    残るため、退避直後で再確認中のファイルを誤って回収しないよう、更新日時は使わない）
+    """
+    for obj in storage.iter_objects(RELEASING_PREFIX):
+        if report.dry_run:
+            continue
+        moved_at = released_at(obj.key)
+        if moved_at is None or moved_at >= cutoff:
+            continue
+        key = original_key(obj.key)
+        try:
+            if count_material_refs(db, key) > 0:
+                storage.move(obj.key, key)
+                report.restored += 1
+            elif report.mode == GC_MODE_DELETE:
+                storage.delete(obj.key)
+                report.reclaimed_bytes += obj.size
+            else:
+                storage.move(obj.key, quarantine_prefix + key)
+                report.reclaimed_bytes += obj.size
+        except Exception as e:
+            logger.warning(f"Failed to recover released file {obj.key}: {e}")
+            report.errors.append(f"{obj.key}: {e}")
+
+
+def _collect_staging(cutoff: datetime, report: StorageGCReport) -> None:
+    """中断されたアップロードの一時ファイルを削除（ローカルの一時領域）"""
+    staging_dir = Path(settings.UPLOAD_ROOT) / ".staging"
+    if not staging_dir.is_dir():
+        return
+    for staged in LocalStorage(staging_dir).iter_objects(""):
+        if staged.modified_at >= cutoff:
+            continue
+        report.staging_removed += 1
+        report.reclaimed_bytes += staged.size
+        if not report.dry_run:
+            discard_staged(staging_dir / staged.key)
+
+
+def collect_orphaned_files(
+    db: Client,
+    dry_run: bool = False,
+    mode: Optional[str] = None,
+    storage: Optional[StorageBackend] = None,
+) -> Dict[str, Any]:
+    """参照されていない資料ファイルを回収し、結果を返す（同期処理、スレッドプール等で実行する）
+
+    dry_run=Trueの場合は回収せず、対象件数と回収できる容量（reclaimed_bytes）のみ集計する
+    """
+    mode = mode or settings.STORAGE_GC_MODE
+    if mode not in (GC_MODE_QUARANTINE, GC_MODE_DELETE):
+        raise ValueError(f"未対応のSTORAGE_GC_MODEです: {mode}")
+    if not _gc_lock.acquire(blocking=False):
+        raise StorageGCRunningError()
+
+    try:
+        storage = storage or get_storage()
+        started_at = datetime.now(timezone.utc)
+        cutoff = started_at - timedelta(seconds=settings.STORAGE_GC_GRACE_SECONDS)
+        quarantine_prefix = f"{QUARANTINE_PREFIX}{started_at:%Y%m%d%H%M%S}/"
+        report = StorageGCReport(mode=mode, dry_run=dry_run, started_at=started_at.isoformat())
+
+        batch: List[StoredObject] = []
+        for obj in storage.iter_objects(MATERIALS_PREFIX):
+            report.scanned += 1
+            if obj.modified_at >= cutoff:
+                report.skipped_recent += 1
+                continue
+            batch.append(obj)
+            if len(batch) >= settings.STORAGE_GC_BATCH_SIZE:
+                _collect_batch(db, storage, batch, report, quarantine_prefix)
+                batch = []
+        if batch:
+            _collect_batch(db, storage, batch, report, quarantine_prefix)
+
+        _collect_releasing(db, storage, cutoff, report, quarantine_prefix)
+        _collect_staging(cutoff, report)
+
+        report.finished_at = datetime.now(timezone.utc).isoformat()
+        logger.info(
+            f"Storage GC finished: scanned={report.scanned} orphaned={report.orphaned} restored={report.restored} "
+            f"reclaimed_bytes={report.reclaimed_bytes} mode={mode} dry_run={dry_run}"
+        )
+        return asdict(report)
+    finally:
+        _gc_lock.release()
+
+
+async def run_periodic_storage_gc() -> None:
+    """STORAGE_GC_INTERVAL_SECONDSごとに孤立ファイルを回収（アプリ起動中のバックグラウンドタスク）"""
+    while True:
+        await asyncio.sleep(settings.STORAGE_GC_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(collect_orphaned_files, get_supabase_client())
+        except StorageGCRunningError:
+            logger.info("Storage GC skipped: already running")
+        except Exception as e:
+            logger.error(f"Storage GC failed: {e}", exc_info=True)
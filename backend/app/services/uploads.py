@@ -0,0 +1,83 @@
+"""
+アップロードファイルの受信
+
+UploadFileを固定サイズのチャンクで読み込み、サイズ集計とハッシュ計算を行いながら
+一時ファイルに書き出す。ファイル書き込みとハッシュ計算はスレッドプールで実行し、
+イベントループをブロックしない。
+"""
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+
+class UploadTooLargeError(Exception):
+    """アップロードサイズが上限を超えた"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StagedUpload:
+    """一時領域に受信済みのアップロードファイル"""
+    path: Path
+    size: int
+    sha256: str
+
+
+def _write_chunk(out: BinaryIO, hasher: "hashlib._Hash", chunk: bytes) -> None:
+    hasher.update(chunk)
+    out.write(chunk)
+
+
+def discard_staged(path: Path) -> None:
+    """一時ファイルを削除（存在しなければ何もしない）"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+async def stage_upload(
+    file: UploadFile,
+    staging_dir: Path,
+    max_bytes: int,
+    chunk_size: int,
+) -> StagedUpload:
+    """アップロードファイルをチャンク単位で一時ファイルに受信
+
+    サイズが判明している場合は読み込み前に、そうでない場合は上限を超えた時点で
+    UploadTooLargeErrorを送出する（途中まで書き込んだ一時ファイルは削除する）
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    await run_in_threadpool(staging_dir.mkdir, parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=staging_dir, suffix=".part")
+    tmp_path = Path(tmp_name)
+
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                await run_in_threadpool(_write_chunk, out, hasher, chunk)
+    except BaseException:
+        await run_in_threadpool(discard_staged, tmp_path)
+        raise
+
+    return StagedUpload(path=tmp_path, size=size, sha256=hasher.hexdigest())
@@ -0,0 +1,99 @@
+"""
+ZIPのストリーミング生成
+
+アーカイブ全体をディスクやメモリに置かず、エントリのデータをチャンク単位で読みながら
+ZIPのバイト列を逐次生成する。出力先がシーク不可のため、各エントリのサイズ・CRCは
+データディスクリプタ（エントリ末尾）に書き込まれる。
+"""
+
+import itertools
+import logging
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 既に圧縮済みの形式は再圧縮せず無圧縮（STORED）で格納する
+COMPRESSED_EXTENSIONS = {
+    ".pdf", ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".zip", ".gz", ".7z", ".rar",
+    ".xlsx", ".docx", ".pptx",
+    ".mp4", ".mov", ".mp3",
+}
+
+
+@dataclass
+class ZipEntry:
+    """ZIPに格納するファイル"""
+    name: str
+    open_chunks: Callable[[], Iterator[bytes]]
+    modified_at: Optional[datetime] = None
+
+
+class _StreamSink:
+    """ZipFileの書き込み先（書き込まれたバイト列を溜めて逐次取り出す）"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compression_for(name: str) -> int:
+    if PurePosixPath(name).suffix.lower() in COMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _date_time(value: Optional[datetime]) -> Tuple[int, int, int, int, int, int]:
+    value = value or datetime.now()
+    # ZIPは1980年以降の日時のみ扱える
+    if value.year < 1980:
+        value = datetime(1980, 1, 1)
+    return value.timetuple()[:6]
+
+
+def iter_zip(entries: Iterable[ZipEntry]) -> Iterator[bytes]:
+    """エントリを順に読みながらZIPのバイト列を生成
+
+    読み込みを開始できないエントリ（ストレージにファイルが無い等）は警告を出してスキップする
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, mode="w") as archive:
+        for entry in entries:
+            try:
+                chunks = entry.open_chunks()
+                first = next(chunks, b"")
+            except Exception as e:
+                logger.warning(f"Skipped zip entry {entry.name}: {e}")
+                continue
+
+            info = zipfile.ZipInfo(entry.name, date_time=_date_time(entry.modified_at))
+            info.compress_type = _compression_for(entry.name)
+            # サイズ不明のまま書き込むため、4GB超にも対応できるようZIP64を有効にする
+            with archive.open(info, mode="w", force_zip64=True) as destination:
+                for chunk in itertools.chain((first,), chunks):
+                    destination.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+
+    # セントラルディレクトリ
+    yield sink.drain()
@@ -0,0 +1,43 @@
+-- 工数入力（work_logs）の変更に合わせて projects.actual_hours を原子的に更新するトリガー
+-- アプリ側での「読み取り→加減算→書き戻し」を廃止し、同時更新時の更新消失を防ぐ
+-- actual_hours は時間単位（duration_minutes / 60）、減算時は0未満にしない
+
+CREATE OR REPLACE FUNCTION adjust_project_actual_hours(
+    p_project_id UUID,
+    p_delta_minutes INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    IF p_project_id IS NULL OR p_delta_minutes = 0 THEN
+        RETURN;
+    END IF;
+
+    UPDATE projects
+    SET actual_hours = GREATEST(0, COALESCE(actual_hours, 0) + p_delta_minutes / 60.0)
+    WHERE id = p_project_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_project_actual_hours()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM adjust_project_actual_hours(NEW.project_id, NEW.duration_minutes);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM adjust_project_actual_hours(OLD.project_id, -OLD.duration_minutes);
+    ELSIF TG_OP = 'UPDATE' THEN
+        IF NEW.project_id IS DISTINCT FROM OLD.project_id THEN
+            -- 案件の付け替え: 旧案件から減算、新案件に加算
+            PERFORM adjust_project_actual_hours(OLD.project_id, -OLD.duration_minutes);
+            PERFORM adjust_project_actual_hours(NEW.project_id, NEW.duration_minutes);
+        ELSE
+            PERFORM adjust_project_actual_hours(NEW.project_id, NEW.duration_minutes - OLD.duration_minutes);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_project_actual_hours_on_work_logs ON work_logs;
+CREATE TRIGGER sync_project_actual_hours_on_work_logs
+    AFTER INSERT OR DELETE OR UPDATE OF project_id, duration_minutes ON work_logs
+    FOR EACH ROW EXECUTE FUNCTION sync_project_actual_hours();
@@ -0,0 +1,43 @@
+-- 案件別工数集計（ユーザー別・日別）をDB側で行う関数
+-- 生の工数データを転送せず、集計済みの行のみを返す
+
+CREATE INDEX IF NOT EXISTS idx_work_logs_project_date
+    ON work_logs(project_id, work_date) INCLUDE (user_id, duration_minutes);
+
+CREATE OR REPLACE FUNCTION get_worklog_summary(p_project_id UUID)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'by_user', COALESCE((
+            SELECT jsonb_agg(
+                jsonb_build_object(
+                    'user_id', s.user_id,
+                    'username', COALESCE(u.username, 'Unknown'),
+                    'total_minutes', s.total_minutes,
+                    'entry_count', s.entry_count
+                ) ORDER BY u.username
+            )
+            FROM (
+                SELECT user_id, SUM(duration_minutes)::BIGINT AS total_minutes, COUNT(*) AS entry_count
+                FROM work_logs
+                WHERE project_id = p_project_id
+                GROUP BY user_id
+            ) s
+            LEFT JOIN users u ON u.id = s.user_id
+        ), '[]'::jsonb),
+        'by_date', COALESCE((
+            SELECT jsonb_agg(
+                jsonb_build_object(
+                    'work_date', d.work_date,
+                    'total_minutes', d.total_minutes,
+                    'entry_count', d.entry_count
+                ) ORDER BY d.work_date DESC
+            )
+            FROM (
+                SELECT work_date, SUM(duration_minutes)::BIGINT AS total_minutes, COUNT(*) AS entry_count
+                FROM work_logs
+                WHERE project_id = p_project_id
+                GROUP BY work_date
+            ) d
+        ), '[]'::jsonb)
+    );
+$$ LANGUAGE sql STABLE;
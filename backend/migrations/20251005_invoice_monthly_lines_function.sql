@@ -0,0 +1,25 @@
+-- 月次請求明細（案件別の実工数合計）をDB側で集計する関数
+-- projects と結合済みの明細行を管理No順で返す
+
+CREATE OR REPLACE FUNCTION get_monthly_invoice_lines(p_year INTEGER, p_month INTEGER)
+RETURNS TABLE (
+    project_id UUID,
+    management_no VARCHAR,
+    machine_no VARCHAR,
+    total_minutes BIGINT
+) AS $$
+    SELECT
+        p.id AS project_id,
+        p.management_no::VARCHAR,
+        p.machine_no::VARCHAR,
+        w.total_minutes
+    FROM (
+        SELECT project_id, SUM(duration_minutes)::BIGINT AS total_minutes
+        FROM work_logs
+        WHERE work_date >= make_date(p_year, p_month, 1)
+          AND work_date < (make_date(p_year, p_month, 1) + INTERVAL '1 month')::DATE
+        GROUP BY project_id
+    ) w
+    JOIN projects p ON p.id = w.project_id
+    ORDER BY p.management_no;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,47 @@
+-- 請求書確定を1トランザクション・1往復で行う関数
+-- 月次集計 → ヘッダのupsert（確定） → 明細の洗い替え をまとめて実行し、途中失敗時は全体がロールバックされる
+-- ※ 20251002_create_invoice_functions.sql の create_invoice_with_items は旧スキーマ（invoice_number等）向けのため使用しない
+-- 依存: 20251005_invoice_monthly_lines_function.sql（get_monthly_invoice_lines）
+
+CREATE OR REPLACE FUNCTION close_invoice_with_items(
+    p_year INTEGER,
+    p_month INTEGER,
+    p_closed_by UUID
+) RETURNS invoices AS $$
+DECLARE
+    v_invoice invoices;
+BEGIN
+    -- ヘッダを確定状態でupsert（確定済みの場合は更新しない）
+    INSERT INTO invoices (year, month, status, closed_at, closed_by)
+    VALUES (p_year, p_month, 'closed', CURRENT_TIMESTAMP, p_closed_by)
+    ON CONFLICT (year, month) DO UPDATE
+        SET status = 'closed',
+            closed_at = EXCLUDED.closed_at,
+            closed_by = EXCLUDED.closed_by,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE invoices.status <> 'closed'
+    RETURNING * INTO v_invoice;
+
+    IF v_invoice.id IS NULL THEN
+        RAISE EXCEPTION '既に確定済みの請求書です' USING HINT = 'INVOICE_ALREADY_CLOSED';
+    END IF;
+
+    -- 明細を洗い替え
+    DELETE FROM invoice_items WHERE invoice_id = v_invoice.id;
+
+    INSERT INTO invoice_items (invoice_id, project_id, management_no, work_content, total_hours)
+    SELECT
+        v_invoice.id,
+        l.project_id,
+        COALESCE(l.management_no, ''),
+        COALESCE(l.machine_no, ''),
+        ROUND(l.total_minutes / 60.0, 2)
+    FROM get_monthly_invoice_lines(p_year, p_month) l;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION '請求対象の工数がありません' USING HINT = 'INVOICE_NO_ITEMS';
+    END IF;
+
+    RETURN v_invoice;
+END;
+$$ LANGUAGE plpgsql;
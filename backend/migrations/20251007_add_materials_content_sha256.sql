@@ -0,0 +1,7 @@
+-- 資料ファイルの内容ハッシュ（SHA-256）を保持するカラム
+-- ダウンロード時の強いETag（If-None-Match / If-Range）に使用する
+-- 既存行はNULLのまま（ダウンロード時はファイルのサイズと更新日時から弱いETagを生成する）
+
+ALTER TABLE materials ADD COLUMN IF NOT EXISTS content_sha256 CHAR(64);
+
+COMMENT ON COLUMN materials.content_sha256 IS 'ファイル内容のSHA-256（16進小文字）';
@@ -0,0 +1,40 @@
+-- 資料ファイルの内容アドレス化（重複排除）と参照カウント
+-- 同一内容のファイルは materials/blobs/<sha256先頭2文字>/<sha256><拡張子> に1つだけ保存し、
+-- 複数の materials 行が同じ file_path を参照する。参照数は file_path が一致する行数で数える。
+-- 依存: 20251007_add_materials_content_sha256.sql（content_sha256）
+
+CREATE INDEX IF NOT EXISTS idx_materials_file_path ON materials(file_path);
+CREATE INDEX IF NOT EXISTS idx_materials_content_sha256 ON materials(content_sha256);
+
+-- 資料行を削除し、同じファイルを参照する残りの行数を返す
+-- 同じfile_pathに対する削除同士はアドバイザリロックで直列化し、
+-- 最後の参照を削除したリクエストだけが remaining_refs = 0 を受け取る
+CREATE OR REPLACE FUNCTION release_material(p_material_id UUID)
+RETURNS TABLE (
+    file_path VARCHAR,
+    remaining_refs BIGINT
+) AS $$
+DECLARE
+    v_file_path VARCHAR;
+BEGIN
+    SELECT m.file_path INTO v_file_path FROM materials m WHERE m.id = p_material_id;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('materials:' || v_file_path));
+
+    DELETE FROM materials m WHERE m.id = p_material_id;
+    IF NOT FOUND THEN
+        -- 同時に削除された
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT v_file_path, COUNT(*)
+    FROM materials m
+    WHERE m.file_path = v_file_path;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION release_material(UUID) IS '資料行を削除し、同じファイルを参照する残りの行数を返す（0ならファイル削除可）';
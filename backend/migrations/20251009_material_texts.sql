@@ -0,0 +1,74 @@
+-- 資料本文の全文検索
+-- アップロードされたPDF・画像から抽出したテキストをファイル内容のSHA-256ごとに保存する
+-- （重複排除された同一内容の資料は抽出結果を共有する）
+-- 日本語は分かち書きが必要なtsvectorではなく、pg_trgmのGINインデックスによる部分一致で検索する
+-- ※ 3文字未満の検索語はインデックスを使えず全件走査になる
+-- 依存: 20251007_add_materials_content_sha256.sql（materials.content_sha256）
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS material_texts (
+    content_sha256 CHAR(64) PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    content TEXT,
+    page_count INTEGER,
+    ocr_pages INTEGER,
+    error TEXT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT material_texts_status_check CHECK (status IN ('pending', 'done', 'failed'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_material_texts_content_trgm
+    ON material_texts USING gin (content gin_trgm_ops);
+
+COMMENT ON TABLE material_texts IS '資料ファイルから抽出したテキスト（ファイル内容のSHA-256ごと）';
+COMMENT ON COLUMN material_texts.status IS '抽出状態: pending, done, failed';
+COMMENT ON COLUMN material_texts.content IS '抽出テキスト（NFKC正規化済み）';
+COMMENT ON COLUMN material_texts.ocr_pages IS 'テキストレイヤーが無くOCRしたページ数';
+
+-- 本文の部分一致検索（新しい資料順、一致箇所周辺の抜粋付き）
+CREATE OR REPLACE FUNCTION search_material_texts(
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 50
+) RETURNS TABLE (
+    id UUID,
+    title VARCHAR,
+    machine_no VARCHAR,
+    model VARCHAR,
+    scope VARCHAR,
+    series VARCHAR,
+    tonnage INTEGER,
+    file_path VARCHAR,
+    file_size BIGINT,
+    content_sha256 CHAR(64),
+    uploaded_by UUID,
+    created_at TIMESTAMP,
+    snippet TEXT
+) AS $$
+    SELECT
+        m.id,
+        m.title,
+        m.machine_no,
+        m.model,
+        m.scope,
+        m.series,
+        m.tonnage,
+        m.file_path,
+        m.file_size,
+        m.content_sha256,
+        m.uploaded_by,
+        m.created_at,
+        substr(
+            t.content,
+            greatest(strpos(lower(t.content), lower(p_query)) - 40, 1),
+            length(p_query) + 80
+        ) AS snippet
+    FROM materials m
+    JOIN material_texts t ON t.content_sha256 = m.content_sha256
+    WHERE t.status = 'done'
+      AND t.content ILIKE '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%'
+    ORDER BY m.created_at DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION search_material_texts(TEXT, INTEGER) IS '資料本文の部分一致検索（pg_trgmインデックス使用）';
@@ -0,0 +1,15 @@
+-- 孤立した資料ファイルの検出
+-- ストレージ上のキー一覧（バッチ単位）のうち、どの materials 行からも参照されていないものを返す
+-- キーはRPCのPOST本文で渡すため、URL長の制限を受けずに1000件単位で照合できる
+-- 依存: 20251008_materials_content_addressed.sql（idx_materials_file_path）
+
+CREATE OR REPLACE FUNCTION find_unreferenced_material_files(p_keys TEXT[])
+RETURNS TABLE (file_path TEXT) AS $$
+    SELECT k.key
+    FROM unnest(p_keys) AS k(key)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM materials m WHERE m.file_path = k.key
+    );
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION find_unreferenced_material_files(TEXT[]) IS '渡されたストレージキーのうちmaterialsから参照されていないものを返す';
@@ -0,0 +1,14 @@
+-- 資料ファイルの参照数の再確認
+-- ファイル削除の直前に、退避したファイルがまだ参照されていないかを確認する
+-- release_material と同じアドバイザリロックを取り、同じfile_pathの削除と直列化する
+-- 依存: 20251008_materials_content_addressed.sql（idx_materials_file_path）
+
+CREATE OR REPLACE FUNCTION count_material_refs(p_file_path TEXT)
+RETURNS BIGINT AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('materials:' || p_file_path));
+    RETURN (SELECT COUNT(*) FROM materials m WHERE m.file_path = p_file_path);
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION count_material_refs(TEXT) IS '資料ファイルを参照しているmaterials行の数（ファイル削除前の再確認用）';
@@ -0,0 +1,25 @@
+-- 資料本文の抽出の開始（排他）
+-- 同じ内容のファイルが同時にアップロードされても、抽出（PDF解析・OCR）を1回だけ実行するよう
+-- 未登録・失敗・タイムアウトした抽出中の行だけをpendingとして確保する（1文で判定と更新を行う）
+-- 行を返した場合のみ呼び出し元が抽出を実行する
+-- 依存: 20251009_material_texts.sql（material_texts）
+
+CREATE OR REPLACE FUNCTION claim_material_text_extraction(
+    p_content_sha256 CHAR(64),
+    p_timeout_seconds INTEGER,
+    p_force BOOLEAN DEFAULT FALSE
+) RETURNS TABLE (content_sha256 CHAR(64)) AS $$
+    INSERT INTO material_texts AS t (content_sha256, status, content, error, updated_at)
+    VALUES (p_content_sha256, 'pending', NULL, NULL, CURRENT_TIMESTAMP)
+    ON CONFLICT (content_sha256) DO UPDATE
+    SET status = 'pending',
+        content = NULL,
+        error = NULL,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE p_force
+       OR t.status = 'failed'
+       OR (t.status = 'pending' AND t.updated_at < CURRENT_TIMESTAMP - make_interval(secs => p_timeout_seconds))
+    RETURNING t.content_sha256;
+$$ LANGUAGE sql;
+
+COMMENT ON FUNCTION claim_material_text_extraction(CHAR, INTEGER, BOOLEAN) IS '資料本文の抽出を開始してよければpendingとして確保し、行を返す';
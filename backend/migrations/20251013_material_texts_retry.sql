@@ -0,0 +1,89 @@
+-- 資料本文の抽出の再試行と、参照が無くなった抽出結果の削除
+-- - 抽出の開始日時（claimed_at）を記録し、タイムアウトの判定に使う
+--   （updated_at は結果の保存でも更新されるため、抽出の開始からの経過時間を表さない）
+-- - ワーカーの再起動等で pending のまま残った抽出を定期的に検出し、再度抽出する
+-- - 同じ内容の資料が全て削除された場合は、抽出したテキストも削除する
+-- 依存: 20251008_materials_content_addressed.sql, 20251012_claim_material_text_extraction.sql
+
+ALTER TABLE material_texts ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITH TIME ZONE;
+UPDATE material_texts SET claimed_at = updated_at WHERE claimed_at IS NULL AND status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_material_texts_pending_claimed_at
+    ON material_texts(claimed_at) WHERE status = 'pending';
+
+COMMENT ON COLUMN material_texts.claimed_at IS '抽出を開始した日時（タイムアウトの判定に使用）';
+
+CREATE OR REPLACE FUNCTION claim_material_text_extraction(
+    p_content_sha256 CHAR(64),
+    p_timeout_seconds INTEGER,
+    p_force BOOLEAN DEFAULT FALSE
+) RETURNS TABLE (content_sha256 CHAR(64)) AS $$
+    INSERT INTO material_texts AS t (content_sha256, status, content, error, claimed_at, updated_at)
+    VALUES (p_content_sha256, 'pending', NULL, NULL, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT (content_sha256) DO UPDATE
+    SET status = 'pending',
+        content = NULL,
+        error = NULL,
+        claimed_at = CURRENT_TIMESTAMP,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE p_force
+       OR t.status = 'failed'
+       OR (t.status = 'pending' AND COALESCE(t.claimed_at, t.updated_at) < CURRENT_TIMESTAMP - make_interval(secs => p_timeout_seconds))
+    RETURNING t.content_sha256;
+$$ LANGUAGE sql;
+
+-- タイムアウトした抽出（pendingのまま残ったもの）と、その内容を参照する資料ファイルを返す
+CREATE OR REPLACE FUNCTION find_stale_material_text_extractions(
+    p_timeout_seconds INTEGER,
+    p_limit INTEGER DEFAULT 100
+) RETURNS TABLE (content_sha256 CHAR(64), file_path VARCHAR) AS $$
+    SELECT t.content_sha256, m.file_path
+    FROM material_texts t
+    CROSS JOIN LATERAL (
+        SELECT m.file_path FROM materials m WHERE m.content_sha256 = t.content_sha256 LIMIT 1
+    ) m
+    WHERE t.status = 'pending'
+      AND COALESCE(t.claimed_at, t.updated_at) < CURRENT_TIMESTAMP - make_interval(secs => p_timeout_seconds)
+    ORDER BY t.claimed_at
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION find_stale_material_text_extractions(INTEGER, INTEGER) IS 'pendingのままタイムアウトした資料本文の抽出を返す（再抽出用）';
+
+-- 資料行を削除し、同じファイルを参照する残りの行数を返す
+-- 同じ内容の資料が残っていなければ、抽出したテキストも削除する
+CREATE OR REPLACE FUNCTION release_material(p_material_id UUID)
+RETURNS TABLE (
+    file_path VARCHAR,
+    remaining_refs BIGINT
+) AS $$
+DECLARE
+    v_file_path VARCHAR;
+    v_content_sha256 CHAR(64);
+BEGIN
+    SELECT m.file_path, m.content_sha256 INTO v_file_path, v_content_sha256
+    FROM materials m WHERE m.id = p_material_id;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('materials:' || v_file_path));
+
+    DELETE FROM materials m WHERE m.id = p_material_id;
+    IF NOT FOUND THEN
+        -- 同時に削除された
+        RETURN;
+    END IF;
+
+    IF v_content_sha256 IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM materials m WHERE m.content_sha256 = v_content_sha256
+    ) THEN
+        DELETE FROM material_texts t WHERE t.content_sha256 = v_content_sha256;
+    END IF;
+
+    RETURN QUERY
+    SELECT v_file_path, COUNT(*)
+    FROM materials m
+    WHERE m.file_path = v_file_path;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,110 @@
+"""
+リポジトリのベンチマーク（PostgREST vs PostgreSQL直接接続）
+
+集計・一覧系の読み取り（案件一覧、工数一覧・集計、請求プレビュー用の明細取得）を
+Supabase Client（PostgREST）経由とasyncpg（DATABASE_URLへ直接接続）で同じ回数実行し、
+レイテンシ（平均・p50・p95）とスループットを比較する。
+ローカル環境では `supabase start` で起動したPostgREST・PostgreSQLを対象にする想定。
+
+使い方:
+    cd backend
+    python scripts/benchmark_repositories.py --project-id <案件ID> --year 2025 --month 10 \\
+        [--iterations 200] [--concurrency 10]
+
+SUPABASE_URL / SUPABASE_ANON_KEY / DATABASE_URL は .env（app.core.config）から読み込む。
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.database import close_postgres_pool, create_postgres_pool, get_async_supabase_client  # noqa: E402
+from app.repositories.invoices import SupabaseInvoiceRepository  # noqa: E402
+from app.repositories.postgres import (  # noqa: E402
+    PostgresInvoiceRepository,
+    PostgresProjectRepository,
+    PostgresWorklogRepository,
+)
+from app.repositories.projects import ProjectFilters, SupabaseProjectRepository  # noqa: E402
+from app.repositories.worklogs import SupabaseWorklogRepository, WorklogFilters  # noqa: E402
+
+
+async def _measure(operation: Callable[[], Awaitable[object]], iterations: int, concurrency: int) -> Dict[str, float]:
+    """operationをconcurrency並列でiterations回実行し、各回の所要時間（ミリ秒）を集計"""
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_once() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await operation()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    # 接続確立・プリペアドステートメント作成の影響を除くため1回ウォームアップ
+    await operation()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_once() for _ in range(iterations)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "rps": iterations / elapsed,
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    db = await get_async_supabase_client()
+    pool = await create_postgres_pool()
+
+    backends = {
+        "postgrest": (
+            SupabaseProjectRepository(db),
+            SupabaseWorklogRepository(db),
+            SupabaseInvoiceRepository(db),
+        ),
+        "postgres": (
+            PostgresProjectRepository(db, pool),
+            PostgresWorklogRepository(db, pool),
+            PostgresInvoiceRepository(db, pool),
+        ),
+    }
+
+    print(f"iterations={args.iterations} concurrency={args.concurrency}")
+    print(f"{'operation':<20} {'backend':<10} {'mean(ms)':>10} {'p50(ms)':>10} {'p95(ms)':>10} {'req/s':>10}")
+    try:
+        for backend, (projects, worklogs, invoices) in backends.items():
+            operations = {
+                "project_list": lambda: projects.list_projects(ProjectFilters(), 0, 20),
+                "worklog_list": lambda: worklogs.list_worklogs(WorklogFilters(project_id=args.project_id), 0, 20),
+                "worklog_summary": lambda: worklogs.get_summary(args.project_id),
+                "invoice_preview": lambda: invoices.monthly_lines(args.year, args.month),
+            }
+            for name, operation in operations.items():
+                result = await _measure(operation, args.iterations, args.concurrency)
+                print(
+                    f"{name:<20} {backend:<10} {result['mean']:>10.2f} {result['p50']:>10.2f} "
+                    f"{result['p95']:>10.2f} {result['rps']:>10.1f}"
+                )
+    finally:
+        await close_postgres_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PostgRESTとPostgreSQL直接接続のリポジトリを比較")
+    parser.add_argument("--project-id", required=True, help="工数集計・工数一覧の対象案件ID")
+    parser.add_argument("--year", type=int, required=True, help="請求プレビューの対象年")
+    parser.add_argument("--month", type=int, required=True, help="請求プレビューの対象月")
+    parser.add_argument("--iterations", type=int, default=200, help="操作ごとの実行回数")
+    parser.add_argument("--concurrency", type=int, default=10, help="同時実行数")
+    sys.exit(asyncio.run(main(parser.parse_args())))
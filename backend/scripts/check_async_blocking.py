@@ -0,0 +1,133 @@
+"""
+async関数内のブロッキング呼び出し検出
+
+app/ 配下の `async def` を静的解析し、イベントループをブロックする呼び出し
+（同期Supabaseクライアントの `.execute()`、`open()`、同期ファイル操作、`time.sleep()` 等）を検出する。
+`await run_in_threadpool(query.execute)` のように関数を渡す形は呼び出しではないため対象外。
+awaitされる呼び出しと `asyncio.gather()` に渡す呼び出しは非同期クライアントのものとみなす。
+意図的に許可する行には `# blocking-ok` を付ける。
+
+使い方:
+    cd backend
+    python scripts/check_async_blocking.py [対象ディレクトリ...]
+
+検出があれば終了コード1を返す。
+"""
+
+import ast
+import sys
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+ALLOW_MARKER = "# blocking-ok"
+
+# 属性名だけで判定するメソッド呼び出し（同期Supabaseクライアント・pathlib等）
+BLOCKING_METHODS = {
+    "execute": "同期Supabaseクライアントの.execute()",
+    "unlink": "同期ファイル削除",
+    "mkdir": "同期ディレクトリ作成",
+    "read_bytes": "同期ファイル読み込み",
+    "read_text": "同期ファイル読み込み",
+    "write_bytes": "同期ファイル書き込み",
+    "write_text": "同期ファイル書き込み",
+    "rmtree": "同期ディレクトリ削除",
+}
+
+# モジュール名.関数名 で判定する呼び出し
+BLOCKING_FUNCTIONS = {
+    ("time", "sleep"): "time.sleep()",
+    ("os", "remove"): "同期ファイル削除",
+    ("os", "unlink"): "同期ファイル削除",
+    ("os", "replace"): "同期ファイル移動",
+    ("os", "rename"): "同期ファイル移動",
+    ("shutil", "copyfileobj"): "同期ファイルコピー",
+    ("shutil", "move"): "同期ファイル移動",
+    ("requests", "get"): "同期HTTP通信",
+    ("requests", "post"): "同期HTTP通信",
+}
+
+# 組み込み関数
+BLOCKING_BUILTINS = {
+    "open": "同期ファイルopen()",
+}
+
+
+def _iter_own_nodes(func: ast.AsyncFunctionDef) -> Iterator[Tuple[ast.AST, ast.AST]]:
+    """関数本体のノードを (ノード, 親ノード) で列挙（ネストした関数・lambdaの中は除く）"""
+    stack: List[Tuple[ast.AST, ast.AST]] = [(child, func) for child in func.body]
+    while stack:
+        node, parent = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            continue
+        yield node, parent
+        stack.extend((child, node) for child in ast.iter_child_nodes(node))
+
+
+def _blocking_reason(call: ast.Call) -> str:
+    func = call.func
+    if isinstance(func, ast.Name):
+        return BLOCKING_BUILTINS.get(func.id, "")
+    if isinstance(func, ast.Attribute):
+        if isinstance(func.value, ast.Name):
+            reason = BLOCKING_FUNCTIONS.get((func.value.id, func.attr))
+            if reason:
+                return reason
+        return BLOCKING_METHODS.get(func.attr, "")
+    return ""
+
+
+def _is_gather_call(node: ast.AST) -> bool:
+    """asyncio.gather(...) の呼び出しか（引数のコルーチンはまとめてawaitされる）"""
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "gather"
+    )
+
+
+def check_file(path: Path) -> List[str]:
+    """ファイル内のasync関数を検査して検出結果を返す"""
+    source = path.read_text(encoding="utf-8")
+    lines = source.splitlines()
+    tree = ast.parse(source, filename=str(path))
+
+    findings = []
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.AsyncFunctionDef):
+            continue
+        for node, parent in _iter_own_nodes(func):
+            if not isinstance(node, ast.Call):
+                continue
+            # awaitされている呼び出し（非同期クライアント等）は対象外
+            if isinstance(parent, ast.Await) or _is_gather_call(parent):
+                continue
+            reason = _blocking_reason(node)
+            if not reason:
+                continue
+            if ALLOW_MARKER in lines[node.lineno - 1]:
+                continue
+            findings.append((node.lineno, f"{path}:{node.lineno}: {func.name}: {reason}"))
+
+    return [message for _, message in sorted(findings)]
+
+
+def main(argv: List[str]) -> int:
+    targets = [Path(arg) for arg in argv] or [Path(__file__).resolve().parent.parent / "app"]
+
+    findings = []
+    for target in targets:
+        files = sorted(target.rglob("*.py")) if target.is_dir() else [target]
+        for file in files:
+            findings.extend(check_file(file))
+
+    for finding in findings:
+        print(finding)
+
+    if findings:
+        print(f"\nasync関数内のブロッキング呼び出しが{len(findings)}件見つかりました", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
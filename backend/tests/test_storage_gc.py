@@ -0,0 +1,86 @@
+"""
+孤立ファイル回収（app.services.storage_gc）のテスト
+
+実行: cd backend && python -m pytest tests
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from app.services.material_files import releasing_key
+from app.services.storage import LocalStorage
+from app.services.storage_gc import GC_MODE_DELETE, StorageGCReport, _collect_releasing
+
+KEY = "materials/blobs/ab/" + "ab" * 32 + ".pdf"
+
+
+class _FakeRPC:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+class _FakeDB:
+    """count_material_refsの結果を固定で返すSupabase Clientの代替"""
+
+    def __init__(self, refs: int):
+        self.refs = refs
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        return _FakeRPC(self.refs)
+
+
+def _put_released(storage: LocalStorage, held_key: str, mtime: datetime) -> None:
+    path = storage.path_for(held_key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"%PDF-1.4")
+    os.utime(path, (mtime.timestamp(), mtime.timestamp()))
+
+
+def _report() -> StorageGCReport:
+    return StorageGCReport(mode=GC_MODE_DELETE, dry_run=False, started_at=datetime.now(timezone.utc).isoformat())
+
+
+def test_recently_released_file_with_old_mtime_is_not_collected(tmp_path):
+    storage = LocalStorage(tmp_path)
+    now = datetime.now(timezone.utc)
+    # 退避直後（削除側が参照数を再確認中）だが、移動前のファイルの更新日時は古い
+    held_key = releasing_key(KEY, moved_at=now)
+    _put_released(storage, held_key, now - timedelta(days=30))
+    db = _FakeDB(refs=0)
+
+    _collect_releasing(db, storage, now - timedelta(days=1), _report(), "quarantine/test/")
+
+    assert storage.exists(held_key)
+    assert db.calls == []
+
+
+def test_released_file_past_grace_period_is_collected(tmp_path):
+    storage = LocalStorage(tmp_path)
+    now = datetime.now(timezone.utc)
+    held_key = releasing_key(KEY, moved_at=now - timedelta(days=2))
+    _put_released(storage, held_key, now - timedelta(days=30))
+    report = _report()
+
+    _collect_releasing(_FakeDB(refs=0), storage, now - timedelta(days=1), report, "quarantine/test/")
+
+    assert not storage.exists(held_key)
+    assert report.reclaimed_bytes == len(b"%PDF-1.4")
+
+
+def test_released_file_still_referenced_is_restored(tmp_path):
+    storage = LocalStorage(tmp_path)
+    now = datetime.now(timezone.utc)
+    held_key = releasing_key(KEY, moved_at=now - timedelta(days=2))
+    _put_released(storage, held_key, now - timedelta(days=30))
+    report = _report()
+
+    _collect_releasing(_FakeDB(refs=1), storage, now - timedelta(days=1), report, "quarantine/test/")
+
+    assert storage.exists(KEY)
+    assert not storage.exists(held_key)
+    assert report.restored == 1